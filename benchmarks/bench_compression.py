@@ -0,0 +1,124 @@
+"""
+Bytes on the wire and CPU cost of the response compression.
+
+Compresses representative payloads with each available encoding and level: a completion
+response, an SSE stream compressed event by event (as the middleware sends it) and as a
+whole, and the JSONL output of a batch. Reports the compressed size and the CPU time.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_compression.py [--repeat 20] [--lines 500]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from uuid import uuid4
+
+import msgspec
+
+from middleware.compression import CompressionConfig, get_available_encodings
+from schemas.chat_schemas import ChatCompletionResponse
+from services.dummy_service import get_corpus
+from services.stream_state import SSE_DONE, StreamState
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 11], "zstd": [1, 3, 19]}
+
+
+def completion_payload() -> bytes:
+    response = get_corpus(seed=0)[0]
+    completion = ChatCompletionResponse(
+        model="dummy-model:1.0",
+        choices=[
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": response.content},
+                "finish_reason": "stop",
+            }
+        ],
+        usage={"prompt_tokens": 12, "completion_tokens": len(response.chunks)},
+    )
+    return msgspec.json.encode(completion)
+
+
+def stream_events() -> list[bytes]:
+    state = StreamState("dummy-model:1.0")
+    events = [state.delta(chunk) for chunk in get_corpus(seed=0)[0].chunks]
+    return [*events, state.finish(), SSE_DONE]
+
+
+def batch_payload(lines: int) -> bytes:
+    completion = msgspec.json.decode(completion_payload())
+    results = (
+        {
+            "id": f"batch_req_{uuid4().hex}",
+            "custom_id": f"request-{index}",
+            "response": {"status_code": 200, "body": {**completion, "id": str(uuid4())}},
+            "error": None,
+        }
+        for index in range(lines)
+    )
+    return b"".join(msgspec.json.encode(result) + b"\n" for result in results)
+
+
+def config_for(level: int) -> CompressionConfig:
+    return CompressionConfig(gzip_level=level, brotli_quality=level, zstd_level=level)
+
+
+def measure(compress: Callable[[], bytes], repeat: int) -> tuple[int, float]:
+    """Returns the compressed size and the CPU time per run, in microseconds."""
+    start = time.process_time()
+    for _ in range(repeat):
+        size = len(compress())
+    return size, (time.process_time() - start) / repeat * 1e6
+
+
+def report(name: str, raw: int, results: list[tuple[str, int, float]]) -> None:
+    print(f"\n{name}: {raw} bytes")
+    for label, size, cpu in results:
+        print(f"  {label:<22} {size:>9} bytes  {size / raw:6.1%}  {cpu:10.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=500)
+    args = parser.parse_args()
+
+    completion = completion_payload()
+    events = stream_events()
+    stream = b"".join(events)
+    batch = batch_payload(args.lines)
+    settings = [
+        (encoding, level) for encoding in get_available_encodings() for level in LEVELS[encoding]
+    ]
+
+    def whole(payload: bytes, encoding: str, level: int) -> Callable[[], bytes]:
+        config = config_for(level)
+        return lambda: config.create_compressor(encoding).compress(payload, final=True)
+
+    def per_event(encoding: str, level: int) -> Callable[[], bytes]:
+        config = config_for(level)
+
+        def compress() -> bytes:
+            compressor = config.create_compressor(encoding)
+            parts = [compressor.compress(event) for event in events[:-1]]
+            return b"".join([*parts, compressor.compress(events[-1], final=True)])
+
+        return compress
+
+    for name, payload in [("Completion", completion), (f"Batch of {args.lines}", batch)]:
+        results = [
+            (f"{encoding} {level}", *measure(whole(payload, encoding, level), args.repeat))
+            for encoding, level in settings
+        ]
+        report(name, len(payload), results)
+
+    results = []
+    for encoding, level in settings:
+        results.append((f"{encoding} {level} per event", *measure(per_event(encoding, level), 5)))
+        results.append((f"{encoding} {level} whole", *measure(whole(stream, encoding, level), 5)))
+    report(f"Stream of {len(events)} events", len(stream), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Throughput of the reasoning split of the streamed completions.
+
+Streams a reasoning model answer of `--tokens` tokens through `stream_choice` with each
+reasoning option and reports the tokens per second and the bytes sent. The stream without
+the reasoning models reference is the cost of the events alone. Also times the former
+client-side split, which searched the tags in the whole text received on every token.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_reasoning.py [--tokens 2000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from random import Random
+from typing import Any, override
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse, ModelInfo
+from services.ai_service_interface import AIServiceInterface
+
+WORDS = ["python", "code", "function", "variable", "server", "stream", "model", "token"]
+
+
+class TokenService(AIServiceInterface):
+    """Service streaming prepared tokens without delay."""
+
+    available_models = ["thinking-model"]
+    reasoning_models = ["thinking-model"]
+    provider_name = "benchmark"
+
+    def __init__(self, tokens: list[str]) -> None:
+        self.tokens = tokens
+
+    @override
+    async def chat_completion(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
+        raise NotImplementedError
+
+    @override
+    async def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
+        for token in self.tokens:
+            yield token
+
+    @override
+    def get_model_info(self) -> list[ModelInfo]:
+        return []
+
+
+def build_tokens(count: int) -> list[str]:
+    """Tokens of an answer reasoning for two thirds of its length, tags split like a model."""
+    rng = Random(42)
+    words = [" " + rng.choice(WORDS) for _ in range(count - 6)]
+    thinking = len(words) * 2 // 3
+    return ["<", "think", ">\n", *words[:thinking], "\n</", "think>\n\n", *words[thinking:]]
+
+
+async def measure(service: TokenService, model: str, reasoning: str) -> tuple[float, int]:
+    request = ChatCompletionRequest(
+        model=model,
+        messages=[{"role": "user", "content": "Hi"}],  # type: ignore[list-item]
+        reasoning=reasoning,  # type: ignore[arg-type]
+    )
+    start = time.perf_counter()
+    sent = sum([len(event) async for event in service.stream_choice(request)])
+    return time.perf_counter() - start, sent
+
+
+def client_side_split(tokens: list[str]) -> float:
+    """Times the search of the tags in the accumulated text on every token."""
+    start = time.perf_counter()
+    text = ""
+    for token in tokens:
+        text += token
+        begin, end = text.find("<think>"), text.find("</think>")
+        if begin != -1 and end > begin:
+            text[begin + 7 : end].strip()
+            (text[:begin] + text[end + 8 :]).strip()
+        elif begin != -1:
+            text[begin + 7 :].strip()
+    return time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace) -> None:
+    tokens = build_tokens(args.tokens)
+    service = TokenService(tokens)
+    scenarios = [
+        ("plain model", "other-model", "separate"),
+        ("inline", "thinking-model", "inline"),
+        ("separate", "thinking-model", "separate"),
+        ("none", "thinking-model", "none"),
+    ]
+    print(f"{'scenario':<14} {'tokens/s':>12} {'bytes sent':>11}")
+    for name, model, reasoning in scenarios:
+        results = [await measure(service, model, reasoning) for _ in range(args.repeat)]
+        elapsed = min(elapsed for elapsed, _ in results)
+        print(f"{name:<14} {len(tokens) / elapsed:>12,.0f} {results[0][1]:>11,}")
+
+    elapsed = min(client_side_split(tokens) for _ in range(args.repeat))
+    print(f"{'client split':<14} {len(tokens) / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Benchmark of the lookups of the semantic cache as it fills up.
+
+Fills the index of a model with random unit vectors, then measures the search of one
+vector, a matrix-vector product over all the entries, and the whole lookup of a request:
+the embedding of its last message by the dummy model, then the search. The search cost
+grows with the entries times the dimensions, the time per lookup is reported at each size.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_semantic_cache.py [--entries 100000]
+        [--dimensions 256] [--lookups 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse, ChatMessage
+from services.dummy_service import DummyConfig, DummyService
+from services.embeddings import embedding_batcher
+from services.providers import providers
+from services.semantic_cache import SemanticCache, SemanticIndex
+
+MODEL = "dummy-model:1.0"
+
+
+def percentiles(durations: list[float]) -> tuple[float, float]:
+    """Returns the median and the 99th percentile, in milliseconds."""
+    cuts = statistics.quantiles(durations, n=100)
+    return statistics.median(durations) * 1e3, cuts[98] * 1e3
+
+
+async def lookups(cache: SemanticCache, count: int) -> list[float]:
+    """Times the lookups of requests missing the cache, the search scanning every entry."""
+    response = ChatCompletionResponse(model=MODEL)
+
+    async def generate() -> ChatCompletionResponse:
+        return response
+
+    durations = []
+    for i in range(count):
+        request = ChatCompletionRequest(
+            model=MODEL, messages=[ChatMessage(role="user", content=f"question number {i}")]
+        )
+        start = time.perf_counter()
+        await cache.run(request, "interactive", generate)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run(max_entries: int, dimensions: int, count: int) -> None:
+    rng = np.random.default_rng(0)
+    response = ChatCompletionResponse(model=MODEL)
+    service = DummyService()
+    service.config = DummyConfig(embedding_dimensions=dimensions)
+    providers._services = [service]
+    # Each lookup is embedded alone, without waiting for a batch
+    embedding_batcher.max_wait = 0
+    cache = SemanticCache(enabled=True, embedding_model=MODEL, max_entries=max_entries * 2)
+    index = cache._indexes[MODEL] = SemanticIndex(dimensions, max_entries * 2, cache.ttl)
+
+    print(f"{'entries':>8} {'search p50':>11} {'p99':>8} {'lookup p50':>11} {'p99':>8}  (ms)")
+    size = 1000
+    while size <= max_entries:
+        vectors = rng.standard_normal((size - index.size, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for vector in vectors:
+            index.add(vector, 0, response, time.monotonic())
+
+        searches = []
+        for vector in vectors[:count]:
+            start = time.perf_counter()
+            index.search(vector, 0, 0.95, time.monotonic())
+            searches.append(time.perf_counter() - start)
+        # Every request adds its entry, removed to keep the size
+        lookup = asyncio.run(lookups(cache, count))
+        index.size = size
+
+        search_p50, search_p99 = percentiles(searches)
+        lookup_p50, lookup_p99 = percentiles(lookup)
+        print(f"{size:>8} {search_p50:>11.3f} {search_p99:>8.3f}", end=" ")
+        print(f"{lookup_p50:>11.3f} {lookup_p99:>8.3f}")
+        size *= 10
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    run(args.entries, args.dimensions, args.lookups)
@@ -0,0 +1,110 @@
+"""
+Benchmark of the state shared by the workers against the per-process dictionaries.
+
+Measures the operations per second of a cache lookup and store, a counter increment and a
+rate-limit check, first in one process, then from several processes hitting the same
+database at once, the case of the workers of a host. The per-process figures are the cost
+of the dictionaries the shared store replaces, each worker holding its own state.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_shared_state.py [--ops 20000] [--processes 4]
+        [--path /dev/shm/bench-state.db]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+from services.rate_limiter import InMemoryBucketStore, SharedBucketStore
+from services.shared_state import SharedStore
+
+KEYS = 1000
+
+
+def ops_per_second(operation: Callable[[int], object], ops: int) -> float:
+    start = time.perf_counter()
+    for i in range(ops):
+        operation(i % KEYS)
+    return ops / (time.perf_counter() - start)
+
+
+def local_operations() -> dict[str, Callable[[int], object]]:
+    cache: OrderedDict[str, bytes] = OrderedDict((f"key{i}", b"x" * 64) for i in range(KEYS))
+    counters: dict[str, int] = {}
+    buckets = InMemoryBucketStore()
+
+    def lru_get(i: int) -> object:
+        cache.move_to_end(f"key{i}")
+        return cache[f"key{i}"]
+
+    def counter(i: int) -> object:
+        counters[f"key{i}"] = counters.get(f"key{i}", 0) + 1
+        return counters[f"key{i}"]
+
+    return {
+        "get": lru_get,
+        "set": lambda i: cache.__setitem__(f"key{i}", b"x" * 64),
+        "incr": counter,
+        "rate limit": lambda i: buckets.consume(f"client{i}", 1e9, 1, 1),
+    }
+
+
+def shared_operations(path: str) -> dict[str, Callable[[int], object]]:
+    # Waits for the lock, a saturated store would otherwise fail the writes and skip the checks
+    store = SharedStore(path, busy_timeout=10)
+    buckets = SharedBucketStore(store)
+    return {
+        "get": lambda i: store.get(f"key{i}"),
+        "set": lambda i: store.set(f"key{i}", b"x" * 64),
+        "incr": lambda i: store.incr(f"counter{i}"),
+        "rate limit": lambda i: buckets.consume(f"client{i}", 1e9, 1, 1),
+    }
+
+
+def run_shared(path: str, name: str, ops: int) -> float:
+    """Runs an operation on the shared store in a worker process."""
+    return ops_per_second(shared_operations(path)[name], ops)
+
+
+def run(ops: int, processes: int, path: str) -> None:
+    store = SharedStore(path)
+    for i in range(KEYS):
+        store.set(f"key{i}", b"x" * 64)
+
+    local = local_operations()
+    shared = shared_operations(path)
+    context = multiprocessing.get_context("spawn")
+
+    print(f"{'operation':<12} {'dict':>12} {'shared':>12} {f'shared x{processes}':>14}")
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        # Starts the processes before timing them
+        list(pool.map(run_shared, [path] * processes, ["get"] * processes, [1] * processes))
+        for name in local:
+            dict_ops = ops_per_second(local[name], ops)
+            shared_ops = ops_per_second(shared[name], ops)
+            # All the processes at the same time, over the wall-clock time of the slowest
+            start = time.perf_counter()
+            list(pool.map(run_shared, [path] * processes, [name] * processes, [ops] * processes))
+            concurrent = processes * ops / (time.perf_counter() - start)
+            print(f"{name:<12} {dict_ops:>12,.0f} {shared_ops:>12,.0f} {concurrent:>14,.0f}")
+    print("operations per second")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--path", default="")
+    args = parser.parse_args()
+
+    if args.path:
+        run(args.ops, args.processes, args.path)
+    else:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            run(args.ops, args.processes, os.path.join(tmp, "state.db"))
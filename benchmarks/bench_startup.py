@@ -0,0 +1,93 @@
+"""
+Cold start of the application: import time and time to the first responses.
+
+Imports `main` with `python -X importtime` and reports the total and the slowest packages
+with their dependencies, then starts the server and measures the time until its first
+health check and its first completion answered.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_startup.py [--repeat 5] [--top 10] [--gemini]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+from load_generator import PAYLOAD, SRC_DIR, free_port, start_server, wait_until_ready
+
+
+def get_env(args: argparse.Namespace) -> dict[str, str]:
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    if args.gemini:
+        env["GEMINI_API_KEY"] = os.environ.get("GEMINI_API_KEY", "benchmark")
+    return env
+
+
+def import_main(env: dict[str, str]) -> tuple[float, Counter[str]]:
+    """Returns the import time of `main` and the cumulative import time of each package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages: Counter[str] = Counter()
+    # Lines of the form "import time:  self [us] | cumulative [us] | [indent]module"
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        # A package is imported once, the largest time of its modules includes all the others
+        package = name.strip().split(".")[0]
+        packages[package] = max(packages[package], int(cumulative) / 1e6)
+    return packages.pop("main"), packages
+
+
+async def first_responses(env: dict[str, str]) -> tuple[float, float]:
+    """Returns the seconds from the start of the server to its first health check and reply."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = start_server(port, {"GEMINI_API_KEY": env.get("GEMINI_API_KEY", "")})
+    try:
+        async with httpx.AsyncClient(timeout=60) as client:
+            await wait_until_ready(client, url, timeout=60)
+            health = time.perf_counter() - start
+            response = await client.post(f"{url}/v1/chat/completions", json=PAYLOAD)
+            response.raise_for_status()
+            completion = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return health, completion
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--gemini", action="store_true", help="configure a Gemini API key")
+    args = parser.parse_args()
+    env = get_env(args)
+
+    imports = [import_main(env) for _ in range(args.repeat)]
+    totals = [total for total, _ in imports]
+    print(f"import main: median {statistics.median(totals):.3f}s, min {min(totals):.3f}s")
+    packages = sum((packages for _, packages in imports), Counter())
+    for name, seconds in packages.most_common(args.top):
+        print(f"  {name:<24} {seconds / args.repeat:.3f}s")
+
+    responses = [asyncio.run(first_responses(env)) for _ in range(args.repeat)]
+    health = statistics.median(health for health, _ in responses)
+    completion = statistics.median(completion for _, completion in responses)
+    print(f"first health check: {health:.3f}s, first completion: {completion:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
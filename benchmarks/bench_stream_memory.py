@@ -0,0 +1,92 @@
+"""
+Memory and CPU cost of in-flight SSE streams.
+
+Opens N concurrent completion streams that are all waiting for their next token, and
+reports the memory held per active stream (tracemalloc). Then releases them for a fixed
+number of tokens each and reports the encoding time per token.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_stream_memory.py [--streams 1000 10000]
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatMessage
+from services.dummy_service import DummyService
+
+TOKENS = 50
+
+
+class GatedService(DummyService):
+    """Dummy model sending one token, then the others once the gate opens."""
+
+    def __init__(self, gate: asyncio.Event) -> None:
+        self.gate = gate
+
+    def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
+        return self._gated()
+
+    async def _gated(self) -> AsyncGenerator[str, Any]:
+        yield " first"
+        await self.gate.wait()
+        for _ in range(TOKENS - 1):
+            yield " token"
+
+
+async def run(streams: int) -> None:
+    gate = asyncio.Event()
+    service = GatedService(gate)
+    request = ChatCompletionRequest(
+        model="dummy-model:1.0", messages=[ChatMessage(role="user", content="Hello")]
+    )
+    started = 0
+    all_started = asyncio.Event()
+
+    async def consume() -> int:
+        nonlocal started
+        count = 0
+        async for _ in service.stream_choice(request):
+            count += 1
+            if count == 1:
+                started += 1
+                if started == streams:
+                    all_started.set()
+        return count
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(consume()) for _ in range(streams)]
+    await all_started.wait()
+    gc.collect()
+    active = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    gate.set()
+    counts = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    assert all(count == TOKENS + 1 for count in counts)
+    print(
+        f"{streams:>6} streams: {active / streams:8.0f} bytes per active stream, "
+        f"{elapsed / (streams * TOKENS) * 1e6:6.2f} us per token"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+    for streams in args.streams:
+        asyncio.run(run(streams))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark of the token-count cache over a growing conversation.
+
+Compares the cost of counting the whole history on every turn with and without the cache.
+Without the cache the cost per turn grows with the conversation length. With the cache
+only the new messages are tokenized on each turn, the history costs the hash of its
+messages and one lookup of its total.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_token_counter.py [--turns 400]
+"""
+
+import argparse
+import time
+from random import Random
+
+from schemas.chat_schemas import ChatMessage
+from services.token_counter import TokenCountCache, approximate_token_count
+
+WORDS = ["python", "code", "function", "variable", "server", "stream", "model", "token"]
+
+
+def build_message(rng: Random, role: str) -> ChatMessage:
+    content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 400)))
+    return ChatMessage(role=role, content=content)  # type: ignore[arg-type]
+
+
+def run(turns: int) -> None:
+    rng = Random(42)
+    cache = TokenCountCache(max_entries=turns * 2)
+    messages: list[ChatMessage] = []
+
+    print(f"{'turn':>6} {'uncached (us)':>15} {'cached (us)':>13} {'tokenized':>10}")
+    for turn in range(1, turns + 1):
+        messages.append(build_message(rng, "user"))
+        messages.append(build_message(rng, "assistant"))
+
+        start = time.perf_counter()
+        sum(approximate_token_count(message.content) for message in messages)
+        uncached = time.perf_counter() - start
+
+        # Each request decodes a fresh copy of the history, as a new HTTP payload would
+        received = [ChatMessage(m.role, m.content.encode().decode()) for m in messages]
+        misses = cache.misses
+        start = time.perf_counter()
+        cache.count_messages("model", received)
+        cached = time.perf_counter() - start
+        tokenized = cache.misses - misses
+
+        if turn == 1 or turn % (turns // 10 or 1) == 0:
+            print(f"{turn:>6} {uncached * 1e6:>15.1f} {cached * 1e6:>13.1f} {tokenized:>10}")
+
+    print(f"hits={cache.hits} misses={cache.misses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=400)
+    run(parser.parse_args().turns)
@@ -0,0 +1,71 @@
+"""
+Startup time and throughput of the production server across worker counts.
+
+Starts `src/serve.py` with the deterministic dummy model for each worker count, measures
+the time until it answers, then sends non-stream and SSE completions with a fixed
+concurrency and reports the requests per second.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_workers.py [--workers 1 2 4] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from load_generator import SRC_DIR, free_port, run_scenario, wait_until_ready
+
+
+async def run(workers: int, args: argparse.Namespace) -> None:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DUMMY_MODE": "deterministic",
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark"),
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "SERVER_WORKERS": str(workers),
+    }
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=SRC_DIR, env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            await wait_until_ready(client, url, timeout=60)
+            startup = time.perf_counter() - start
+            # Lets the other workers finish importing the application
+            await asyncio.sleep(2)
+            results = []
+            for stream in (False, True):
+                completed, errors, _ = await run_scenario(
+                    client, url, "dummy-model:1.0", stream, args.concurrency, args.duration
+                )
+                results.append(f"{completed / args.duration:8.1f} req/s ({errors} errors)")
+    finally:
+        server.terminate()
+        server.wait()
+    print(
+        f"{workers:>3} workers: ready in {startup:5.2f}s, non-stream {results[0]}, "
+        f"SSE {results[1]}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+    for workers in args.workers:
+        asyncio.run(run(workers, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from litestar.testing import TestClient
+
+# Benchmark the gateway, not the dummy model: no delay and seeded content
+os.environ.setdefault("DUMMY_MODE", "deterministic")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from main import app  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    """Synchronous test client shared by the benchmarks of a module."""
+    with TestClient(app=app) as client:
+        yield client
+
+
+@pytest.fixture
+def chat_request() -> dict[str, Any]:
+    """Multi-turn chat completion request on the dummy model."""
+    return {
+        "model": "dummy-model:1.0",
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "What is Python?"},
+            {"role": "assistant", "content": "Python is a programming language."},
+            {"role": "user", "content": "Tell me more about it."},
+        ],
+    }
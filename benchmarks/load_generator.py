@@ -0,0 +1,306 @@
+"""
+Load generator for the chat completion endpoint.
+
+Starts the API in a subprocess with the deterministic dummy model (or targets an existing
+server with --url), sends completions with a fixed concurrency for a given duration, and
+reports requests per second, time to first token and server CPU time per request for the
+non-stream and SSE paths, and for streams multiplexed over WebSocket connections.
+
+Usage:
+    PYTHONPATH=src python benchmarks/load_generator.py [--concurrency 32] [--duration 10]
+    PYTHONPATH=src python benchmarks/load_generator.py --save-baseline
+    PYTHONPATH=src python benchmarks/load_generator.py --compare [--tolerance 0.2]
+    PYTHONPATH=src python benchmarks/load_generator.py --model gemma3:1b --fake-backends
+    PYTHONPATH=src python benchmarks/load_generator.py --ws-connections 4
+
+With --fake-backends, the Ollama and Gemini models are served by the stand-in servers of
+tests/fake_backends.py, so their client paths can be measured without network.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from itertools import count
+from pathlib import Path
+from typing import Any
+
+import httpx
+from websockets.asyncio.client import ClientConnection, connect
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "load_generator.json"
+SRC_DIR = Path(__file__).parent.parent / "src"
+FAKE_BACKENDS = Path(__file__).parent.parent / "tests" / "fake_backends.py"
+
+PAYLOAD = {
+    "model": "dummy-model:1.0",
+    "messages": [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "Tell me about Python."},
+    ],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_cpu_seconds(pid: int) -> float | None:
+    """Returns the user + system CPU time of a process (Linux only)."""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def start_server(port: int, env: dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DUMMY_MODE": "deterministic",
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark"),
+        **env,
+    }
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)]
+    return subprocess.Popen(
+        [*command, "--log-level", "warning", "--no-access-log"], cwd=SRC_DIR, env=env
+    )
+
+
+def start_fake_backends(args: argparse.Namespace) -> tuple[subprocess.Popen, dict[str, str]]:
+    """Starts the fake Ollama and Gemini servers, returns the environment pointing at them."""
+    ollama_port, gemini_port = free_port(), free_port()
+    command = [sys.executable, str(FAKE_BACKENDS), "--ollama-port", str(ollama_port)]
+    command += ["--gemini-port", str(gemini_port), "--tokens-per-second", str(args.fake_tps)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ollama_url = f"http://127.0.0.1:{ollama_port}"
+    env = {
+        "OLLAMA_GEMMA3_4B_URL": ollama_url,
+        "OLLAMA_QWEN3_4B_URL": ollama_url,
+        "OLLAMA_DEEPSEEK_R1_1_5B_URL": ollama_url,
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{gemini_port}",
+    }
+    return process, env
+
+
+async def wait_until_ready(
+    client: httpx.AsyncClient, url: str, path: str = "/health", timeout: float = 10
+) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            await client.get(f"{url}{path}")
+            return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    url: str,
+    model: str,
+    stream: bool,
+    concurrency: int,
+    duration: float,
+) -> tuple[int, int, list[float]]:
+    """Sends requests until `duration` elapses, returns (completed, errors, ttfts)."""
+    payload = {**PAYLOAD, "model": model, "stream": stream}
+    deadline = time.perf_counter() + duration
+    ttfts: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    first_token = None
+                    async with client.stream(
+                        "POST", f"{url}/v1/chat/completions", json=payload
+                    ) as response:
+                        async for line in response.aiter_lines():
+                            if first_token is None and line.startswith("data:"):
+                                first_token = time.perf_counter() - start
+                    ok = response.status_code == 201 and first_token is not None
+                else:
+                    response = await client.post(f"{url}/v1/chat/completions", json=payload)
+                    first_token = time.perf_counter() - start
+                    ok = response.status_code == 201
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                ttfts.append(first_token)  # type: ignore[arg-type]
+            else:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(ttfts), errors, ttfts
+
+
+async def run_websocket_scenario(
+    url: str, model: str, concurrency: int, duration: float, connections: int
+) -> tuple[int, int, list[float]]:
+    """Like `run_scenario` for streams, multiplexed over `connections` WebSocket connections."""
+    request = {**PAYLOAD, "model": model, "stream": True}
+    deadline = time.perf_counter() + duration
+    ttfts: list[float] = []
+    errors = 0
+    ids = count()
+    # Frames of each stream, routed by the reader of its connection
+    streams: dict[str, asyncio.Queue[dict[str, Any]]] = {}
+
+    async def reader(socket: ClientConnection) -> None:
+        async for frame in socket:
+            message = json.loads(frame)
+            if message["type"] == "ping":
+                await socket.send('{"type":"pong"}')
+            elif message.get("id") in streams:
+                streams[message["id"]].put_nowait(message)
+
+    async def worker(socket: ClientConnection) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            stream_id = str(next(ids))
+            frames = streams[stream_id] = asyncio.Queue()
+            start = time.perf_counter()
+            await socket.send(
+                json.dumps({"type": "chat.completion", "id": stream_id, "request": request})
+            )
+            first_token = None
+            while (message := await frames.get())["type"] == "chunk":
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+            del streams[stream_id]
+            if message["type"] == "done" and first_token is not None:
+                ttfts.append(first_token)
+            else:
+                errors += 1
+
+    ws_url = url.replace("http", "ws", 1) + "/v1/chat/ws"
+    sockets = [await connect(ws_url, max_queue=None) for _ in range(connections)]
+    readers = [asyncio.create_task(reader(socket)) for socket in sockets]
+    try:
+        await asyncio.gather(*(worker(sockets[i % connections]) for i in range(concurrency)))
+    finally:
+        for socket in sockets:
+            await socket.close()
+        await asyncio.gather(*readers, return_exceptions=True)
+    return len(ttfts), errors, ttfts
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(fraction * 100) - 1]
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    server = backends = None
+    env: dict[str, str] = {}
+    if args.fake_backends:
+        backends, env = start_fake_backends(args)
+    url = args.url
+    if url is None:
+        # Room for all the streams sent over each WebSocket connection
+        env["WEBSOCKET_MAX_STREAMS"] = str(math.ceil(args.concurrency / args.ws_connections))
+        port = free_port()
+        server = start_server(port, env)
+        url = f"http://127.0.0.1:{port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    results: dict[str, Any] = {}
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            await wait_until_ready(client, url)
+            if backends is not None:
+                await wait_until_ready(client, env["GEMINI_BASE_URL"], "/")
+            for name in ("non_stream", "sse", "websocket"):
+                cpu_before = process_cpu_seconds(server.pid) if server else None
+                if name == "websocket":
+                    completed, errors, ttfts = await run_websocket_scenario(
+                        url, args.model, args.concurrency, args.duration, args.ws_connections
+                    )
+                else:
+                    completed, errors, ttfts = await run_scenario(
+                        client, url, args.model, name == "sse", args.concurrency, args.duration
+                    )
+                cpu_after = process_cpu_seconds(server.pid) if server else None
+
+                result = {
+                    "requests_per_second": completed / args.duration,
+                    "errors": errors,
+                    "ttft_p50_ms": percentile(ttfts, 0.5) * 1000,
+                    "ttft_p95_ms": percentile(ttfts, 0.95) * 1000,
+                    "ttft_p99_ms": percentile(ttfts, 0.99) * 1000,
+                }
+                if cpu_before is not None and cpu_after is not None and completed:
+                    result["server_cpu_ms_per_request"] = (
+                        (cpu_after - cpu_before) / completed * 1000
+                    )
+                results[name] = result
+    finally:
+        for process in (server, backends):
+            if process is not None:
+                process.terminate()
+                process.wait()
+    return results
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Returns the metrics that regressed by more than `tolerance` from the baseline."""
+    regressions = []
+    for scenario, metrics in baseline.items():
+        for metric, expected in metrics.items():
+            actual = results.get(scenario, {}).get(metric)
+            if actual is None or metric == "errors":
+                continue
+            # Throughput must not drop, latencies and CPU must not rise
+            higher_is_better = metric == "requests_per_second"
+            if higher_is_better and actual < expected * (1 - tolerance):
+                regressions.append(f"{scenario}.{metric}: {actual:.2f} < {expected:.2f}")
+            if not higher_is_better and actual > expected * (1 + tolerance):
+                regressions.append(f"{scenario}.{metric}: {actual:.2f} > {expected:.2f}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Existing server to target (CPU is not measured)")
+    parser.add_argument("--model", default=PAYLOAD["model"])
+    parser.add_argument("--fake-backends", action="store_true")
+    parser.add_argument("--fake-tps", type=float, default=0, help="Tokens/s of fake backends")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--ws-connections", type=int, default=1, help="Shared by the streams")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
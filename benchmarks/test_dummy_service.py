@@ -0,0 +1,35 @@
+"""
+Benchmarks of the dummy model used as a load generator.
+
+Usage:
+    pdm run bench benchmarks/test_dummy_service.py
+"""
+
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatMessage
+from services.dummy_service import DummyConfig, DummyService
+
+
+@pytest.fixture(scope="module")
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def test_deterministic_stream(loop: asyncio.AbstractEventLoop, benchmark) -> None:
+    """Draining a 200-token stream with no pacing: the cost of the dummy per stream."""
+    service = DummyService()
+    service.config = DummyConfig(mode="deterministic", completion_tokens=200)
+    request = ChatCompletionRequest(
+        model="dummy-model:1.0", messages=[ChatMessage(role="user", content="Hello")]
+    )
+
+    async def drain() -> int:
+        return sum([1 async for _ in service.stream_content(request)])
+
+    assert benchmark(lambda: loop.run_until_complete(drain())) == 200
@@ -0,0 +1,47 @@
+"""
+Benchmarks of the gateway overhead on the chat completion endpoint.
+
+Usage:
+    pdm run bench                                   # run and compare with the baseline
+    pdm run bench --benchmark-save=baseline         # store a new baseline
+
+`pdm run bench` fails when a mean is more than 25% slower than the latest run saved under
+benchmarks/baselines/ for the current platform. Timings are only comparable on the same
+machine, so re-record the baseline before comparing on another one.
+"""
+
+from http import HTTPStatus
+from typing import Any
+
+from litestar.testing import TestClient
+
+
+def test_chat_completion(client: TestClient, chat_request: dict[str, Any], benchmark) -> None:
+    """Full non-stream request: validation, routing, scheduling and encoding."""
+    response = benchmark(client.post, "/v1/chat/completions", json=chat_request)
+
+    assert response.status_code == HTTPStatus.CREATED
+
+
+def test_chat_completion_stream(
+    client: TestClient, chat_request: dict[str, Any], benchmark
+) -> None:
+    """Full SSE request, reading the whole stream."""
+    payload = {**chat_request, "stream": True}
+
+    response = benchmark(client.post, "/v1/chat/completions", json=payload)
+
+    assert response.text.endswith("data: [DONE]\n\n")
+
+
+def test_time_to_first_chunk(client: TestClient, chat_request: dict[str, Any], benchmark) -> None:
+    """SSE request until the first chunk is received."""
+    payload = {**chat_request, "stream": True}
+
+    def first_chunk() -> str:
+        with client.stream("POST", "/v1/chat/completions", json=payload) as response:
+            return next(response.iter_lines())
+
+    line = benchmark(first_chunk)
+
+    assert line.startswith("data:")
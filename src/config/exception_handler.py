@@ -33,4 +33,5 @@ def app_exception_handler(request: Request, exc: ExceptionType) -> Response:
             "detail": get_exception_detail(exc),
         },
         status_code=status_code,
+        headers=getattr(exc, "headers", None),
     )
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import signal
+import threading
+from functools import partial
+from types import FrameType
+
+from config.settings import SHUTDOWN_DRAIN_TIMEOUT
+from services.embeddings import embedding_batcher
+from services.idempotency import idempotency
+from services.loop_monitor import loop_monitor
+from services.providers import providers
+from services.stream_registry import stream_registry
+from services.stream_replay import stream_replay
+
+DRAIN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+logger = logging.getLogger(__name__)
+
+# Background tasks of the application, referenced until done
+_background_tasks: set[asyncio.Task] = set()
+
+
+def start_serving() -> None:
+    """
+    Accepts completions, and starts draining the streams as soon as the server is asked to stop.
+
+    The providers are imported in the background, off the event loop, so that the server
+    answers its health checks right away and the first completion rarely waits for them.
+
+    The server only runs the shutdown hooks once its connections are closed, too late to
+    end the streams cleanly. The handlers installed by the server for SIGTERM and SIGINT are
+    wrapped to start the drain first, then let the server shut down as usual.
+    """
+    # The application may be started again in the same process, by the tests for instance
+    stream_registry.accept()
+    loop_monitor.start()
+
+    warm_up = asyncio.create_task(asyncio.to_thread(providers.get_services))
+    _background_tasks.add(warm_up)
+    warm_up.add_done_callback(_background_tasks.discard)
+
+    # Signals can only be handled in the main thread, not in the test client for instance
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    loop = asyncio.get_running_loop()
+    for sig in DRAIN_SIGNALS:
+        previous = signal.getsignal(sig)
+
+        def handle(signum: int, frame: FrameType | None, previous=previous) -> None:
+            loop.call_soon_threadsafe(stream_registry.start_draining, SHUTDOWN_DRAIN_TIMEOUT)
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(sig, handle)
+
+
+async def drain_and_close() -> None:
+    """
+    Drains the streams left and closes the pooled upstream clients.
+
+    The streams are normally drained by then, unless the server did not go through the
+    signal handlers (stopped programmatically or by another server). A failed step is logged,
+    the next ones still run.
+    """
+    steps = [
+        partial(stream_registry.drain, SHUTDOWN_DRAIN_TIMEOUT),
+        # The generations kept for clients that disconnected are ended too
+        idempotency.close,
+        embedding_batcher.close,
+        stream_replay.close,
+        providers.close,
+        loop_monitor.stop,
+    ]
+    for step in steps:
+        try:
+            await step()
+        except Exception:
+            logger.exception("Shutdown step %s failed", getattr(step, "__qualname__", step))
@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -15,18 +16,205 @@ load_dotenv(dotenv_path=BASE_DIR / ".env")
 
 DEBUG = get_env_var("DEBUG", "true") == "true"
 
+# Production server (src/serve.py). Each worker is a process with its own scheduler and rate
+# limiter state, the concurrency and rate limits below apply per worker
+SERVER_HOST = get_env_var("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(get_env_var("SERVER_PORT", "8000"))
+# Number of worker processes, 0 for one per available CPU
+SERVER_WORKERS = int(get_env_var("SERVER_WORKERS", "0"))
+# Maximum number of connections waiting to be accepted
+SERVER_BACKLOG = int(get_env_var("SERVER_BACKLOG", "2048"))
+# Seconds an idle keep-alive connection stays open. Above the idle timeout of the proxy
+# connections (90s for Traefik) so that the proxy never reuses a connection being closed
+SERVER_KEEP_ALIVE = int(get_env_var("SERVER_KEEP_ALIVE", "95"))
+# Seconds given to the in-flight requests and streams to finish on shutdown (SIGTERM)
+SERVER_GRACEFUL_TIMEOUT = int(get_env_var("SERVER_GRACEFUL_TIMEOUT", "30"))
+# Seconds the streams in flight may run on shutdown before being ended with an error event,
+# below SERVER_GRACEFUL_TIMEOUT so that they end before the server cuts them
+SHUTDOWN_DRAIN_TIMEOUT = float(get_env_var("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+# Seconds without any event after which a stream in flight is reported as stalled
+STREAM_STALLED_AFTER = float(get_env_var("STREAM_STALLED_AFTER", "30"))
+
 # List of allowed origins for CORS (Cross-Origin Resource Sharing)
 CORS_ALLOWED_ORIGINS = get_env_var("CORS_ALLOWED_ORIGINS", "*").split(",")
 
-# Mapping model ID to container host
+# Mapping model ID to container hosts (comma-separated URLs for several replicas)
 OLLAMA_MODEL_HOSTS = {
-    "gemma3:1b": get_env_var("OLLAMA_GEMMA3_4B_URL", "http://localhost:11434"),
-    "qwen3:1.7b": get_env_var("OLLAMA_QWEN3_4B_URL", "http://localhost:11435"),
-    "deepseek-r1:1.5b": get_env_var("OLLAMA_DEEPSEEK_R1_1_5B_URL", "http://localhost:11436"),
+    "gemma3:1b": get_env_var("OLLAMA_GEMMA3_4B_URL", "http://localhost:11434").split(","),
+    "qwen3:1.7b": get_env_var("OLLAMA_QWEN3_4B_URL", "http://localhost:11435").split(","),
+    "deepseek-r1:1.5b": get_env_var("OLLAMA_DEEPSEEK_R1_1_5B_URL", "http://localhost:11436").split(
+        ","
+    ),
 }
 
+# Maximum number of choices (`n`) generated for one request
+MAX_CHOICES = int(get_env_var("MAX_CHOICES", "8"))
+# Maximum number of stop sequences of a request
+MAX_STOP_SEQUENCES = int(get_env_var("MAX_STOP_SEQUENCES", "4"))
+
+# Providers served. A disabled provider is never imported, the Gemini one is enabled when its
+# API key is configured
+OLLAMA_ENABLED = get_env_var("OLLAMA_ENABLED", "true") == "true"
+DUMMY_ENABLED = get_env_var("DUMMY_ENABLED", "true") == "true"
+
 # API key for the Gemini model
-GEMINI_API_KEY = get_env_var("GEMINI_API_KEY")
+GEMINI_API_KEY = get_env_var("GEMINI_API_KEY", "")
+GEMINI_ENABLED = get_env_var("GEMINI_ENABLED", "true" if GEMINI_API_KEY else "false") == "true"
+# Endpoint of the Gemini API, empty for the public one (e.g. a local stand-in for tests)
+GEMINI_BASE_URL = get_env_var("GEMINI_BASE_URL", "")
+
+# Maximum number of cached token counts (LRU eviction)
+TOKEN_CACHE_MAX_ENTRIES = int(get_env_var("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+# Token-bucket rate limiting per client (API key or IP)
+RATE_LIMIT_ENABLED = get_env_var("RATE_LIMIT_ENABLED", "false") == "true"
+RATE_LIMIT_REQUESTS_PER_SECOND = float(get_env_var("RATE_LIMIT_REQUESTS_PER_SECOND", "2"))
+RATE_LIMIT_BURST = int(get_env_var("RATE_LIMIT_BURST", "10"))
+RATE_LIMIT_TOKENS_PER_MINUTE = int(get_env_var("RATE_LIMIT_TOKENS_PER_MINUTE", "20000"))
+RATE_LIMIT_MAX_CLIENTS = int(get_env_var("RATE_LIMIT_MAX_CLIENTS", "100000"))
+# Use the first X-Forwarded-For address as client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = get_env_var("RATE_LIMIT_TRUST_FORWARDED", "false") == "true"
+
+# SQLite database sharing the rate-limit buckets between the workers of the host (WAL mode),
+# empty for a state per worker. Keep it on a local disk, a tmpfs such as /dev/shm is fastest
+SHARED_STATE_PATH = get_env_var("SHARED_STATE_PATH", "")
+# Maximum number of shared entries (LRU eviction)
+SHARED_STATE_MAX_ENTRIES = int(get_env_var("SHARED_STATE_MAX_ENTRIES", "100000"))
+# Longest wait for the database lock held by another worker, in seconds, the event loop is
+# blocked meanwhile. A rate-limit check still waiting then lets the request pass
+SHARED_STATE_BUSY_TIMEOUT = float(get_env_var("SHARED_STATE_BUSY_TIMEOUT", "0.05"))
+
+# Compression of the responses (gzip, plus brotli and zstd with the `compression` extra)
+COMPRESSION_ENABLED = get_env_var("COMPRESSION_ENABLED", "true") == "true"
+# Smallest response body compressed, in bytes
+COMPRESSION_MINIMUM_SIZE = int(get_env_var("COMPRESSION_MINIMUM_SIZE", "500"))
+COMPRESSION_GZIP_LEVEL = int(get_env_var("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(get_env_var("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(get_env_var("COMPRESSION_ZSTD_LEVEL", "3"))
+# Compress the streamed responses, flushed after each event
+COMPRESSION_STREAMS = get_env_var("COMPRESSION_STREAMS", "true") == "true"
+# Bodies from this size on are compressed in a worker thread, off the event loop
+COMPRESSION_OFFLOAD_SIZE = int(get_env_var("COMPRESSION_OFFLOAD_SIZE", "262144"))
+
+# WebSocket chat transport: heartbeat period and silence after which a connection is closed
+WEBSOCKET_PING_INTERVAL = float(get_env_var("WEBSOCKET_PING_INTERVAL", "20"))
+WEBSOCKET_IDLE_TIMEOUT = float(get_env_var("WEBSOCKET_IDLE_TIMEOUT", "60"))
+# Maximum number of concurrent completion streams on one connection
+WEBSOCKET_MAX_STREAMS = int(get_env_var("WEBSOCKET_MAX_STREAMS", "16"))
+
+# Resumable SSE streams: the events of the recent streams are kept, per worker, so that a client
+# reconnecting with Last-Event-ID receives the rest instead of starting a new generation
+STREAM_REPLAY_ENABLED = get_env_var("STREAM_REPLAY_ENABLED", "true") == "true"
+# Seconds the generation goes on after the client disconnected, waiting for it to reconnect
+STREAM_REPLAY_GRACE_PERIOD = float(get_env_var("STREAM_REPLAY_GRACE_PERIOD", "30"))
+# Seconds the events of a finished stream are kept
+STREAM_REPLAY_TTL = float(get_env_var("STREAM_REPLAY_TTL", "60"))
+# Memory for the events kept, in bytes, the oldest streams are evicted first
+STREAM_REPLAY_MAX_BYTES = int(get_env_var("STREAM_REPLAY_MAX_BYTES", "67108864"))
+
+# Idempotency-Key of the completions: seconds the result of a key is returned to its retries
+IDEMPOTENCY_TTL = float(get_env_var("IDEMPOTENCY_TTL", "600"))
+# Maximum number of keys kept in memory, per worker (LRU eviction)
+IDEMPOTENCY_MAX_KEYS = int(get_env_var("IDEMPOTENCY_MAX_KEYS", "10000"))
+# SQLite database sharing the results between the workers and restarts, empty for memory only
+IDEMPOTENCY_DB_PATH = get_env_var("IDEMPOTENCY_DB_PATH", "")
+
+# Priority classes of the scheduler and their weight in the weighted fair queuing
+SCHEDULER_PRIORITY_WEIGHTS = {
+    name: float(weight)
+    for name, weight in (
+        item.split(":")
+        for item in get_env_var("SCHEDULER_PRIORITY_WEIGHTS", "interactive:8,batch:1").split(",")
+    )
+}
+SCHEDULER_DEFAULT_PRIORITY = get_env_var("SCHEDULER_DEFAULT_PRIORITY", "interactive")
+# Priority class assigned to API keys, e.g. "batch-key:batch,ui-key:interactive"
+SCHEDULER_API_KEY_PRIORITIES = dict(
+    item.split(":", 1)
+    for item in get_env_var("SCHEDULER_API_KEY_PRIORITIES", "").split(",")
+    if item
+)
+# Maximum number of concurrent generations per backend, by provider
+SCHEDULER_MAX_CONCURRENCY = {
+    "ollama": int(get_env_var("SCHEDULER_OLLAMA_CONCURRENCY", "2")),
+    "gemini": int(get_env_var("SCHEDULER_GEMINI_CONCURRENCY", "16")),
+    "dummy": int(get_env_var("SCHEDULER_DUMMY_CONCURRENCY", "1000")),
+}
+# Maximum number of requests waiting for a slot on a backend
+SCHEDULER_MAX_QUEUE = int(get_env_var("SCHEDULER_MAX_QUEUE", "100"))
+
+# Embeddings: the concurrent requests of a model are sent to the backend together, in batches
+# of up to EMBEDDING_BATCH_MAX_SIZE inputs gathered for up to EMBEDDING_BATCH_MAX_WAIT seconds
+EMBEDDING_BATCH_MAX_SIZE = int(get_env_var("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_MAX_WAIT = float(get_env_var("EMBEDDING_BATCH_MAX_WAIT", "0.005"))
+# Maximum number of inputs of one embeddings request
+EMBEDDING_MAX_INPUTS = int(get_env_var("EMBEDDING_MAX_INPUTS", "256"))
+
+# Semantic cache of the complete (non-streamed) completions, per worker: a request whose last
+# user message is close enough to a cached one, with the same history and parameters, gets the
+# cached response. Needs numpy, installed with the `semantic-cache` extra
+SEMANTIC_CACHE_ENABLED = get_env_var("SEMANTIC_CACHE_ENABLED", "false") == "true"
+# Minimum cosine similarity of a hit, per model, e.g. "qwen3:1.7b=0.97,gemma3:1b=0.9"
+SEMANTIC_CACHE_THRESHOLD = float(get_env_var("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MODEL_THRESHOLDS = {
+    model: float(threshold)
+    for model, threshold in (
+        item.rsplit("=", 1)
+        for item in get_env_var("SEMANTIC_CACHE_MODEL_THRESHOLDS", "").split(",")
+        if item
+    )
+}
+# Model embedding the messages (served by /v1/embeddings), required to enable the cache
+SEMANTIC_CACHE_EMBEDDING_MODEL = get_env_var("SEMANTIC_CACHE_EMBEDDING_MODEL", "")
+# Maximum number of cached responses per model (oldest evicted) and their lifetime in seconds
+SEMANTIC_CACHE_MAX_ENTRIES = int(get_env_var("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+SEMANTIC_CACHE_TTL = float(get_env_var("SEMANTIC_CACHE_TTL", "3600"))
+
+# Batches of completions
+BATCH_OUTPUT_DIR = Path(
+    get_env_var("BATCH_OUTPUT_DIR", str(Path(tempfile.gettempdir()) / "ollaix-batches"))
+)
+BATCH_MAX_REQUESTS = int(get_env_var("BATCH_MAX_REQUESTS", "50000"))
+# Maximum number of batch requests in flight per provider, across all batches
+BATCH_MAX_CONCURRENCY_PER_PROVIDER = int(get_env_var("BATCH_MAX_CONCURRENCY_PER_PROVIDER", "4"))
+BATCH_PRIORITY = get_env_var("BATCH_PRIORITY", "batch")
+# Delay before retrying a batch request rejected by a saturated backend, in seconds
+BATCH_RETRY_DELAY = float(get_env_var("BATCH_RETRY_DELAY", "1"))
+# Retries of a rejected batch request before it is reported failed with its 503
+BATCH_MAX_RETRIES = int(get_env_var("BATCH_MAX_RETRIES", "60"))
+# Time a finished batch and its output file are kept, in seconds
+BATCH_RESULT_TTL = float(get_env_var("BATCH_RESULT_TTL", "86400"))
+
+# Event-loop monitor: period of the lag measurement, in seconds
+LOOP_MONITOR_INTERVAL = float(get_env_var("LOOP_MONITOR_INTERVAL", "0.05"))
+# Lag from which the loop is reported as blocked, in seconds
+LOOP_MONITOR_BLOCK_THRESHOLD = float(get_env_var("LOOP_MONITOR_BLOCK_THRESHOLD", "0.1"))
+# Capture the stack of the code blocking the loop, from a watchdog thread (debug mode default)
+LOOP_MONITOR_CAPTURE = get_env_var("LOOP_MONITOR_CAPTURE", "true" if DEBUG else "false") == "true"
+# Number of captures kept for the admin endpoint
+LOOP_MONITOR_MAX_CAPTURES = int(get_env_var("LOOP_MONITOR_MAX_CAPTURES", "50"))
+
+# Bearer token of the admin endpoints (/admin), which are disabled without one
+ADMIN_TOKEN = get_env_var("ADMIN_TOKEN", "")
+# On-demand profiles of the workers (admin endpoints): longest profile, in seconds
+PROFILE_MAX_SECONDS = float(get_env_var("PROFILE_MAX_SECONDS", "60"))
+# Period of the stack samples of the collapsed profiles, in seconds
+PROFILE_SAMPLE_INTERVAL = float(get_env_var("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# Number of profiles of single requests kept for download
+PROFILE_MAX_KEPT = int(get_env_var("PROFILE_MAX_KEPT", "20"))
+
+# Dummy model: "random" for UI development, "deterministic" for tests and benchmarks
+DUMMY_MODE = get_env_var("DUMMY_MODE", "random")
+DUMMY_TIME_TO_FIRST_TOKEN = float(get_env_var("DUMMY_TIME_TO_FIRST_TOKEN", "0"))
+DUMMY_TOKENS_PER_SECOND = float(get_env_var("DUMMY_TOKENS_PER_SECOND", "0"))
+DUMMY_COMPLETION_TOKENS = int(get_env_var("DUMMY_COMPLETION_TOKENS", "200"))
+DUMMY_SEED = int(get_env_var("DUMMY_SEED", "0"))
+# Number of distinct responses generated once for the random mode of the dummy model
+DUMMY_CORPUS_SIZE = int(get_env_var("DUMMY_CORPUS_SIZE", "32"))
+# Size of the embedding vectors of the dummy model
+DUMMY_EMBEDDING_DIMENSIONS = int(get_env_var("DUMMY_EMBEDDING_DIMENSIONS", "256"))
+# Period of the shared clock pacing the streams of the dummy model, in seconds
+DUMMY_TICK_INTERVAL = float(get_env_var("DUMMY_TICK_INTERVAL", "0.01"))
 
 # OpenAPI configuration
 openapi_config = OpenAPIConfig(
@@ -37,7 +225,10 @@ openapi_config = OpenAPIConfig(
     path="/",
     tags=[
         Tag(name="Chat", description="Chat completion endpoints with streaming support"),
+        Tag(name="Embeddings", description="Embedding vectors of texts, for search and RAG"),
+        Tag(name="Batch", description="Background processing of many chat completions"),
         Tag(name="Health", description="Health check and monitoring endpoints"),
+        Tag(name="Admin", description="Diagnostics of the running workers, behind a token"),
     ],
     render_plugins=[ScalarRenderPlugin()],
 )
@@ -1,6 +1,35 @@
-from litestar import get
+from litestar import MediaType, Response, get
+from litestar.status_codes import HTTP_503_SERVICE_UNAVAILABLE
+
+from services.metrics import registry
+from services.stream_registry import stream_registry
 
 
 @get("/health", summary="Health Check", description="Checks API health", tags=["Health"])
 async def health_check() -> dict[str, str]:
     return {"status": "healthy"}
+
+
+@get(
+    "/ready",
+    summary="Readiness Check",
+    description="Checks that the API accepts completions, fails while it shuts down",
+    tags=["Health"],
+)
+async def readiness_check() -> Response[dict[str, str]]:
+    if stream_registry.draining:
+        return Response({"status": "draining"}, status_code=HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({"status": "ready"})
+
+
+@get(
+    "/metrics",
+    summary="Metrics",
+    description="Exposes the application metrics in the Prometheus text format",
+    tags=["Health"],
+    media_type=MediaType.TEXT,
+)
+async def metrics() -> Response[str]:
+    return Response(
+        content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,91 @@
+from typing import Annotated
+
+from litestar import Response, get, post
+from litestar.controller import Controller
+from litestar.exceptions import NotFoundException
+from litestar.params import Parameter
+
+from config.settings import PROFILE_MAX_SECONDS
+from middleware.admin import admin_guard
+from schemas.admin_schemas import ActiveStreamInfo, LoopStatus
+from services.loop_monitor import loop_monitor
+from services.profiler import ProfileFormat, profiler
+from services.stream_registry import stream_registry
+
+PROFILE_MEDIA_TYPES = {"collapsed": "text/plain", "pstats": "application/octet-stream"}
+PROFILE_EXTENSIONS = {"collapsed": "txt", "pstats": "prof"}
+
+
+def profile_response(name: str, profile_format: ProfileFormat, profile: bytes) -> Response[bytes]:
+    """Returns a profile as a file to download."""
+    filename = f"{name}.{PROFILE_EXTENSIONS[profile_format]}"
+    return Response(
+        content=profile,
+        media_type=PROFILE_MEDIA_TYPES[profile_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+class AdminController(Controller):
+    path = "/admin"
+    tags = ["Admin"]
+    guards = [admin_guard]
+
+    @get(
+        "/loop",
+        summary="Event-loop lag",
+        description="Returns the event-loop lag of the worker and the blocking calls captured.",
+    )
+    async def get_loop_status(self) -> LoopStatus:
+        """Returns the lag measured by the loop monitor, with the stacks of the last blocks."""
+        return loop_monitor.status()
+
+    @get(
+        "/profile",
+        summary="Profile the worker",
+        description="Profiles the worker serving the request for a few seconds.",
+    )
+    async def profile_worker(
+        self,
+        seconds: Annotated[float, Parameter(gt=0, le=PROFILE_MAX_SECONDS)] = 10,
+        profile_format: Annotated[ProfileFormat, Parameter(query="format")] = "collapsed",
+    ) -> Response[bytes]:
+        """
+        Returns a profile of the event loop of the worker over `seconds`.
+
+        The `collapsed` format samples the stacks, for flamegraph.pl or speedscope, at a low
+        cost. The `pstats` format times every call with cProfile, for `python -m pstats` or
+        snakeviz, at the cost of slowing the worker down while it runs.
+        """
+        profile = await profiler.profile(seconds, profile_format)
+        return profile_response("profile", profile_format, profile)
+
+    @get(
+        "/profiles/{profile_id:str}",
+        summary="Get the profile of a request",
+        description="Returns the profile of a request sent with the `X-Profile` header.",
+    )
+    async def get_request_profile(self, profile_id: str) -> Response[bytes]:
+        """Returns the profile of a request, found from the `X-Profile-Id` of its response."""
+        if (kept := profiler.get(profile_id)) is None:
+            raise NotFoundException(detail=f"Profile '{profile_id}' not found.")
+        profile_format, profile = kept
+        return profile_response(profile_id, profile_format, profile)
+
+    @get(
+        "/streams",
+        summary="List the streams in flight",
+        description="Returns the completion streams running in the worker, the oldest first.",
+    )
+    async def list_streams(self) -> list[ActiveStreamInfo]:
+        """Returns the streams in flight with their model, backend, client and progress."""
+        return stream_registry.get_streams()
+
+    @post(
+        "/streams/{stream_id:str}/cancel",
+        summary="Cancel a stream",
+        description="Stops the generation of a stream, its client receives an error event.",
+    )
+    async def cancel_stream(self, stream_id: str) -> ActiveStreamInfo:
+        """Cancels a stream in flight and returns it as it was."""
+        return stream_registry.cancel(stream_id)
@@ -0,0 +1,111 @@
+from http import HTTPStatus
+from typing import Annotated
+
+import msgspec
+from litestar import get, post
+from litestar.controller import Controller
+from litestar.datastructures import UploadFile
+from litestar.enums import RequestEncodingType
+from litestar.exceptions import ValidationException
+from litestar.params import Body
+from litestar.response import File
+
+from schemas.batch_schemas import BatchCreateRequest, BatchRequestItem, BatchResponse
+from services.ai_service_interface import AIServiceInterface
+from services.batch_service import batch_service
+
+
+class BatchController(Controller):
+    path = "/batches"
+    tags = ["Batch"]
+
+    @post(
+        "/",
+        summary="Create a batch",
+        description="Runs many chat completion requests in the background.",
+    )
+    async def create_batch(
+        self,
+        data: Annotated[
+            BatchCreateRequest,
+            Body(
+                title="Batch creation request",
+                description="Chat completion requests to run, each with a custom ID.",
+            ),
+        ],
+        services: list[AIServiceInterface],
+    ) -> BatchResponse:
+        """Starts a batch from a JSON list of requests."""
+        return self._create(data.requests, services)
+
+    @post(
+        "/upload",
+        summary="Create a batch from a JSONL file",
+        description="Runs the requests of a JSONL file, one `{custom_id, body}` per line.",
+    )
+    async def upload_batch(
+        self,
+        data: Annotated[UploadFile, Body(media_type=RequestEncodingType.MULTI_PART)],
+        services: list[AIServiceInterface],
+    ) -> BatchResponse:
+        """Starts a batch from an uploaded JSONL file."""
+        items = parse_batch_file(await data.read())
+        return self._create(items, services)
+
+    @get(
+        "/{batch_id:str}",
+        summary="Get a batch",
+        description="Returns the status and progress of a batch.",
+    )
+    async def get_batch(self, batch_id: str) -> BatchResponse:
+        """Returns the progress of a batch."""
+        return batch_service.get(batch_id).to_response()
+
+    @get(
+        "/{batch_id:str}/output",
+        summary="Download batch results",
+        description="Returns the results written so far, one JSON object per line.",
+        media_type="application/jsonl",
+    )
+    async def get_batch_output(self, batch_id: str) -> File:
+        """Downloads the JSONL results of a batch."""
+        job = batch_service.get(batch_id)
+        return File(
+            path=job.output_path, filename=f"{batch_id}.jsonl", media_type="application/jsonl"
+        )
+
+    @post(
+        "/{batch_id:str}/cancel",
+        summary="Cancel a batch",
+        description="Stops a batch, the results already written stay available.",
+        status_code=HTTPStatus.OK,
+    )
+    async def cancel_batch(self, batch_id: str) -> BatchResponse:
+        """Cancels a batch in progress."""
+        return batch_service.cancel(batch_id).to_response()
+
+    def _create(
+        self,
+        items: list[BatchRequestItem],
+        services: list[AIServiceInterface],
+    ) -> BatchResponse:
+        job = batch_service.create(items, services)
+        return job.to_response()
+
+
+def parse_batch_file(content: bytes) -> list[BatchRequestItem]:
+    """
+    Parses a JSONL batch file.
+
+    Raises:
+        ValidationException: If a line is not a valid batch request.
+    """
+    items = []
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(msgspec.json.decode(line, type=BatchRequestItem))
+        except msgspec.MsgspecError as e:
+            raise ValidationException(f"Invalid request on line {line_number}: {e}") from e
+    return items
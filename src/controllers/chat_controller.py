@@ -1,17 +1,60 @@
-from typing import Annotated
+from collections.abc import AsyncGenerator
+from functools import partial
+from typing import Annotated, Any
 
-from litestar import get, post
+from litestar import Request, WebSocket, get, post, websocket
 from litestar.controller import Controller
-from litestar.exceptions import ValidationException
 from litestar.params import Body
 from litestar.response import Stream
 
+from config.settings import RATE_LIMIT_TRUST_FORWARDED
+from middleware.rate_limit import describe_client, enforce_token_limit, get_client_key
 from schemas.chat_schemas import (
     ChatCompletionRequest,
     ChatCompletionResponse,
     ModelsResponse,
 )
 from services.ai_service_interface import AIServiceInterface
+from services.chat_socket import ChatSocketSession
+from services.idempotency import idempotency
+from services.multi_completion import gather_completions, stream_completions
+from services.scheduler import get_priority_class, scheduler
+from services.semantic_cache import semantic_cache
+from services.stream_registry import stream_registry
+from services.stream_replay import stream_replay
+from services.token_counter import token_counter
+
+
+async def _generate_completion(
+    request: Request, data: ChatCompletionRequest, service: AIServiceInterface
+) -> ChatCompletionResponse | AsyncGenerator[bytes, Any]:
+    """
+    Returns the response, or the stream, of a completion request once a slot is free.
+
+    A complete response may come from the semantic cache, without waiting for a slot.
+    """
+    prompt_tokens = token_counter.count_messages(data.model, data.messages)
+    enforce_token_limit(request, prompt_tokens + (data.max_tokens or 0) * data.n)
+
+    priority = get_priority_class(request)
+    if data.stream:
+        stream = await scheduler.stream(
+            service, data.model, priority, stream_completions(service, data), cost=data.n
+        )
+        # Registered in the task running the generation, the response or its replay
+        return stream_registry.track(
+            stream,
+            model=data.model,
+            provider=service.provider_name,
+            host=service.get_backend(data.model),
+            client=describe_client(request),
+        )
+
+    async def generate() -> ChatCompletionResponse:
+        async with scheduler.slot(service, data.model, priority, cost=data.n):
+            return await gather_completions(service, data)
+
+    return await semantic_cache.run(data, priority, generate)
 
 
 class ChatController(Controller):
@@ -23,9 +66,9 @@ class ChatController(Controller):
         summary="List available models",
         description="Returns a list of all available language models from supported services.",
     )
-    async def get_available_models(self) -> ModelsResponse:
+    async def get_available_models(self, services: list[AIServiceInterface]) -> ModelsResponse:
         """Fetches all available language models from the registered AI services."""
-        return AIServiceInterface.get_all_models()
+        return AIServiceInterface.get_all_models(services)
 
     @post(
         "/chat/completions",
@@ -34,6 +77,7 @@ class ChatController(Controller):
     )
     async def chat_completion(
         self,
+        request: Request,
         data: Annotated[
             ChatCompletionRequest,
             Body(
@@ -41,54 +85,49 @@ class ChatController(Controller):
                 description="Payload containing the chat messages and model configuration.",
             ),
         ],
-        ollama_service: AIServiceInterface,
-        gemini_service: AIServiceInterface,
-        dummy_service: AIServiceInterface,
+        services: list[AIServiceInterface],
     ) -> Stream | ChatCompletionResponse:
         """
         Generates a response for a chat completion request.
 
-        Supports streaming if `stream=True` is provided in the request.
+        Supports streaming if `stream=True` is provided in the request. A stream interrupted
+        by a network failure is resumed by sending the request again with the `Last-Event-ID`
+        header set to the id of the last event received. A request sent with an
+        `Idempotency-Key` header is generated once, its retries with the same key get the
+        same response or stream.
         Automatically routes to the appropriate backend service based on the requested model.
         """
-        if not data.messages:
-            raise ValidationException("Messages list cannot be empty.")
-
-        for message in data.messages:
-            if not message.content:
-                raise ValidationException("Message content cannot be empty.")
-            if not message.role:
-                raise ValidationException("Message role cannot be empty.")
+        stream_registry.ensure_accepting()
+        last_event_id = request.headers.get("Last-Event-ID")
+        if data.stream and last_event_id:
+            # A client reconnecting after a network failure gets the rest of its stream
+            return Stream(stream_replay.resume(last_event_id))  # type: ignore
 
-        if not isinstance(data.stream, bool):
-            raise ValidationException("Stream parameter must be a boolean.")
-
-        service = self._get_service_for_model(
-            data.model, ollama_service, gemini_service, dummy_service
-        )
+        service = AIServiceInterface.get_service_for_model(data.model, services)
+        generate = partial(_generate_completion, request, data, service)
+        if idempotency_key := request.headers.get("Idempotency-Key"):
+            # A retry gets the response, or the stream, of the first request with the key
+            client_key = get_client_key(request.scope, RATE_LIMIT_TRUST_FORWARDED)
+            completion = await idempotency.run(client_key, idempotency_key, data, generate)
+        else:
+            completion = await generate()
+            if not isinstance(completion, ChatCompletionResponse):
+                completion = stream_replay.start(completion)
 
-        if data.stream:
-            return Stream(service.chat_completion_stream(data))  # type: ignore
-        return await service.chat_completion(data)
+        if isinstance(completion, ChatCompletionResponse):
+            return completion
+        return Stream(completion)  # type: ignore
 
-    def _get_service_for_model(
+    @websocket("/chat/ws")
+    async def chat_completion_socket(
         self,
-        model: str,
-        ollama_service: AIServiceInterface,
-        gemini_service: AIServiceInterface,
-        dummy_service: AIServiceInterface,
-    ) -> AIServiceInterface:
+        socket: WebSocket,
+        services: list[AIServiceInterface],
+    ) -> None:
         """
-        Determines the appropriate AI service to handle the request based on the selected model.
+        Streams chat completions over a WebSocket, several at a time on one connection.
 
-        Raises:
-            ValidationException: If the provided model is not supported by any service.
+        Each message of the client starts or cancels a stream identified by its `id`, see
+        `ChatSocketSession` for the protocol.
         """
-        if model in ollama_service.available_models:
-            return ollama_service
-        if model in gemini_service.available_models:
-            return gemini_service
-        if model in dummy_service.available_models:
-            return dummy_service
-
-        raise ValidationException(f"Model '{model}' is not available.")
+        await ChatSocketSession(socket, services).run()
@@ -0,0 +1,58 @@
+from typing import Annotated
+
+from litestar import Request, post
+from litestar.controller import Controller
+from litestar.params import Body
+
+from middleware.rate_limit import enforce_token_limit
+from schemas.embedding_schemas import Embedding, EmbeddingRequest, EmbeddingResponse
+from services.ai_service_interface import AIServiceInterface
+from services.embeddings import embedding_batcher, encode_embedding
+from services.scheduler import get_priority_class
+from services.token_counter import token_counter
+
+
+class EmbeddingController(Controller):
+    path = "/embeddings"
+    tags = ["Embeddings"]
+
+    @post(
+        "/",
+        summary="Create embeddings",
+        description="Returns the embedding vector of each input, for search and RAG.",
+    )
+    async def create_embeddings(
+        self,
+        request: Request,
+        data: Annotated[
+            EmbeddingRequest,
+            Body(
+                title="Embeddings request",
+                description="Text, or list of texts, to embed with the model.",
+            ),
+        ],
+        services: list[AIServiceInterface],
+    ) -> EmbeddingResponse:
+        """
+        Computes the embeddings of the inputs, in their order.
+
+        The concurrent requests of a model are sent to the backend together, see
+        `EmbeddingBatcher`. With `encoding_format=base64` each vector is the base64 of its
+        little-endian float32 values, a smaller response for large inputs.
+        """
+        service = AIServiceInterface.get_embedding_service(data.model, services)
+        inputs = [data.input] if isinstance(data.input, str) else data.input
+        prompt_tokens = sum(token_counter.count(data.model, text) for text in inputs)
+        enforce_token_limit(request, prompt_tokens)
+
+        vectors = await embedding_batcher.embed(
+            service, data.model, inputs, get_priority_class(request)
+        )
+        return EmbeddingResponse(
+            model=data.model,
+            data=[
+                Embedding(encode_embedding(vector, data.encoding_format), index)
+                for index, vector in enumerate(vectors)
+            ],
+            usage={"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        )
@@ -1,19 +1,43 @@
 from litestar import Litestar
 from litestar.config.cors import CORSConfig
 from litestar.exceptions import HTTPException, ImproperlyConfiguredException, ValidationException
+from litestar.middleware import DefineMiddleware
 
 from config.exception_handler import app_exception_handler
-from config.settings import CORS_ALLOWED_ORIGINS, DEBUG, openapi_config
+from config.lifecycle import drain_and_close, start_serving
+from config.settings import (
+    ADMIN_TOKEN,
+    COMPRESSION_ENABLED,
+    CORS_ALLOWED_ORIGINS,
+    DEBUG,
+    RATE_LIMIT_ENABLED,
+    openapi_config,
+)
+from middleware.compression import CompressionConfig
+from middleware.profiling import ProfilingMiddleware
+from middleware.rate_limit import RateLimitConfig
 from routes import routes
 
 cors_config = CORSConfig(allow_origins=CORS_ALLOWED_ORIGINS)
 
+middleware = []
+if ADMIN_TOKEN:
+    # Outermost, to profile a request end to end
+    middleware.append(DefineMiddleware(ProfilingMiddleware))
+if COMPRESSION_ENABLED:
+    middleware.append(CompressionConfig().middleware)
+if RATE_LIMIT_ENABLED:
+    middleware.append(RateLimitConfig().middleware)
+
 
 app = Litestar(
     route_handlers=routes,
     openapi_config=openapi_config,
     debug=DEBUG,
     cors_config=cors_config,
+    middleware=middleware,
+    on_startup=[start_serving],
+    on_shutdown=[drain_and_close],
     exception_handlers={
         HTTPException: app_exception_handler,
         ImproperlyConfiguredException: app_exception_handler,
@@ -25,4 +49,5 @@ app = Litestar(
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, workers=2)
+    # Development server, use `python src/serve.py` in production
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,37 @@
+import hmac
+
+from litestar.connection import ASGIConnection
+from litestar.datastructures import Headers
+from litestar.exceptions import NotAuthorizedException, NotFoundException
+from litestar.handlers.base import BaseRouteHandler
+
+from config.settings import ADMIN_TOKEN
+from middleware.rate_limit import get_api_key
+
+
+def is_admin(headers: Headers) -> bool:
+    """
+    Returns whether the request bears the admin token.
+
+    The token is sent in `X-Admin-Token`, or as the API key on the admin endpoints.
+    """
+    token = headers.get("x-admin-token") or get_api_key(headers)
+    return (
+        bool(ADMIN_TOKEN)
+        and token is not None
+        and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+    )
+
+
+def admin_guard(connection: ASGIConnection, _: BaseRouteHandler) -> None:
+    """
+    Lets through the requests bearing the admin token.
+
+    Raises:
+        NotFoundException: If no admin token is configured, the endpoints are disabled.
+        NotAuthorizedException: If the token is missing or wrong.
+    """
+    if not ADMIN_TOKEN:
+        raise NotFoundException()
+    if not is_admin(connection.headers):
+        raise NotAuthorizedException(detail="Invalid admin token.")
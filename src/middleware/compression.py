@@ -0,0 +1,208 @@
+import asyncio
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.middleware import AbstractMiddleware, DefineMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MINIMUM_SIZE,
+    COMPRESSION_OFFLOAD_SIZE,
+    COMPRESSION_STREAMS,
+    COMPRESSION_ZSTD_LEVEL,
+)
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, installed with the `compression` extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, installed with the `compression` extra
+    zstandard = None
+
+
+class Compressor(ABC):
+    """Compression stream of one response body."""
+
+    @abstractmethod
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        """
+        Compresses the next part of the body.
+
+        The output is flushed so that the client can decode everything sent so far, which
+        keeps the events of a stream incremental. `final` ends the compressed stream.
+        """
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality, mode=brotli.MODE_TEXT)
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        compressed = self._compressor.process(data)
+        return compressed + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        compressed = self._compressor.compress(data)
+        if final:
+            return compressed + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+        return compressed + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+def get_available_encodings() -> list[str]:
+    """Returns the supported encodings, in order of preference."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+@dataclass
+class CompressionConfig:
+    """Configuration for the response compression middleware."""
+
+    # Smallest body compressed, streams are compressed whatever their size
+    minimum_size: int = COMPRESSION_MINIMUM_SIZE
+    # Parts of a body from this size on are compressed in a worker thread
+    offload_size: int = COMPRESSION_OFFLOAD_SIZE
+    gzip_level: int = COMPRESSION_GZIP_LEVEL
+    brotli_quality: int = COMPRESSION_BROTLI_QUALITY
+    zstd_level: int = COMPRESSION_ZSTD_LEVEL
+    compress_streams: bool = COMPRESSION_STREAMS
+    encodings: list[str] = field(default_factory=get_available_encodings)
+    exclude: list[str] = field(default_factory=list)
+
+    @property
+    def middleware(self) -> DefineMiddleware:
+        """Returns the middleware definition to register on the application."""
+        return DefineMiddleware(CompressionMiddleware, config=self)
+
+    def create_compressor(self, encoding: str) -> Compressor:
+        factories: dict[str, Callable[[], Compressor]] = {
+            "gzip": lambda: GzipCompressor(self.gzip_level),
+            "br": lambda: BrotliCompressor(self.brotli_quality),
+            "zstd": lambda: ZstdCompressor(self.zstd_level),
+        }
+        return factories[encoding]()
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    """
+    Returns the encoding to use for a response, `None` to send it as is.
+
+    The encoding with the highest quality value in `Accept-Encoding` wins, ties going to
+    the first one in `encodings`.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        key, _, value = parameters.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if name:
+            qualities[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware(AbstractMiddleware):
+    """
+    Compresses the responses with the best encoding accepted by the client.
+
+    A response sent in one body message is compressed as a whole when it is large enough.
+    A streamed response is compressed message by message, each part being flushed so
+    that the client can decode the events of a stream as soon as they arrive.
+    """
+
+    def __init__(self, app: ASGIApp, config: CompressionConfig) -> None:
+        super().__init__(app=app, exclude=config.exclude, scopes={ScopeType.HTTP})
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        accept_encoding = Headers.from_scope(scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, self.config.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: Compressor | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                # The headers depend on the first part of the body
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableScopeHeaders.from_message(start)
+                if self._should_compress(headers, body, more_body):
+                    compressor = self.config.create_compressor(encoding)
+                    body = await self._compress(compressor, body, final=not more_body)
+                    headers["Content-Encoding"] = encoding
+                    headers.extend_header_value("Vary", "Accept-Encoding")
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        headers["Content-Length"] = str(len(body))
+                await send(start)
+            elif compressor is not None:
+                body = await self._compress(compressor, body, final=not more_body)
+
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, headers: MutableScopeHeaders, body: bytes, more_body: bool) -> bool:
+        if "Content-Encoding" in headers:
+            return False
+        if more_body:
+            return self.config.compress_streams
+        return len(body) >= self.config.minimum_size
+
+    async def _compress(self, compressor: Compressor, body: bytes, final: bool) -> bytes:
+        # Large bodies would block the event loop for milliseconds
+        if len(body) >= self.config.offload_size:
+            return await asyncio.to_thread(compressor.compress, body, final)
+        return compressor.compress(body, final)
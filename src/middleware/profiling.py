@@ -0,0 +1,54 @@
+from typing import get_args
+from uuid import uuid4
+
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.exceptions import HTTPException
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from middleware.admin import is_admin
+from services.profiler import ProfileFormat, profiler
+
+PROFILE_FORMATS = get_args(ProfileFormat)
+
+
+class ProfilingMiddleware(AbstractMiddleware):
+    """
+    Profiles single requests end to end, the streamed ones until their last event.
+
+    A request opts in with the `X-Profile` header set to a profile format, and the admin
+    token in `X-Admin-Token`. The response carries the id of the profile in `X-Profile-Id`,
+    the profile is downloaded from `/admin/profiles/{id}` once the response is complete.
+    The profile covers the whole worker while the request runs, concurrent requests included.
+
+    The middleware is only installed when an admin token is configured.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app=app, scopes={ScopeType.HTTP})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = Headers.from_scope(scope)
+        profile_format = headers.get("x-profile")
+        if profile_format not in PROFILE_FORMATS or not is_admin(headers):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            session = profiler.start(profile_format)
+        except HTTPException:
+            # The request is served anyway, without profile id
+            await self.app(scope, receive, send)
+            return
+        profile_id = uuid4().hex
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableScopeHeaders.from_message(message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.keep(profile_id, profile_format, profiler.stop(session))
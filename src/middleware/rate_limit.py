@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+
+from litestar.connection import ASGIConnection
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.exceptions import TooManyRequestsException
+from litestar.middleware import AbstractMiddleware, DefineMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import RATE_LIMIT_TRUST_FORWARDED
+from services.rate_limiter import RateLimiter
+
+RATE_LIMIT_STATE_KEY = "rate_limit"
+
+
+@dataclass
+class RateLimitConfig:
+    """Configuration for the token-bucket rate-limiting middleware."""
+
+    limiter: RateLimiter = field(default_factory=RateLimiter)
+    exclude: list[str] = field(default_factory=lambda: ["^/health$", "^/ready$", "^/metrics$"])
+    trust_forwarded: bool = RATE_LIMIT_TRUST_FORWARDED
+
+    @property
+    def middleware(self) -> DefineMiddleware:
+        """Returns the middleware definition to register on the application."""
+        return DefineMiddleware(RateLimitMiddleware, config=self)
+
+
+def get_api_key(headers: Headers) -> str | None:
+    """Returns the API key sent in `X-API-Key` or as a bearer token, if any."""
+    if api_key := headers.get("x-api-key"):
+        return api_key
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return None
+
+
+def get_client_key(scope: Scope, trust_forwarded: bool = False) -> str:
+    """
+    Returns the key identifying the client of a request.
+
+    The API key is used when one is sent, otherwise the client IP. Behind a reverse proxy
+    such as Traefik, `trust_forwarded` makes the first `X-Forwarded-For` address the IP.
+    """
+    headers = Headers.from_scope(scope)
+    if api_key := get_api_key(headers):
+        return f"key:{api_key}"
+    if trust_forwarded and (forwarded_for := headers.get("x-forwarded-for")):
+        return f"ip:{forwarded_for.split(',')[0].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def describe_client(connection: ASGIConnection) -> str:
+    """Returns the client of a request as listed to the administrators, its API key masked."""
+    client_key = get_client_key(connection.scope, RATE_LIMIT_TRUST_FORWARDED)
+    kind, _, value = client_key.partition(":")
+    return f"key:{value[:4]}..." if kind == "key" else client_key
+
+
+class RateLimitMiddleware(AbstractMiddleware):
+    """Rejects the requests of clients that exceed their request rate with a `429`."""
+
+    def __init__(self, app: ASGIApp, config: RateLimitConfig) -> None:
+        # A WebSocket connection counts as one request, its streams are charged tokens
+        super().__init__(
+            app=app, exclude=config.exclude, scopes={ScopeType.HTTP, ScopeType.WEBSOCKET}
+        )
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        client_key = get_client_key(scope, self.config.trust_forwarded)
+        result = self.config.limiter.check_request(client_key)
+        if not result.allowed:
+            raise TooManyRequestsException(
+                detail="Too many requests, please retry later.", headers=result.headers
+            )
+
+        scope.setdefault("state", {})[RATE_LIMIT_STATE_KEY] = (self.config.limiter, client_key)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableScopeHeaders.from_message(message)
+                for name, value in result.headers.items():
+                    # Keep the headers of a token-limit rejection raised by the handler
+                    if headers.get(name) is None:
+                        headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def enforce_token_limit(request: ASGIConnection, tokens: int) -> None:
+    """
+    Charges `tokens` to the token budget of the client of the request.
+
+    Does nothing when the rate-limiting middleware is not installed.
+
+    Raises:
+        TooManyRequestsException: If the client has exhausted its tokens per minute.
+    """
+    rate_limit: tuple[RateLimiter, str] | None = request.state.get(RATE_LIMIT_STATE_KEY)
+    if rate_limit is None:
+        return
+
+    limiter, client_key = rate_limit
+    result = limiter.check_tokens(client_key, tokens)
+    if not result.allowed:
+        raise TooManyRequestsException(
+            detail="Token rate limit exceeded, please retry later.", headers=result.headers
+        )
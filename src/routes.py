@@ -1,20 +1,19 @@
 from litestar import Router
 from litestar.di import Provide
 
-from controllers import health_check
+from controllers import health_check, metrics, readiness_check
+from controllers.admin_controller import AdminController
+from controllers.batch_controller import BatchController
 from controllers.chat_controller import ChatController
-from services.dummy_service import DummyService
-from services.gemini_service import GeminiService
-from services.ollama_service import OllamaService
+from controllers.embedding_controller import EmbeddingController
+from services.providers import provide_services
 
 chat_router = Router(
     path="/v1",
     dependencies={
-        "ollama_service": Provide(OllamaService, sync_to_thread=False),
-        "gemini_service": Provide(GeminiService, sync_to_thread=False),
-        "dummy_service": Provide(DummyService, sync_to_thread=False),
+        "services": Provide(provide_services),
     },
-    route_handlers=[ChatController],
+    route_handlers=[ChatController, EmbeddingController, BatchController],
 )
 
-routes = [health_check, chat_router]
+routes = [health_check, readiness_check, metrics, chat_router, AdminController]
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from msgspec import Struct, field
+
+
+class LoopBlock(Struct):
+    """Capture of the code blocking the event loop, taken while it was blocked."""
+
+    task: str | None
+    stack: list[str]
+    detected_at: datetime = field(default_factory=datetime.now)
+    # Delay of the loop once unblocked, in seconds, None while still blocked
+    duration: float | None = None
+
+
+class LoopStatus(Struct):
+    """Event-loop lag of the worker and the last blocking calls captured."""
+
+    lag: float
+    max_lag: float
+    blocks: int
+    captures: list[LoopBlock]
+
+
+class ActiveStreamInfo(Struct):
+    """Completion stream in flight in the worker."""
+
+    id: str
+    model: str
+    provider: str
+    host: str
+    client: str
+    started_at: datetime
+    # Seconds since the start
+    age: float
+    # Events sent, one per chunk streamed by the backend
+    events: int
+    bytes: int
+    last_event_at: datetime | None
+    # No event for STREAM_STALLED_AFTER seconds
+    stalled: bool
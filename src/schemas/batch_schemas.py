@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Literal
+
+from msgspec import Struct, field
+
+from schemas.chat_schemas import ChatCompletionRequest
+
+BatchStatus = Literal["in_progress", "completed", "failed", "cancelled"]
+
+
+class BatchRequestItem(Struct):
+    """One completion request of a batch, as found on a line of a JSONL batch file."""
+
+    custom_id: str
+    body: ChatCompletionRequest
+
+
+class BatchCreateRequest(Struct):
+    """Request for the creation of a batch of completions."""
+
+    requests: list[BatchRequestItem]
+
+
+class BatchRequestCounts(Struct):
+    """Progress of the requests of a batch."""
+
+    total: int
+    completed: int = 0
+    failed: int = 0
+
+
+class BatchResponse(Struct):
+    """State of a batch of completions."""
+
+    id: str
+    status: BatchStatus
+    request_counts: BatchRequestCounts
+    output_url: str
+    object: Literal["batch"] = "batch"
+    created: datetime = field(default_factory=datetime.now)
+    completed_at: datetime | None = None
@@ -1,33 +1,41 @@
-from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 from uuid import UUID, uuid4
 
-from litestar.dto import DataclassDTO
+from litestar.dto import MsgspecDTO
+from msgspec import Meta, Struct, field
 
+from config.settings import MAX_CHOICES, MAX_STOP_SEQUENCES
 
-@dataclass
-class ChatMessage:
+NonEmptyStr = Annotated[str, Meta(min_length=1)]
+StopSequences = Annotated[list[NonEmptyStr], Meta(min_length=1, max_length=MAX_STOP_SEQUENCES)]
+
+
+class ChatMessage(Struct, gc=False):
     """Represents a message in a conversation."""
 
     role: Literal["assistant", "user", "system"]
-    content: str
+    content: NonEmptyStr
 
 
-@dataclass
-class ChatCompletionRequest:
+class ChatCompletionRequest(Struct):
     """Request for cat completion."""
 
     model: str
-    messages: list[ChatMessage]
+    messages: Annotated[list[ChatMessage], Meta(min_length=1)]
     stream: bool = False
+    n: Annotated[int, Meta(ge=1, le=MAX_CHOICES)] = 1
     max_tokens: int | None = None
     temperature: float | None = None
     top_p: float | None = None
+    # Sequences ending the generation, not included in the content
+    stop: NonEmptyStr | StopSequences | None = None
+    # Reasoning of the thinking models: in `reasoning_content`, left inline in the content
+    # between <think> tags, or dropped
+    reasoning: Literal["separate", "inline", "none"] = "separate"
 
 
-@dataclass
-class ChatCompletionResponse:
+class ChatCompletionResponse(Struct):
     """Response from a cat completion."""
 
     id: UUID = field(default_factory=uuid4)
@@ -38,8 +46,7 @@ class ChatCompletionResponse:
     usage: dict | None = None
 
 
-@dataclass
-class ChatCompletionStreamChunk:
+class ChatCompletionStreamChunk(Struct, gc=False):
     """Data chunk for streaming."""
 
     id: UUID = field(default_factory=uuid4)
@@ -49,8 +56,7 @@ class ChatCompletionStreamChunk:
     choices: list[dict] = field(default_factory=list)
 
 
-@dataclass
-class ModelInfo:
+class ModelInfo(Struct):
     """Information on a language model."""
 
     id: str
@@ -60,22 +66,20 @@ class ModelInfo:
     context_length: int | None = None
 
 
-@dataclass
-class ModelsResponse:
+class ModelsResponse(Struct):
     """Answer containing the list of models."""
 
     object: Literal["list"] = "list"
     data: list[ModelInfo] = field(default_factory=list)
 
 
-@dataclass
-class ErrorResponse:
+class ErrorResponse(Struct):
     """Standardized error response."""
 
     error: dict[str, str]
 
 
 # DTOs for automatic validation
-ChatCompletionRequestDTO = DataclassDTO[ChatCompletionRequest]
-ChatCompletionResponseDTO = DataclassDTO[ChatCompletionResponse]
-ModelsResponseDTO = DataclassDTO[ModelsResponse]
+ChatCompletionRequestDTO = MsgspecDTO[ChatCompletionRequest]
+ChatCompletionResponseDTO = MsgspecDTO[ChatCompletionResponse]
+ModelsResponseDTO = MsgspecDTO[ModelsResponse]
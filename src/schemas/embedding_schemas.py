@@ -0,0 +1,36 @@
+from typing import Annotated, Literal
+
+from msgspec import Meta, Struct
+
+from config.settings import EMBEDDING_MAX_INPUTS
+from schemas.chat_schemas import NonEmptyStr
+
+EncodingFormat = Literal["float", "base64"]
+EmbeddingInputs = Annotated[list[NonEmptyStr], Meta(min_length=1, max_length=EMBEDDING_MAX_INPUTS)]
+
+
+class EmbeddingRequest(Struct):
+    """Request for the embeddings of one or several texts."""
+
+    model: str
+    input: NonEmptyStr | EmbeddingInputs
+    # `base64` sends each vector as its little-endian float32 bytes, about 3 times smaller
+    # than the JSON floats and cheaper to encode and parse
+    encoding_format: EncodingFormat = "float"
+
+
+class Embedding(Struct, gc=False):
+    """Embedding vector of one input."""
+
+    embedding: list[float] | str
+    index: int
+    object: Literal["embedding"] = "embedding"
+
+
+class EmbeddingResponse(Struct):
+    """Embedding vectors of the inputs, in their order."""
+
+    model: str
+    data: list[Embedding]
+    usage: dict
+    object: Literal["list"] = "list"
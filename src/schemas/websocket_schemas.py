@@ -0,0 +1,27 @@
+from msgspec import Struct
+
+from schemas.chat_schemas import ChatCompletionRequest, NonEmptyStr
+
+
+class StreamStartMessage(Struct, tag="chat.completion", tag_field="type"):
+    """Starts a completion stream, identified by `id` in the frames of the connection."""
+
+    id: NonEmptyStr
+    request: ChatCompletionRequest
+
+
+class StreamCancelMessage(Struct, tag="cancel", tag_field="type"):
+    """Stops a completion stream before its end."""
+
+    id: NonEmptyStr
+
+
+class PingMessage(Struct, tag="ping", tag_field="type"):
+    """Heartbeat, answered with a pong."""
+
+
+class PongMessage(Struct, tag="pong", tag_field="type"):
+    """Answer to a heartbeat of the server."""
+
+
+ClientMessage = StreamStartMessage | StreamCancelMessage | PingMessage | PongMessage
@@ -0,0 +1,60 @@
+"""
+Production entry point of the API.
+
+Runs uvicorn without reload, with uvloop and httptools when they are installed, one worker
+per available CPU unless SERVER_WORKERS says otherwise, and the backlog, keep-alive and
+graceful shutdown settings of the environment. On SIGTERM the server stops accepting
+connections and gives the in-flight requests and streams SERVER_GRACEFUL_TIMEOUT seconds
+to finish.
+
+Usage:
+    python src/serve.py
+"""
+
+import os
+from importlib.util import find_spec
+from typing import Any
+
+import uvicorn
+
+from config.settings import (
+    SERVER_BACKLOG,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_HOST,
+    SERVER_KEEP_ALIVE,
+    SERVER_PORT,
+    SERVER_WORKERS,
+)
+
+
+def get_worker_count(workers: int = SERVER_WORKERS) -> int:
+    """Returns the number of worker processes, one per available CPU when `workers` is 0."""
+    if workers > 0:
+        return workers
+    try:
+        # The CPUs the process may run on, fewer than the machine has in a limited container
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS and Windows
+        return os.cpu_count() or 1
+
+
+def get_server_options() -> dict[str, Any]:
+    """Returns the uvicorn options of the production server."""
+    return {
+        "host": SERVER_HOST,
+        "port": SERVER_PORT,
+        "workers": get_worker_count(),
+        "loop": "uvloop" if find_spec("uvloop") else "asyncio",
+        "http": "httptools" if find_spec("httptools") else "h11",
+        "backlog": SERVER_BACKLOG,
+        "timeout_keep_alive": SERVER_KEEP_ALIVE,
+        "timeout_graceful_shutdown": SERVER_GRACEFUL_TIMEOUT,
+    }
+
+
+def main() -> None:
+    uvicorn.run("main:app", **get_server_options())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Iterable
+from datetime import datetime
 from typing import Any
+from uuid import UUID
+
+from litestar.exceptions import ValidationException
 
 from schemas.chat_schemas import (
     ChatCompletionRequest,
@@ -8,12 +12,19 @@ from schemas.chat_schemas import (
     ModelInfo,
     ModelsResponse,
 )
+from services.reasoning import parse_reasoning
+from services.stop_sequences import get_stop_sequences, stop_at
+from services.stream_state import SSE_DONE, StreamState
 
 
 class AIServiceInterface(ABC):
     """Abstract interface for AI services."""
 
     available_models: list[str] = []
+    # Models emitting their reasoning inline, between <think> tags
+    reasoning_models: list[str] = []
+    # Models computing embeddings with `embed`
+    embedding_models: list[str] = []
     provider_name: str
 
     @abstractmethod
@@ -22,31 +33,106 @@ class AIServiceInterface(ABC):
         pass
 
     @abstractmethod
+    def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
+        """Generates the content of a completion, piece by piece."""
+        pass
+
+    async def stream_choice(
+        self,
+        request: ChatCompletionRequest,
+        index: int = 0,
+        completion_id: UUID | None = None,
+        created: datetime | None = None,
+    ) -> AsyncGenerator[bytes, Any]:
+        """Generates the events of one completion choice, ending with its finish reason."""
+        state = StreamState(request.model, index, completion_id, created)
+        stream = self.stream_content(request)
+        if request.stop:
+            stream = stop_at(stream, get_stop_sequences(request.stop))
+
+        if request.model not in self.reasoning_models or request.reasoning == "inline":
+            async for content in stream:
+                yield state.delta(content)
+            yield state.finish("stop")
+            return
+
+        keep_reasoning = request.reasoning == "separate"
+        async for is_reasoning, piece in parse_reasoning(stream):
+            if not is_reasoning:
+                yield state.delta(piece)
+            elif keep_reasoning:
+                yield state.reasoning_delta(piece)
+        yield state.finish("stop")
+
     async def chat_completion_stream(
         self, request: ChatCompletionRequest
-    ) -> AsyncGenerator[str, Any]:
+    ) -> AsyncGenerator[bytes, Any]:
         """Generates a stream of completion chat responses."""
-        pass
+        async for chunk in self.stream_choice(request):
+            yield chunk
+        yield SSE_DONE
+
+    async def embed(self, model: str, inputs: list[str]) -> list[list[float]]:
+        """
+        Returns the embedding vector of each input, in order, computed in one backend call.
+
+        Raises:
+            ValidationException: If the service computes no embeddings with the model.
+        """
+        raise ValidationException(f"Model '{model}' does not compute embeddings.")
 
     @abstractmethod
     def get_model_info(self) -> list[ModelInfo]:
         """Returns information on supported models."""
         pass
 
+    def get_backend(self, model: str) -> str:
+        """Returns the name of the backend serving the model, used to share its capacity."""
+        return self.provider_name
+
+    def get_replica_count(self, model: str) -> int:
+        """Returns the number of replicas serving the model in parallel."""
+        return 1
+
+    @staticmethod
+    def get_service_for_model(
+        model: str, services: Iterable["AIServiceInterface"]
+    ) -> "AIServiceInterface":
+        """
+        Returns the first service supporting the model.
+
+        Raises:
+            ValidationException: If the model is not supported by any service.
+        """
+        for service in services:
+            if model in service.available_models:
+                return service
+
+        raise ValidationException(f"Model '{model}' is not available.")
+
+    @staticmethod
+    def get_embedding_service(
+        model: str, services: Iterable["AIServiceInterface"]
+    ) -> "AIServiceInterface":
+        """
+        Returns the first service computing embeddings with the model.
+
+        Raises:
+            ValidationException: If no service computes embeddings with the model.
+        """
+        for service in services:
+            if model in service.embedding_models:
+                return service
+
+        raise ValidationException(f"Model '{model}' is not available for embeddings.")
+
+    async def close(self) -> None:
+        """Closes the connections of the service to its backend, if it keeps any."""
+        return None
+
     @staticmethod
-    def get_all_models() -> ModelsResponse:
-        """Returns all available models of all services."""
-        from services.dummy_service import DummyService
-        from services.gemini_service import GeminiService
-        from services.ollama_service import OllamaService
-
-        ollama_service = OllamaService()
-        gemini_service = GeminiService()
-        dummy_service = DummyService()
-
-        all_models = []
-        all_models.extend(ollama_service.get_model_info())
-        all_models.extend(gemini_service.get_model_info())
-        all_models.extend(dummy_service.get_model_info())
-
-        return ModelsResponse(data=all_models)
+    def get_all_models(services: Iterable["AIServiceInterface"]) -> ModelsResponse:
+        """Returns all available models of the services."""
+        return ModelsResponse(
+            data=[model for service in services for model in service.get_model_info()]
+        )
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import IO
+from uuid import uuid4
+
+from litestar.exceptions import (
+    HTTPException,
+    NotFoundException,
+    ServiceUnavailableException,
+    ValidationException,
+)
+from litestar.serialization import encode_json
+from msgspec.structs import replace
+
+from config.settings import (
+    BATCH_MAX_CONCURRENCY_PER_PROVIDER,
+    BATCH_MAX_REQUESTS,
+    BATCH_MAX_RETRIES,
+    BATCH_OUTPUT_DIR,
+    BATCH_PRIORITY,
+    BATCH_RESULT_TTL,
+    BATCH_RETRY_DELAY,
+)
+from schemas.batch_schemas import (
+    BatchRequestCounts,
+    BatchRequestItem,
+    BatchResponse,
+    BatchStatus,
+)
+from services.ai_service_interface import AIServiceInterface
+from services.multi_completion import gather_completions
+from services.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchJob:
+    """Batch of completions being processed in the background."""
+
+    id: str
+    output_path: Path
+    counts: BatchRequestCounts
+    status: BatchStatus = "in_progress"
+    created: datetime = field(default_factory=datetime.now)
+    completed_at: datetime | None = None
+    task: asyncio.Task[None] | None = None
+
+    def to_response(self) -> BatchResponse:
+        return BatchResponse(
+            id=self.id,
+            status=self.status,
+            request_counts=replace(self.counts),
+            output_url=f"/v1/batches/{self.id}/output",
+            created=self.created,
+            completed_at=self.completed_at,
+        )
+
+
+class BatchService:
+    """
+    Runs batches of completions through the regular services.
+
+    The requests of a batch are spread over a fixed number of workers per provider, and all
+    the batches share a per-provider limit of in-flight requests. Each result is appended to
+    the JSONL output file of the batch as soon as it is available, from a worker thread.
+
+    A finished batch, completed, failed or cancelled, is forgotten and its output file
+    deleted after `result_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path = BATCH_OUTPUT_DIR,
+        max_concurrency_per_provider: int = BATCH_MAX_CONCURRENCY_PER_PROVIDER,
+        max_retries: int = BATCH_MAX_RETRIES,
+        result_ttl: float = BATCH_RESULT_TTL,
+    ) -> None:
+        self.output_dir = output_dir
+        self.max_concurrency_per_provider = max_concurrency_per_provider
+        self.max_retries = max_retries
+        self.result_ttl = result_ttl
+        self._jobs: dict[str, BatchJob] = {}
+        self._provider_limits: dict[str, asyncio.Semaphore] = {}
+
+    def create(
+        self, items: list[BatchRequestItem], services: Iterable[AIServiceInterface]
+    ) -> BatchJob:
+        """
+        Validates the requests of a batch and starts processing it in the background.
+
+        Raises:
+            ValidationException: If the batch is empty, too large, or uses an unknown model.
+        """
+        if not items:
+            raise ValidationException("Batch cannot be empty.")
+        if len(items) > BATCH_MAX_REQUESTS:
+            raise ValidationException(
+                f"Batch cannot contain more than {BATCH_MAX_REQUESTS} requests."
+            )
+
+        services = list(services)
+        work: dict[str, list[tuple[BatchRequestItem, AIServiceInterface]]] = defaultdict(list)
+        for item in items:
+            service = AIServiceInterface.get_service_for_model(item.body.model, services)
+            work[service.provider_name].append((item, service))
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        batch_id = f"batch_{uuid4().hex}"
+        job = BatchJob(
+            id=batch_id,
+            output_path=self.output_dir / f"{batch_id}.jsonl",
+            counts=BatchRequestCounts(total=len(items)),
+        )
+        # The output can be downloaded as soon as the batch exists, before anything is written
+        job.output_path.touch()
+        self._jobs[batch_id] = job
+        job.task = asyncio.create_task(self._run(job, work))
+        job.task.add_done_callback(lambda _: self._expire_later(job))
+        return job
+
+    def get(self, batch_id: str) -> BatchJob:
+        """
+        Returns a batch.
+
+        Raises:
+            NotFoundException: If the batch does not exist.
+        """
+        job = self._jobs.get(batch_id)
+        if job is None:
+            raise NotFoundException(f"Batch '{batch_id}' not found.")
+        return job
+
+    def cancel(self, batch_id: str) -> BatchJob:
+        """Stops a batch, the results already written stay available."""
+        job = self.get(batch_id)
+        if job.status == "in_progress" and job.task is not None:
+            job.task.cancel()
+            job.status = "cancelled"
+            job.completed_at = datetime.now()
+        return job
+
+    def _expire_later(self, job: BatchJob) -> None:
+        asyncio.get_running_loop().call_later(self.result_ttl, self._expire, job)
+
+    def _expire(self, job: BatchJob) -> None:
+        """Forgets a finished batch and deletes its output file."""
+        self._jobs.pop(job.id, None)
+        asyncio.get_running_loop().run_in_executor(
+            None, partial(job.output_path.unlink, missing_ok=True)
+        )
+
+    async def _run(
+        self, job: BatchJob, work: dict[str, list[tuple[BatchRequestItem, AIServiceInterface]]]
+    ) -> None:
+        try:
+            output = await asyncio.to_thread(job.output_path.open, "wb")
+            try:
+                async with asyncio.TaskGroup() as task_group:
+                    for provider, provider_work in work.items():
+                        pending = iter(provider_work)
+                        workers = min(self.max_concurrency_per_provider, len(provider_work))
+                        for _ in range(workers):
+                            task_group.create_task(self._worker(job, provider, pending, output))
+            finally:
+                await asyncio.to_thread(output.close)
+        except Exception:
+            logger.exception("Batch %s failed", job.id)
+            job.status = "failed"
+        else:
+            job.status = "completed"
+        job.completed_at = datetime.now()
+
+    async def _worker(
+        self,
+        job: BatchJob,
+        provider: str,
+        pending: Iterator[tuple[BatchRequestItem, AIServiceInterface]],
+        output: IO[bytes],
+    ) -> None:
+        limit = self._provider_limits.setdefault(
+            provider, asyncio.Semaphore(self.max_concurrency_per_provider)
+        )
+        for item, service in pending:
+            async with limit:
+                result = await self._complete(item, service)
+
+            if result["error"] is None:
+                job.counts.completed += 1
+            else:
+                job.counts.failed += 1
+            await asyncio.to_thread(_append, output, encode_json(result) + b"\n")
+
+    async def _complete(self, item: BatchRequestItem, service: AIServiceInterface) -> dict:
+        request = replace(item.body, stream=False)
+        result: dict = {"id": f"batch_req_{uuid4().hex}", "custom_id": item.custom_id}
+        try:
+            for retry in range(self.max_retries + 1):
+                try:
+                    async with scheduler.slot(
+                        service, request.model, BATCH_PRIORITY, cost=request.n
+                    ):
+                        response = await gather_completions(service, request)
+                    break
+                except ServiceUnavailableException:
+                    # Evicted by interactive traffic or backend saturated, batches can wait
+                    if retry == self.max_retries:
+                        raise
+                    await asyncio.sleep(BATCH_RETRY_DELAY)
+            result.update(response={"status_code": 200, "body": response}, error=None)
+        except HTTPException as e:
+            result.update(response=None, error={"code": e.status_code, "message": e.detail})
+        except Exception as e:
+            logger.exception("Batch request %s failed", item.custom_id)
+            result.update(response=None, error={"code": 500, "message": str(e)})
+        return result
+
+
+def _append(output: IO[bytes], line: bytes) -> None:
+    output.write(line)
+    output.flush()
+
+
+batch_service = BatchService()
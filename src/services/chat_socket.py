@@ -0,0 +1,186 @@
+import asyncio
+import logging
+
+import msgspec
+from litestar import WebSocket
+from litestar.exceptions import HTTPException, TooManyRequestsException
+
+from config.exception_handler import get_exception_detail, get_http_status_code
+from config.settings import WEBSOCKET_IDLE_TIMEOUT, WEBSOCKET_MAX_STREAMS, WEBSOCKET_PING_INTERVAL
+from middleware.rate_limit import describe_client, enforce_token_limit
+from schemas.chat_schemas import ChatCompletionRequest
+from schemas.websocket_schemas import (
+    ClientMessage,
+    PingMessage,
+    StreamCancelMessage,
+    StreamStartMessage,
+)
+from services.ai_service_interface import AIServiceInterface
+from services.multi_completion import stream_completions
+from services.scheduler import get_priority_class, scheduler
+from services.stream_registry import stream_registry
+from services.stream_state import SSE_DONE
+from services.token_counter import token_counter
+
+logger = logging.getLogger(__name__)
+
+_decoder = msgspec.json.Decoder(ClientMessage)
+_encoder = msgspec.json.Encoder()
+
+PING_FRAME = b'{"type":"ping"}'
+PONG_FRAME = b'{"type":"pong"}'
+# Close code of a connection silent for longer than the idle timeout (going away)
+IDLE_CLOSE_CODE = 1001
+
+
+class ChatSocketSession:
+    """
+    Completion streams multiplexed over one WebSocket connection.
+
+    The client starts streams with `{"type": "chat.completion", "id": ..., "request": ...}`
+    and stops them with `{"type": "cancel", "id": ...}`. Each stream runs in its own task
+    through the same scheduler and provider generators as the SSE endpoint, and its chunks
+    are sent as `{"type": "chunk", "id": ..., "data": <chunk>}` frames, followed by a
+    `done`, `cancelled` or `error` frame.
+
+    The server sends a `ping` frame every `WEBSOCKET_PING_INTERVAL` seconds and closes the
+    connection when the client sends nothing, pongs included, for `WEBSOCKET_IDLE_TIMEOUT`.
+    """
+
+    def __init__(self, socket: WebSocket, services: list[AIServiceInterface]) -> None:
+        self.socket = socket
+        self.services = services
+        self.streams: dict[str, asyncio.Task[None]] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        """Serves the connection until the client leaves or stays idle for too long."""
+        await self.socket.accept()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        idle = False
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(WEBSOCKET_IDLE_TIMEOUT):
+                        message = await self.socket.receive()
+                except TimeoutError:
+                    idle = True
+                    break
+                if message["type"] == "websocket.disconnect":
+                    break
+                await self._handle(message.get("text") or message.get("bytes") or b"")
+        finally:
+            tasks = [heartbeat, *self.streams.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if idle:
+            await self.socket.close(code=IDLE_CLOSE_CODE, reason="Idle timeout")
+
+    async def _handle(self, data: str | bytes) -> None:
+        try:
+            message = _decoder.decode(data)
+        except msgspec.DecodeError as e:
+            await self._send_error(None, HTTPException(status_code=422, detail=str(e)))
+            return
+
+        match message:
+            case StreamStartMessage():
+                await self._start(message)
+            case StreamCancelMessage():
+                await self._cancel(message.id)
+            case PingMessage():
+                await self._send(PONG_FRAME)
+            # A pong only keeps the connection alive
+
+    async def _start(self, message: StreamStartMessage) -> None:
+        try:
+            stream_registry.ensure_accepting()
+        except HTTPException as e:
+            await self._send_error(message.id, e)
+            return
+
+        if message.id in self.streams:
+            await self._send_error(
+                message.id,
+                HTTPException(status_code=409, detail=f"Stream '{message.id}' already exists."),
+            )
+        elif len(self.streams) >= WEBSOCKET_MAX_STREAMS:
+            await self._send_error(
+                message.id,
+                TooManyRequestsException(detail="Too many streams on this connection."),
+            )
+        else:
+            self.streams[message.id] = asyncio.create_task(
+                self._stream(message.id, message.request)
+            )
+
+    async def _cancel(self, stream_id: str) -> None:
+        task = self.streams.pop(stream_id, None)
+        # The stream may have ended before the cancellation reached the server
+        if task is None:
+            return
+        task.cancel()
+        # Waits for the backend slot to be released before acknowledging
+        await asyncio.gather(task, return_exceptions=True)
+        await self._send(self._frame("cancelled", stream_id))
+
+    async def _stream(self, stream_id: str, request: ChatCompletionRequest) -> None:
+        prefix = b'{"type":"chunk","id":' + _encoder.encode(stream_id) + b',"data":'
+        try:
+            service = AIServiceInterface.get_service_for_model(request.model, self.services)
+            prompt_tokens = token_counter.count_messages(request.model, request.messages)
+            enforce_token_limit(self.socket, prompt_tokens + (request.max_tokens or 0) * request.n)
+
+            stream = await scheduler.stream(
+                service,
+                request.model,
+                get_priority_class(self.socket),
+                stream_completions(service, request),
+                cost=request.n,
+            )
+            # Drained and listed like the SSE streams, ended by an `error` frame
+            stream = stream_registry.track(
+                stream,
+                model=request.model,
+                provider=service.provider_name,
+                host=service.get_backend(request.model),
+                client=describe_client(self.socket),
+                raise_error=True,
+            )
+            async for chunk in stream:
+                if chunk != SSE_DONE:
+                    # The JSON chunk of the `data: ...\n\n` event is sent as is
+                    await self._send(b"".join((prefix, chunk[6:-2], b"}")))
+            await self._send(self._frame("done", stream_id))
+        except Exception as e:
+            if not isinstance(e, HTTPException):
+                logger.exception("Stream %s failed", stream_id)
+            await self._send_error(stream_id, e)
+        finally:
+            if self.streams.get(stream_id) is asyncio.current_task():
+                del self.streams[stream_id]
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(WEBSOCKET_PING_INTERVAL)
+            await self._send(PING_FRAME)
+
+    async def _send_error(self, stream_id: str | None, exc: Exception) -> None:
+        if isinstance(exc, HTTPException):
+            error = {
+                "status_code": get_http_status_code(exc),
+                "detail": get_exception_detail(exc),
+            }
+        else:
+            error = {"status_code": 500, "detail": "Internal Server Error"}
+        await self._send(_encoder.encode({"type": "error", "id": stream_id, "error": error}))
+
+    async def _send(self, frame: bytes) -> None:
+        # The streams of the connection send concurrently, one frame at a time
+        async with self._send_lock:
+            await self.socket.send_data(frame)
+
+    @staticmethod
+    def _frame(kind: str, stream_id: str) -> bytes:
+        return _encoder.encode({"type": kind, "id": stream_id})
@@ -1,16 +1,503 @@
-import json
-from asyncio import sleep
+from asyncio import Future, get_running_loop, shield, sleep
 from collections.abc import AsyncGenerator
-from random import choice, randint, random
-from typing import Any, override
-
+from dataclasses import dataclass
+from functools import cache
+from random import Random, choice
+from typing import Any, Literal, override
+
+from config.settings import (
+    DUMMY_COMPLETION_TOKENS,
+    DUMMY_CORPUS_SIZE,
+    DUMMY_EMBEDDING_DIMENSIONS,
+    DUMMY_MODE,
+    DUMMY_SEED,
+    DUMMY_TICK_INTERVAL,
+    DUMMY_TIME_TO_FIRST_TOKEN,
+    DUMMY_TOKENS_PER_SECOND,
+)
 from schemas.chat_schemas import (
     ChatCompletionRequest,
     ChatCompletionResponse,
-    ChatCompletionStreamChunk,
     ModelInfo,
 )
 from services.ai_service_interface import AIServiceInterface
+from services.embeddings import hash_embedding
+from services.token_counter import token_counter
+
+WORDS = [
+    "lorem",
+    "ipsum",
+    "dolor",
+    "sit",
+    "amet",
+    "consectetur",
+    "adipiscing",
+    "elit",
+    "sed",
+    "do",
+    "eiusmod",
+    "tempor",
+    "incididunt",
+    "ut",
+    "labore",
+    "et",
+    "dolore",
+    "magna",
+    "aliqua",
+    "enim",
+    "ad",
+    "minim",
+    "veniam",
+    "quis",
+    "nostrud",
+    "exercitation",
+    "ullamco",
+    "laboris",
+    "nisi",
+    "aliquip",
+    "ex",
+    "ea",
+    "commodo",
+    "consequat",
+    "duis",
+    "aute",
+    "irure",
+    "in",
+    "reprehenderit",
+    "voluptate",
+    "velit",
+    "esse",
+    "cillum",
+    "fugiat",
+    "nulla",
+    "pariatur",
+    "excepteur",
+    "sint",
+    "occaecat",
+    "cupidatat",
+    "non",
+    "proident",
+    "sunt",
+    "culpa",
+    "qui",
+    "officia",
+    "deserunt",
+    "mollit",
+    "anim",
+    "id",
+    "est",
+    "laborum",
+    "solution",
+    "problème",
+    "méthode",
+    "exemple",
+    "important",
+    "noter",
+    "voici",
+    "comment",
+    "fonction",
+    "variable",
+    "classe",
+    "objet",
+    "données",
+    "résultat",
+    "algorithme",
+    "code",
+]
+
+TECH_WORDS = [
+    "Python",
+    "JavaScript",
+    "React",
+    "Django",
+    "FastAPI",
+    "API",
+    "REST",
+    "JSON",
+    "database",
+    "SQL",
+    "NoSQL",
+    "MongoDB",
+    "PostgreSQL",
+    "Redis",
+    "Docker",
+    "Kubernetes",
+    "microservices",
+    "authentication",
+    "authorization",
+    "JWT",
+    "HTTP",
+    "HTTPS",
+    "SSL",
+    "TLS",
+    "encryption",
+    "hash",
+    "algorithm",
+    "framework",
+]
+CODE_EXAMPLES = [
+    "```python\ndef example_function():\n    return 'Hello World'\n```",
+    "```js\nconst data = await fetch('/api/endpoint');\nconst result = await data.json();\n```",  # noqa: E501
+    "```sql\nSELECT * FROM users WHERE active = true;\n```",
+    "```bash\nnpm install package-name\npip install requirements.txt\n```",
+    "```\nnpm install package-name\npip install requirements.txt\n```",
+    '```json\n{\n  "status": "success",\n  "data": []\n}\n```',
+    "![1](https://github.com/user-attachments/assets/382225ab-abdc-49ad-8497-d3d5b5c7043a)",  # noqa: E501
+    "![2](https://github.com/user-attachments/assets/d9e53e85-0f06-4c80-826e-8a69d26bcc7a)",  # noqa: E501
+    "![3](https://github.com/user-attachments/assets/48dabfe0-18e3-4d04-b526-9667772aefd1)",  # noqa: E501
+]
+HEADINGS = [
+    "## Solution proposée",
+    "## Explication détaillée",
+    "## Exemple pratique",
+    "## Points importants",
+    "## Configuration requise",
+    "## Étapes à suivre",
+    "### Méthode 1",
+    "### Méthode 2",
+    "### Alternative",
+    "### Remarque importante",
+]
+MARKDOWN_ELEMENTS = [
+    "**important**",
+    "*essentiel*",
+    "`variable`",
+    "`fonction()`",
+    "`class MyClass`",
+    "[documentation](https://example.com)",
+    "> Cette approche est recommandée",
+    "> **Note:** Il faut faire attention à",
+]
+LIST_ITEMS = [
+    "- Premier point à considérer",
+    "- Deuxième élément important",
+    "- Troisième aspect essentiel",
+    "1. Première étape",
+    "2. Deuxième étape",
+    "3. Troisième étape",
+]
+
+THINKING_WORDS = [
+    "analyser",
+    "considérer",
+    "évaluer",
+    "examiner",
+    "réfléchir",
+    "comprendre",
+    "déterminer",
+    "identifier",
+    "explorer",
+    "investigation",
+    "approche",
+    "méthode",
+    "solution",
+    "problème",
+    "question",
+    "aspect",
+    "élément",
+    "facteur",
+    "paramètre",
+    "contexte",
+    "situation",
+    "cas",
+    "scénario",
+    "possibilité",
+    "option",
+    "alternative",
+    "conséquence",
+    "résultat",
+    "impact",
+    "effet",
+    "influence",
+    "importance",
+    "pertinence",
+]
+
+# Structural elements are sent whole and followed by a longer pause
+STRUCTURAL_PREFIXES = ("```", "#", "-", ">", "1.", "2.", "3.", "4.", "5.")
+# Pace and delay before the first chunk of the random mode
+CHUNK_DELAY = 0.02
+RANDOM_TIME_TO_FIRST_TOKEN = 1.5
+
+
+@dataclass(frozen=True)
+class DummyConfig:
+    """
+    Behaviour of the dummy model.
+
+    The `random` mode imitates a real model for UI development, with variable content and
+    pacing. The `deterministic` mode produces the same seeded content at a fixed pace, to
+    benchmark the gateway itself: no delay at all with the default settings.
+    """
+
+    mode: Literal["random", "deterministic"] = DUMMY_MODE
+    time_to_first_token: float = DUMMY_TIME_TO_FIRST_TOKEN
+    # 0 sends the tokens as fast as possible
+    tokens_per_second: float = DUMMY_TOKENS_PER_SECOND
+    completion_tokens: int = DUMMY_COMPLETION_TOKENS
+    seed: int = DUMMY_SEED
+    embedding_dimensions: int = DUMMY_EMBEDDING_DIMENSIONS
+
+
+@dataclass(frozen=True, slots=True)
+class DummyResponse:
+    """Pre-chunked response, with the time each chunk is sent at from the first one."""
+
+    chunks: tuple[str, ...]
+    schedule: tuple[float, ...]
+    content: str
+
+
+class Ticker:
+    """
+    Clock waking all the paced streams of the event loop together, once per tick.
+
+    A stream waiting for its next chunk waits for the next tick, then sends every chunk due
+    by then: a single timer per tick serves all the streams, instead of one sleep per chunk
+    and per stream. The chunks are late by up to one interval.
+    """
+
+    def __init__(self, interval: float = DUMMY_TICK_INTERVAL) -> None:
+        self.interval = interval
+        self.ticks = 0
+        self._tick: Future[None] | None = None
+
+    async def wait(self) -> None:
+        """Waits for the next tick."""
+        loop = get_running_loop()
+        if self._tick is None or self._tick.get_loop() is not loop:
+            self._tick = loop.create_future()
+            loop.call_later(self.interval, self._fire, self._tick)
+        # A cancelled stream must not cancel the tick of the others
+        await shield(self._tick)
+
+    def _fire(self, tick: Future[None]) -> None:
+        self.ticks += 1
+        if self._tick is tick:
+            self._tick = None
+        tick.set_result(None)
+
+
+ticker = Ticker()
+
+
+@cache
+def get_corpus(seed: int, size: int = DUMMY_CORPUS_SIZE) -> tuple[DummyResponse, ...]:
+    """Returns the seeded responses of the random mode, generated on first use."""
+    rng = Random(seed)
+    return tuple(_build_random_response(rng) for _ in range(size))
+
+
+@cache
+def get_deterministic_response(config: DummyConfig) -> DummyResponse:
+    """Returns the seeded response of the deterministic mode, generated on first use."""
+    rng = Random(config.seed)
+    tokens = [rng.choice(WORDS).capitalize()]
+    tokens.extend(" " + rng.choice(WORDS) for _ in range(config.completion_tokens - 1))
+    interval = 1 / config.tokens_per_second if config.tokens_per_second else 0
+    return DummyResponse(
+        chunks=tuple(tokens),
+        schedule=tuple(index * interval for index in range(len(tokens))),
+        content="".join(tokens),
+    )
+
+
+def _build_random_response(rng: Random) -> DummyResponse:
+    """Cuts a random response into chunks, long texts being sent 10 characters at a time."""
+    chunks: list[str] = []
+    schedule: list[float] = []
+    at = 0.0
+    for block in _generate_random_blocks(rng):
+        for chunk in block:
+            if chunk.startswith(STRUCTURAL_PREFIXES):
+                pieces, pause = [chunk], CHUNK_DELAY * 2
+            elif len(chunk) > 50:
+                pieces, pause = [chunk[i : i + 10] for i in range(0, len(chunk), 10)], CHUNK_DELAY
+            else:
+                pieces, pause = [chunk], CHUNK_DELAY
+            for piece in pieces:
+                chunks.append(piece)
+                schedule.append(at)
+                at += pause
+    return DummyResponse(tuple(chunks), tuple(schedule), "".join(chunks))
+
+
+def _generate_random_blocks(rng: Random) -> list[list[str]]:
+    """Generates a markdown response made of thinking, paragraphs, code, lists and headings."""
+    word_count = rng.choice(range(150, 200))
+
+    # Content structure
+    content_blocks = []
+    current_block = []
+    words_generated = 0
+
+    thinking_block = ["<think> "]
+    for paragraph in range(3):
+        # Generate 3 lines per paragraph
+        paragraph_lines = []
+        for _line in range(3):
+            line_words = []
+            for _ in range(rng.randint(6, 10)):
+                word = rng.choice(THINKING_WORDS) if rng.random() < 0.3 else rng.choice(WORDS)
+                if len(line_words) == 0:
+                    word = word.capitalize()
+
+                line_words.append(word)
+
+            # Construct line with comma
+            line_text = " ".join(line_words) + ","
+            paragraph_lines.append(line_text)
+
+        # Join the 3 lines of the paragraph with spaces
+        paragraph_text = " ".join(paragraph_lines)
+
+        # Replace the last comma with a period and add space
+        if paragraph < 2:
+            paragraph_text = paragraph_text[:-1] + ". \n\n"
+        else:
+            paragraph_text = paragraph_text[:-1] + "."
+
+        thinking_block.append(paragraph_text)
+
+    thinking_block.append(" </think>\n\n")
+    content_blocks.append(thinking_block)
+    words_generated += 60
+
+    while words_generated < word_count:
+        # Decide what type of content to generate (40% chance for code blocks)
+        content_type = rng.choice(
+            [
+                "paragraph",
+                "text",
+                "heading",
+                "code",
+                "code",
+                "code",
+                "code",
+                "code",
+                "markdown",
+                "markdown",
+                "markdown",
+                "list",
+                "linebreak",
+                "linebreak",
+            ]
+        )
+
+        if content_type == "paragraph" and rng.random() < 0.6:
+            # Générer un paragraphe de 70 mots
+            if current_block:
+                content_blocks.append(current_block)
+                current_block = []
+
+            paragraph_block = []
+            paragraph_words = 0
+            target_words = 70
+
+            while paragraph_words < target_words and words_generated < word_count:
+                word = rng.choice(TECH_WORDS) if rng.random() < 0.1 else rng.choice(WORDS)
+
+                # Capitalize on the first word of the paragraph
+                if paragraph_words == 0:
+                    word = word.capitalize()
+
+                # Add internal punctuation to paragraphs
+                if (
+                    paragraph_words > 0
+                    and paragraph_words < target_words - 5
+                    and rng.random() < 0.12
+                ):
+                    punctuation = rng.choice([", ", ". "])
+                    if punctuation == ". ":
+                        paragraph_block.append(punctuation)
+                        word = word.capitalize()
+                    else:
+                        paragraph_block.append(punctuation)
+
+                paragraph_block.append(word + " ")
+                paragraph_words += 1
+                words_generated += 1
+
+            # End the paragraph with a period
+            if paragraph_block and not paragraph_block[-1].rstrip().endswith((".", "!", "?")):
+                paragraph_block[-1] = paragraph_block[-1].rstrip() + "."
+
+            # Double saut de ligne après le paragraphe
+            paragraph_block.append("\n\n")
+            content_blocks.append(paragraph_block)
+
+        elif content_type == "heading" and rng.random() < 0.3:
+            if current_block:
+                content_blocks.append(current_block)
+                current_block = []
+            heading = rng.choice(HEADINGS)
+            content_blocks.append(["\n\n", heading, "\n\n"])
+            words_generated += len(heading.split())
+
+        elif content_type == "code" and rng.random() < 0.2:
+            if current_block:
+                content_blocks.append(current_block)
+                current_block = []
+            code = rng.choice(CODE_EXAMPLES)
+            content_blocks.append(["\n\n", code, "\n\n"])
+            # Approximation for code
+            words_generated += 10
+
+        elif content_type == "list" and rng.random() < 0.25:
+            if current_block and len(current_block) > 5:
+                content_blocks.append(current_block)
+                current_block = []
+            # Generate a list of 2-4 items
+            list_size = rng.randint(2, 4)
+            list_block = ["\n\n"]
+            for _ in range(list_size):
+                item = rng.choice(LIST_ITEMS)
+                list_block.extend([item, "\n"])
+                words_generated += len(item.split())
+            list_block.append("\n")
+            content_blocks.append(list_block)
+
+        elif content_type == "linebreak" and rng.random() < 0.15:
+            current_block.append("\n\n")
+
+        elif content_type == "markdown" and rng.random() < 0.2:
+            element = rng.choice(MARKDOWN_ELEMENTS)
+            current_block.append(element + " ")
+            words_generated += len(element.split())
+
+        else:
+            word = rng.choice(TECH_WORDS) if rng.random() < 0.1 else rng.choice(WORDS)
+
+            # Capitalize on the first word of the block
+            if not current_block or (
+                current_block and current_block[-1].endswith((".", "!", "?", "\n"))
+            ):
+                word = word.capitalize()
+
+            # Add punctuation
+            if words_generated > 0 and rng.random() < 0.15:
+                punctuation = rng.choice([", ", ". ", "! ", "? "])
+                if punctuation in [". ", "! ", "? "]:
+                    current_block.append(punctuation)
+                    word = word.capitalize()
+                else:
+                    current_block.append(punctuation)
+
+            current_block.append(word + " ")
+            words_generated += 1
+
+            # Limit the size of text blocks
+            if len(current_block) > 30:
+                content_blocks.append(current_block)
+                current_block = []
+
+    # Add last block
+    if current_block:
+        if current_block and not current_block[-1].rstrip().endswith((".", "!", "?")):
+            current_block[-1] = current_block[-1].rstrip() + "."
+        content_blocks.append(current_block)
+
+    return content_blocks
 
 
 class DummyService(AIServiceInterface):
@@ -20,18 +507,31 @@ class DummyService(AIServiceInterface):
     """
 
     available_models = ["dummy-model:1.0"]
+    embedding_models = available_models
     provider_name = "dummy"
+    config = DummyConfig()
 
     @override
     async def chat_completion(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
         if request.model not in self.available_models:
             raise ValueError(f"Modèle '{request.model}' non disponible pour DummyService")
 
-        # Simulate a delay for the non-streamed response
-        await sleep(2)
-
-        # Generate random content
-        content = self._generate_dummy_content(word_count=100)
+        if self.config.mode == "deterministic":
+            response = get_deterministic_response(self.config)
+            # Same total duration as the stream of the same tokens
+            if self.config.tokens_per_second:
+                duration = len(response.chunks) / self.config.tokens_per_second
+            else:
+                duration = 0
+            if self.config.time_to_first_token + duration:
+                await sleep(self.config.time_to_first_token + duration)
+            content = response.content
+        else:
+            # Simulate a delay for the non-streamed response
+            await sleep(2)
+            content = choice(get_corpus(self.config.seed)).content
+        prompt_tokens = token_counter.count_messages(request.model, request.messages)
+        completion_tokens = token_counter.count(request.model, content)
 
         return ChatCompletionResponse(
             model=request.model,
@@ -46,50 +546,31 @@ class DummyService(AIServiceInterface):
                 }
             ],
             usage={
-                "prompt_tokens": len(request.messages),
-                "completion_tokens": len(content.split()),
-                "total_tokens": len(request.messages) + len(content.split()),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
             },
         )
 
     @override
-    async def chat_completion_stream(
-        self, request: ChatCompletionRequest
-    ) -> AsyncGenerator[str, Any]:
+    def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
         if request.model not in self.available_models:
             raise ValueError(f"Modèle '{request.model}' non disponible pour DummyService")
 
-        # The get_dummy_chat_stream logic is already a Generator
-        # It needs to be converted into an AsyncGenerator
-        async for chunk_content in self._get_dummy_chat_stream():
-            stream_chunk = ChatCompletionStreamChunk(
-                model=request.model,
-                choices=[
-                    {
-                        "index": 0,
-                        "delta": {
-                            "role": "assistant",
-                            "content": chunk_content,
-                        },
-                        "finish_reason": None,
-                    }
-                ],
+        # The stream is returned as is rather than re-yielded, one generator less per token
+        if self.config.mode == "deterministic":
+            return self._stream_response(
+                get_deterministic_response(self.config), self.config.time_to_first_token
             )
-            yield f"data: {json.dumps(stream_chunk.__dict__, default=str)}\n\n"
-
-        # Send stream end message
-        final_chunk = ChatCompletionStreamChunk(
-            model=request.model,
-            choices=[
-                {
-                    "index": 0,
-                    "delta": {},
-                    "finish_reason": "stop",
-                }
-            ],
+        return self._stream_response(
+            choice(get_corpus(self.config.seed)), RANDOM_TIME_TO_FIRST_TOKEN
         )
-        yield f"data: {json.dumps(final_chunk.__dict__, default=str)}\n\n"
-        yield "data: [DONE]\n\n"
+
+    @override
+    async def embed(self, model: str, inputs: list[str]) -> list[list[float]]:
+        if model not in self.embedding_models:
+            raise ValueError(f"Modèle '{model}' non disponible pour DummyService")
+        return [hash_embedding(text, self.config.embedding_dimensions) for text in inputs]
 
     @override
     def get_model_info(self) -> list[ModelInfo]:
@@ -103,474 +584,19 @@ class DummyService(AIServiceInterface):
             ),
         ]
 
-    def _generate_dummy_content(self, word_count: int = 100) -> str:
-        """Generates random text content."""
-        WORDS = [
-            "lorem",
-            "ipsum",
-            "dolor",
-            "sit",
-            "amet",
-            "consectetur",
-            "adipiscing",
-            "elit",
-            "sed",
-            "do",
-            "eiusmod",
-            "tempor",
-            "incididunt",
-            "ut",
-            "labore",
-            "et",
-            "dolore",
-            "magna",
-            "aliqua",
-            "enim",
-            "ad",
-            "minim",
-            "veniam",
-            "quis",
-            "nostrud",
-            "exercitation",
-            "ullamco",
-            "laboris",
-            "nisi",
-            "aliquip",
-            "ex",
-            "ea",
-            "commodo",
-            "consequat",
-            "duis",
-            "aute",
-            "irure",
-            "in",
-            "reprehenderit",
-            "voluptate",
-            "velit",
-            "esse",
-            "cillum",
-            "fugiat",
-            "nulla",
-            "pariatur",
-            "excepteur",
-            "sint",
-            "occaecat",
-            "cupidatat",
-            "non",
-            "proident",
-            "sunt",
-            "culpa",
-            "qui",
-            "officia",
-            "deserunt",
-            "mollit",
-            "anim",
-            "id",
-            "est",
-            "laborum",
-            "solution",
-            "problème",
-            "méthode",
-            "exemple",
-            "important",
-            "noter",
-            "voici",
-            "comment",
-            "fonction",
-            "variable",
-            "classe",
-            "objet",
-            "données",
-            "résultat",
-            "algorithme",
-            "code",
-        ]
-        return " ".join(choice(WORDS).lower() for _ in range(word_count)) + "."
-
-    async def _get_dummy_chat_stream(self, **kwargs) -> AsyncGenerator[str]:
-        await sleep(1.5)
-        WORDS = [
-            "lorem",
-            "ipsum",
-            "dolor",
-            "sit",
-            "amet",
-            "consectetur",
-            "adipiscing",
-            "elit",
-            "sed",
-            "do",
-            "eiusmod",
-            "tempor",
-            "incididunt",
-            "ut",
-            "labore",
-            "et",
-            "dolore",
-            "magna",
-            "aliqua",
-            "enim",
-            "ad",
-            "minim",
-            "veniam",
-            "quis",
-            "nostrud",
-            "exercitation",
-            "ullamco",
-            "laboris",
-            "nisi",
-            "aliquip",
-            "ex",
-            "ea",
-            "commodo",
-            "consequat",
-            "duis",
-            "aute",
-            "irure",
-            "in",
-            "reprehenderit",
-            "voluptate",
-            "velit",
-            "esse",
-            "cillum",
-            "fugiat",
-            "nulla",
-            "pariatur",
-            "excepteur",
-            "sint",
-            "occaecat",
-            "cupidatat",
-            "non",
-            "proident",
-            "sunt",
-            "culpa",
-            "qui",
-            "officia",
-            "deserunt",
-            "mollit",
-            "anim",
-            "id",
-            "est",
-            "laborum",
-            "solution",
-            "problème",
-            "méthode",
-            "exemple",
-            "important",
-            "noter",
-            "voici",
-            "comment",
-            "fonction",
-            "variable",
-            "classe",
-            "objet",
-            "données",
-            "résultat",
-            "algorithme",
-            "code",
-        ]
-        TECH_WORDS = [
-            "Python",
-            "JavaScript",
-            "React",
-            "Django",
-            "FastAPI",
-            "API",
-            "REST",
-            "JSON",
-            "database",
-            "SQL",
-            "NoSQL",
-            "MongoDB",
-            "PostgreSQL",
-            "Redis",
-            "Docker",
-            "Kubernetes",
-            "microservices",
-            "authentication",
-            "authorization",
-            "JWT",
-            "HTTP",
-            "HTTPS",
-            "SSL",
-            "TLS",
-            "encryption",
-            "hash",
-            "algorithm",
-            "framework",
-        ]
-        CODE_EXAMPLES = [
-            "```python\ndef example_function():\n    return 'Hello World'\n```",
-            "```js\nconst data = await fetch('/api/endpoint');\nconst result = await data.json();\n```",  # noqa: E501
-            "```sql\nSELECT * FROM users WHERE active = true;\n```",
-            "```bash\nnpm install package-name\npip install requirements.txt\n```",
-            "```\nnpm install package-name\npip install requirements.txt\n```",
-            '```json\n{\n  "status": "success",\n  "data": []\n}\n```',
-            "![1](https://github.com/user-attachments/assets/382225ab-abdc-49ad-8497-d3d5b5c7043a)",  # noqa: E501
-            "![2](https://github.com/user-attachments/assets/d9e53e85-0f06-4c80-826e-8a69d26bcc7a)",  # noqa: E501
-            "![3](https://github.com/user-attachments/assets/48dabfe0-18e3-4d04-b526-9667772aefd1)",  # noqa: E501
-        ]
-        HEADINGS = [
-            "## Solution proposée",
-            "## Explication détaillée",
-            "## Exemple pratique",
-            "## Points importants",
-            "## Configuration requise",
-            "## Étapes à suivre",
-            "### Méthode 1",
-            "### Méthode 2",
-            "### Alternative",
-            "### Remarque importante",
-        ]
-        MARKDOWN_ELEMENTS = [
-            "**important**",
-            "*essentiel*",
-            "`variable`",
-            "`fonction()`",
-            "`class MyClass`",
-            "[documentation](https://example.com)",
-            "> Cette approche est recommandée",
-            "> **Note:** Il faut faire attention à",
-        ]
-        LIST_ITEMS = [
-            "- Premier point à considérer",
-            "- Deuxième élément important",
-            "- Troisième aspect essentiel",
-            "1. Première étape",
-            "2. Deuxième étape",
-            "3. Troisième étape",
-        ]
-
-        default_word_count = choice(range(150, 200))
-        default_delay = 0.02
-
-        try:
-            word_count = int(kwargs.get("word_count", default_word_count))
-            delay = float(kwargs.get("delay", default_delay))
-        except (ValueError, TypeError):
-            word_count = default_word_count
-            delay = default_delay
-
-        # Content structure
-        content_blocks = []
-        current_block = []
-        words_generated = 0
-
-        THINKING_WORDS = [
-            "analyser",
-            "considérer",
-            "évaluer",
-            "examiner",
-            "réfléchir",
-            "comprendre",
-            "déterminer",
-            "identifier",
-            "explorer",
-            "investigation",
-            "approche",
-            "méthode",
-            "solution",
-            "problème",
-            "question",
-            "aspect",
-            "élément",
-            "facteur",
-            "paramètre",
-            "contexte",
-            "situation",
-            "cas",
-            "scénario",
-            "possibilité",
-            "option",
-            "alternative",
-            "conséquence",
-            "résultat",
-            "impact",
-            "effet",
-            "influence",
-            "importance",
-            "pertinence",
-        ]
-        thinking_block = ["<think> "]
-        for paragraph in range(3):
-            # Generate 3 lines per paragraph
-            paragraph_lines = []
-            for _line in range(3):
-                line_words = []
-                for _ in range(randint(6, 10)):
-                    word = choice(THINKING_WORDS) if random() < 0.3 else choice(WORDS)
-                    if len(line_words) == 0:
-                        word = word.capitalize()
-
-                    line_words.append(word)
-
-                # Construct line with comma
-                line_text = " ".join(line_words) + ","
-                paragraph_lines.append(line_text)
-
-            # Join the 3 lines of the paragraph with spaces
-            paragraph_text = " ".join(paragraph_lines)
-
-            # Replace the last comma with a period and add space
-            if paragraph < 2:
-                paragraph_text = paragraph_text[:-1] + ". \n\n"
-            else:
-                paragraph_text = paragraph_text[:-1] + "."
-
-            thinking_block.append(paragraph_text)
-
-        thinking_block.append(" </think>\n\n")
-        content_blocks.append(thinking_block)
-        words_generated += 60
-
-        while words_generated < word_count:
-            # Decide what type of content to generate (40% chance for code blocks)
-            content_type = choice(
-                [
-                    "paragraph",
-                    "text",
-                    "heading",
-                    "code",
-                    "code",
-                    "code",
-                    "code",
-                    "code",
-                    "markdown",
-                    "markdown",
-                    "markdown",
-                    "list",
-                    "linebreak",
-                    "linebreak",
-                ]
-            )
-
-            if content_type == "paragraph" and random() < 0.6:
-                # Générer un paragraphe de 70 mots
-                if current_block:
-                    content_blocks.append(current_block)
-                    current_block = []
-
-                paragraph_block = []
-                paragraph_words = 0
-                target_words = 70
-
-                while paragraph_words < target_words and words_generated < word_count:
-                    word = choice(TECH_WORDS) if random() < 0.1 else choice(WORDS)
-
-                    # Capitalize on the first word of the paragraph
-                    if paragraph_words == 0:
-                        word = word.capitalize()
-
-                    # Add internal punctuation to paragraphs
-                    if (
-                        paragraph_words > 0
-                        and paragraph_words < target_words - 5
-                        and random() < 0.12
-                    ):
-                        punctuation = choice([", ", ". "])
-                        if punctuation == ". ":
-                            paragraph_block.append(punctuation)
-                            word = word.capitalize()
-                        else:
-                            paragraph_block.append(punctuation)
-
-                    paragraph_block.append(word + " ")
-                    paragraph_words += 1
-                    words_generated += 1
-
-                # End the paragraph with a period
-                if paragraph_block and not paragraph_block[-1].rstrip().endswith((".", "!", "?")):
-                    paragraph_block[-1] = paragraph_block[-1].rstrip() + "."
-
-                # Double saut de ligne après le paragraphe
-                paragraph_block.append("\n\n")
-                content_blocks.append(paragraph_block)
-
-            elif content_type == "heading" and random() < 0.3:
-                if current_block:
-                    content_blocks.append(current_block)
-                    current_block = []
-                heading = choice(HEADINGS)
-                content_blocks.append(["\n\n", heading, "\n\n"])
-                words_generated += len(heading.split())
-
-            elif content_type == "code" and random() < 0.2:
-                if current_block:
-                    content_blocks.append(current_block)
-                    current_block = []
-                code = choice(CODE_EXAMPLES)
-                content_blocks.append(["\n\n", code, "\n\n"])
-                # Approximation for code
-                words_generated += 10
-
-            elif content_type == "list" and random() < 0.25:
-                if current_block and len(current_block) > 5:
-                    content_blocks.append(current_block)
-                    current_block = []
-                # Generate a list of 2-4 items
-                list_size = randint(2, 4)
-                list_block = ["\n\n"]
-                for _ in range(list_size):
-                    item = choice(LIST_ITEMS)
-                    list_block.extend([item, "\n"])
-                    words_generated += len(item.split())
-                list_block.append("\n")
-                content_blocks.append(list_block)
-
-            elif content_type == "linebreak" and random() < 0.15:
-                current_block.append("\n\n")
-
-            elif content_type == "markdown" and random() < 0.2:
-                element = choice(MARKDOWN_ELEMENTS)
-                current_block.append(element + " ")
-                words_generated += len(element.split())
-
-            else:
-                word = choice(TECH_WORDS) if random() < 0.1 else choice(WORDS)
-
-                # Capitalize on the first word of the block
-                if not current_block or (
-                    current_block and current_block[-1].endswith((".", "!", "?", "\n"))
-                ):
-                    word = word.capitalize()
-
-                # Add punctuation
-                if words_generated > 0 and random() < 0.15:
-                    punctuation = choice([", ", ". ", "! ", "? "])
-                    if punctuation in [". ", "! ", "? "]:
-                        current_block.append(punctuation)
-                        word = word.capitalize()
-                    else:
-                        current_block.append(punctuation)
-
-                current_block.append(word + " ")
-                words_generated += 1
-
-                # Limit the size of text blocks
-                if len(current_block) > 30:
-                    content_blocks.append(current_block)
-                    current_block = []
-
-        # Add last block
-        if current_block:
-            if current_block and not current_block[-1].rstrip().endswith((".", "!", "?")):
-                current_block[-1] = current_block[-1].rstrip() + "."
-            content_blocks.append(current_block)
-
-        # Generate stream
-        for block in content_blocks:
-            for chunk in block:
-                # Simulate character-by-character streaming for certain elements
-                if chunk.startswith(("```", "#", "-", ">", "1.", "2.", "3.", "4.", "5.")):
-                    yield chunk
-                    # Longer pause for structural elements
-                    await sleep(delay * 2)
-                else:
-                    # Stream word by word or character by character
-                    if len(chunk) > 50:
-                        for i in range(0, len(chunk), 10):
-                            yield chunk[i : i + 10]
-                            await sleep(delay)
-                    else:
-                        yield chunk
-                        await sleep(delay)
+    async def _stream_response(
+        self, response: DummyResponse, time_to_first_token: float
+    ) -> AsyncGenerator[str]:
+        """Sends the chunks of a response on its schedule, paced by the shared ticker."""
+        if time_to_first_token:
+            await sleep(time_to_first_token)
+        loop = get_running_loop()
+        start = now = loop.time()
+        for chunk, at in zip(response.chunks, response.schedule, strict=True):
+            # Every deadline comes from the same start so the pace does not drift. The clock is
+            # only read when a deadline may be ahead, the chunks already due (all of them when
+            # there is no pacing) are sent without reading it or waiting
+            while start + at > now:
+                await ticker.wait()
+                now = loop.time()
+            yield chunk
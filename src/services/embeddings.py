@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import hashlib
+import math
+import re
+import sys
+from array import array
+from http import HTTPStatus
+
+from litestar.exceptions import HTTPException
+
+from config.settings import EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT
+from schemas.embedding_schemas import EncodingFormat
+from services.ai_service_interface import AIServiceInterface
+from services.metrics import registry
+from services.scheduler import scheduler
+
+batch_inputs = registry.histogram(
+    "ollaix_embedding_batch_inputs",
+    "Inputs embedded per backend call, the requests of a batch together.",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def hash_embedding(text: str, dimensions: int) -> list[float]:
+    """
+    Embeds a text by hashing its words into the dimensions of a unit vector.
+
+    Texts sharing words get close vectors, regardless of case and punctuation, without a
+    model: the embeddings of the dummy model. The word order is lost, "delete the file" and
+    "create the file" are close, too coarse for the semantic cache of a real model. The hash
+    is stable across processes and restarts.
+    """
+    vector = [0.0] * dimensions
+    for word in _WORD_PATTERN.findall(text.lower()):
+        digest = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest())
+        vector[digest % dimensions] += 1.0 if digest >> 63 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def encode_embedding(vector: list[float], encoding_format: EncodingFormat) -> list[float] | str:
+    """Returns a vector as a list of floats, or as the base64 of its little-endian float32."""
+    if encoding_format == "float":
+        return vector
+    packed = array("f", vector)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed).decode()
+
+
+class EmbeddingBatch:
+    """Inputs of the requests gathered for one backend call, with the slice of each request."""
+
+    __slots__ = ("inputs", "model", "priority", "service", "timer", "waiters")
+
+    def __init__(self, service: AIServiceInterface, model: str, priority: str) -> None:
+        self.service = service
+        self.model = model
+        self.priority = priority
+        self.inputs: list[str] = []
+        self.waiters: list[tuple[asyncio.Future[list[list[float]]], int, int]] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class EmbeddingBatcher:
+    """
+    Sends the embedding requests of a model arriving together to the backend in one call.
+
+    The first request of a batch waits at most `max_wait` for others to join it, the batch is
+    sent as soon as it holds `max_batch_size` inputs. A request is never split between
+    batches, one larger than the batch size is sent alone. Each request gets back the vectors
+    of its own inputs, or the error of the call.
+
+    A batch takes one scheduler slot of the backend, at the priority class of its requests:
+    the requests of different classes are batched apart.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        max_wait: float = EMBEDDING_BATCH_MAX_WAIT,
+    ) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._batches: dict[tuple[str, str, str], EmbeddingBatch] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def embed(
+        self, service: AIServiceInterface, model: str, inputs: list[str], priority: str
+    ) -> list[list[float]]:
+        """Returns the embedding vector of each input, computed in a batch with other requests."""
+        key = (service.provider_name, model, priority)
+        batch = self._batches.get(key)
+        if batch is not None and len(batch.inputs) + len(inputs) > self.max_batch_size:
+            self._send(key, batch)
+            batch = None
+        loop = asyncio.get_running_loop()
+        if batch is None:
+            batch = self._batches[key] = EmbeddingBatch(service, model, priority)
+            batch.timer = loop.call_later(self.max_wait, self._send, key, batch)
+
+        future: asyncio.Future[list[list[float]]] = loop.create_future()
+        batch.waiters.append((future, len(batch.inputs), len(batch.inputs) + len(inputs)))
+        batch.inputs.extend(inputs)
+        if len(batch.inputs) >= self.max_batch_size:
+            self._send(key, batch)
+        return await future
+
+    async def close(self) -> None:
+        """Cancels the batches waiting or running, and their requests."""
+        for batch in self._batches.values():
+            if batch.timer is not None:
+                batch.timer.cancel()
+            for future, _, _ in batch.waiters:
+                future.cancel()
+        self._batches.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _send(self, key: tuple[str, str, str], batch: EmbeddingBatch) -> None:
+        """Starts the backend call of a batch, unless already sent."""
+        if self._batches.get(key) is not batch:
+            return
+        del self._batches[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: EmbeddingBatch) -> None:
+        try:
+            async with scheduler.slot(batch.service, batch.model, batch.priority):
+                vectors = await batch.service.embed(batch.model, batch.inputs)
+            if len(vectors) != len(batch.inputs):
+                raise HTTPException(
+                    detail=f"The backend returned {len(vectors)} embeddings "
+                    f"for {len(batch.inputs)} inputs.",
+                    status_code=HTTPStatus.BAD_GATEWAY,
+                )
+        except Exception as e:
+            for future, _, _ in batch.waiters:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            batch_inputs.observe(len(batch.inputs), model=batch.model)
+            for future, start, end in batch.waiters:
+                # A request cancelled by its client is dropped from the batch results
+                if not future.done():
+                    future.set_result(vectors[start:end])
+        finally:
+            # The batch itself was cancelled
+            for future, _, _ in batch.waiters:
+                future.cancel()
+
+
+embedding_batcher = EmbeddingBatcher()
@@ -1,6 +1,8 @@
-import json
+import asyncio
 from collections.abc import AsyncGenerator
-from typing import Any, override
+from contextlib import aclosing
+from typing import Any, ClassVar, override
+from weakref import WeakKeyDictionary
 
 from google.genai import Client, types
 from google.genai.errors import APIError
@@ -10,15 +12,15 @@ from litestar.exceptions import (
     ValidationException,
 )
 
-from config.settings import GEMINI_API_KEY
+from config.settings import GEMINI_API_KEY, GEMINI_BASE_URL
 from schemas.chat_schemas import (
     ChatCompletionRequest,
     ChatCompletionResponse,
-    ChatCompletionStreamChunk,
     ChatMessage,
     ModelInfo,
 )
 from services.ai_service_interface import AIServiceInterface
+from services.stop_sequences import get_stop_sequences
 
 
 class GeminiService(AIServiceInterface):
@@ -27,10 +29,29 @@ class GeminiService(AIServiceInterface):
     available_models = ["gemini-2.0-flash"]
     provider_name = "gemini"
 
+    # Clients are reused between requests (building one takes tens of milliseconds), per
+    # event loop since their connections are bound to the loop that opened them
+    _clients: ClassVar[WeakKeyDictionary[asyncio.AbstractEventLoop, Client]] = WeakKeyDictionary()
+
     def __init__(self) -> None:
         if not GEMINI_API_KEY:
             raise ImproperlyConfiguredException("GEMINI_API_KEY is not configured")
-        self.client = Client(api_key=GEMINI_API_KEY)
+
+    @property
+    def client(self) -> Client:
+        """Client of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+            self._clients[loop] = Client(api_key=GEMINI_API_KEY, http_options=http_options)
+        return self._clients[loop]
+
+    @override
+    async def close(self) -> None:
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            # The client has no close method in google-genai 1.24, its httpx client is closed
+            await client._api_client._async_httpx_client.aclose()
 
     @override
     async def chat_completion(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
@@ -44,10 +65,11 @@ class GeminiService(AIServiceInterface):
             temperature=request.temperature,
             top_p=request.top_p,
             max_output_tokens=request.max_tokens,
+            stop_sequences=get_stop_sequences(request.stop) or None,
             system_instruction=system_instruction,
         )
         try:
-            response = self.client.models.generate_content(
+            response = await self.client.aio.models.generate_content(
                 model=request.model,
                 contents=messages,
                 config=config,
@@ -85,9 +107,7 @@ class GeminiService(AIServiceInterface):
             ) from e
 
     @override
-    async def chat_completion_stream(
-        self, request: ChatCompletionRequest
-    ) -> AsyncGenerator[str, Any]:
+    async def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
         if request.model not in self.available_models:
             raise ValueError(f"Modèle '{request.model}' non disponible pour Gemini")
 
@@ -98,45 +118,21 @@ class GeminiService(AIServiceInterface):
             temperature=request.temperature,
             top_p=request.top_p,
             max_output_tokens=request.max_tokens,
+            stop_sequences=get_stop_sequences(request.stop) or None,
             system_instruction=system_instruction,
         )
         try:
-            response_stream = self.client.models.generate_content_stream(
+            response_stream = await self.client.aio.models.generate_content_stream(
                 model=request.model,
                 contents=messages,
                 config=config,
             )
 
-            for chunk in response_stream:
-                if chunk.text:
-                    stream_chunk = ChatCompletionStreamChunk(
-                        model=request.model,
-                        choices=[
-                            {
-                                "index": 0,
-                                "delta": {
-                                    "role": "assistant",
-                                    "content": chunk.text,
-                                },
-                                "finish_reason": None,
-                            }
-                        ],
-                    )
-                    yield f"data: {json.dumps(stream_chunk.__dict__, default=str)}\n\n"
-
-            # Chunk final
-            final_chunk = ChatCompletionStreamChunk(
-                model=request.model,
-                choices=[
-                    {
-                        "index": 0,
-                        "delta": {},
-                        "finish_reason": "stop",
-                    }
-                ],
-            )
-            yield f"data: {json.dumps(final_chunk.__dict__, default=str)}\n\n"
-            yield "data: [DONE]\n\n"
+            # Closing the stream (at a stop sequence for instance) ends the upstream request
+            async with aclosing(response_stream) as chunks:
+                async for chunk in chunks:
+                    if chunk.text:
+                        yield chunk.text
         except APIError as e:
             raise HTTPException(
                 detail=e.message if e.message else "Internal Server Error", status_code=e.code
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from http import HTTPStatus
+from time import time
+from typing import Any
+
+import msgspec
+from litestar.exceptions import HTTPException, ValidationException
+
+from config.settings import IDEMPOTENCY_DB_PATH, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse
+from services.stream_replay import StreamReplayStore, stream_replay
+
+MAX_KEY_LENGTH = 255
+CONFLICT_DETAIL = "The Idempotency-Key was already used for a different request."
+IN_PROGRESS_DETAIL = "A request with this Idempotency-Key is still in progress, retry later."
+
+Completion = ChatCompletionResponse | AsyncGenerator[bytes, Any]
+
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(ChatCompletionResponse)
+
+
+class IdempotentRequest:
+    """
+    Request run once for its key, the retries with the same key get its result.
+
+    The result is the response of a complete request, or the id of the replay of a stream.
+    """
+
+    __slots__ = ("body_hash", "expires_at", "result", "task")
+
+    def __init__(self, body_hash: str, task: asyncio.Task[ChatCompletionResponse | str]) -> None:
+        self.body_hash = body_hash
+        self.task = task
+        self.result: ChatCompletionResponse | str | None = None
+        # Kept as long as the request runs
+        self.expires_at = math.inf
+
+
+class IdempotencyDatabase:
+    """
+    SQLite table of the keys, shared by the workers and kept across restarts.
+
+    Only the responses of the complete requests are stored: a stream can only be replayed by
+    the worker generating it. A key is marked in progress while its request runs, so that a
+    retry reaching another worker is rejected instead of generating the response again.
+    """
+
+    def __init__(self, path: str) -> None:
+        # The queries run in worker threads, one at a time
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys (key TEXT PRIMARY KEY, "
+            "body_hash TEXT NOT NULL, response BLOB, expires_at REAL NOT NULL)"
+        )
+
+    def claim(
+        self, key: str, body_hash: str, now: float, ttl: float
+    ) -> tuple[str, bytes | None] | None:
+        """
+        Returns the request hash and response of `key`, or marks the key in progress if unknown.
+
+        The response is `None` while the request of the key is in progress.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT body_hash, response FROM idempotency_keys "
+                    "WHERE key = ? AND expires_at >= ?",
+                    (key, now),
+                ).fetchone()
+                if row is None:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, NULL, ?)",
+                        (key, body_hash, now + ttl),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return row
+
+    def save(self, key: str, response: bytes, now: float, ttl: float) -> None:
+        """Stores the response of `key`, and drops the expired keys."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE idempotency_keys SET response = ?, expires_at = ? WHERE key = ?",
+                (response, now + ttl, key),
+            )
+            self._connection.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
+
+    def release(self, key: str) -> None:
+        """Forgets a key whose request failed or was not stored, to let it run again."""
+        with self._lock:
+            self._connection.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+
+class IdempotencyStore:
+    """
+    Keys of the recent completion requests, sent by the clients in the `Idempotency-Key` header.
+
+    A retry of a request still running waits for it, a retry of a finished request gets its
+    response again, or the whole stream from the replay store, for a TTL after its end. The
+    request runs in a task of its own, so that it ends even if its client disconnects and the
+    retry finds its result. A failed request is forgotten, a retry runs it again.
+
+    A key is reserved to requests with the same body, and is scoped to the client, so that
+    clients cannot read the responses of each other. The least recently used keys are dropped
+    once `max_keys` is reached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS,
+        db_path: str = IDEMPOTENCY_DB_PATH,
+        replays: StreamReplayStore | None = None,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.replays = replays or stream_replay
+        self.database = IdempotencyDatabase(db_path) if db_path else None
+        self._clock = clock
+        self._requests: OrderedDict[str, IdempotentRequest] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    async def run(
+        self,
+        client_key: str,
+        idempotency_key: str,
+        data: ChatCompletionRequest,
+        generate: Callable[[], Awaitable[Completion]],
+    ) -> Completion:
+        """
+        Returns the completion of the request of `idempotency_key`, generated on first use.
+
+        Raises:
+            ValidationException: If the key is empty or too long.
+            HTTPException: If the key was used for a different request (422), or its request
+                is in progress in another worker (409).
+        """
+        if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            raise ValidationException(
+                detail=f"The Idempotency-Key must have 1 to {MAX_KEY_LENGTH} characters."
+            )
+        if data.stream and not self.replays.enabled:
+            # A stream can only be sent again from its replay
+            return await generate()
+
+        key = hashlib.sha256(f"{client_key}\x00{idempotency_key}".encode()).hexdigest()
+        body_hash = hashlib.sha256(_encoder.encode(data)).hexdigest()
+        request = self._get(key)
+        if request is None:
+            task = asyncio.create_task(self._execute(key, body_hash, generate))
+            request = IdempotentRequest(body_hash, task)
+            self._requests[key] = request
+            if len(self._requests) > self.max_keys:
+                self._requests.popitem(last=False)
+            task.add_done_callback(lambda _: self._finish(key, request))
+        elif request.body_hash != body_hash:
+            raise HTTPException(
+                detail=CONFLICT_DETAIL, status_code=HTTPStatus.UNPROCESSABLE_ENTITY
+            )
+
+        result = request.result
+        if result is None:
+            result = await asyncio.shield(request.task)
+        if isinstance(result, ChatCompletionResponse):
+            return result
+        return self.replays.follow(result)
+
+    def _get(self, key: str) -> IdempotentRequest | None:
+        """Returns the request of `key`, unless expired or its stream not replayable anymore."""
+        request = self._requests.get(key)
+        if request is None:
+            return None
+        if request.expires_at < self._clock() or (
+            isinstance(request.result, str) and request.result not in self.replays
+        ):
+            del self._requests[key]
+            return None
+        self._requests.move_to_end(key)
+        return request
+
+    async def _execute(
+        self, key: str, body_hash: str, generate: Callable[[], Awaitable[Completion]]
+    ) -> ChatCompletionResponse | str:
+        """Generates the completion of a new key, returns the response or the stream id."""
+        if self.database is not None:
+            row = await asyncio.to_thread(
+                self.database.claim, key, body_hash, self._clock(), self.ttl
+            )
+            if row is not None:
+                stored_hash, response = row
+                if stored_hash != body_hash:
+                    raise HTTPException(
+                        detail=CONFLICT_DETAIL, status_code=HTTPStatus.UNPROCESSABLE_ENTITY
+                    )
+                if response is None:
+                    raise HTTPException(detail=IN_PROGRESS_DETAIL, status_code=HTTPStatus.CONFLICT)
+                return _decoder.decode(response)
+
+        try:
+            completion = await generate()
+        except BaseException:
+            if self.database is not None:
+                await asyncio.to_thread(self.database.release, key)
+            raise
+
+        if isinstance(completion, ChatCompletionResponse):
+            if self.database is not None:
+                await asyncio.to_thread(
+                    self.database.save, key, _encoder.encode(completion), self._clock(), self.ttl
+                )
+            return completion
+        if self.database is not None:
+            await asyncio.to_thread(self.database.release, key)
+        return self.replays.add(completion).id
+
+    def _finish(self, key: str, request: IdempotentRequest) -> None:
+        """Keeps the result of a request for the TTL, or forgets the request if it failed."""
+        if request.task.cancelled() or request.task.exception() is not None:
+            if self._requests.get(key) is request:
+                del self._requests[key]
+            return
+        request.result = request.task.result()
+        request.expires_at = self._clock() + self.ttl
+
+    async def close(self) -> None:
+        """Ends the requests still running."""
+        tasks = [request.task for request in self._requests.values() if not request.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+idempotency = IdempotencyStore()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import math
+import sys
+import threading
+import traceback
+from collections import deque
+from time import monotonic
+
+from config.settings import (
+    LOOP_MONITOR_BLOCK_THRESHOLD,
+    LOOP_MONITOR_CAPTURE,
+    LOOP_MONITOR_INTERVAL,
+    LOOP_MONITOR_MAX_CAPTURES,
+)
+from schemas.admin_schemas import LoopBlock, LoopStatus
+from services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# Innermost frames kept in a capture
+STACK_LIMIT = 30
+
+loop_lag = registry.histogram(
+    "ollaix_event_loop_lag_seconds",
+    "Delay of the event loop in running a callback due",
+    buckets=LAG_BUCKETS,
+)
+loop_blocks = registry.counter(
+    "ollaix_event_loop_blocks_total", "Times the event loop was blocked longer than the threshold"
+)
+
+
+class LoopMonitor:
+    """
+    Continuous measure of the event-loop lag, and detector of the calls blocking the loop.
+
+    A task sleeps for `interval` in a loop: how late it wakes up is the lag, the time the
+    loop was busy running other code. A lag over `threshold` means that a coroutine step
+    blocked the loop, with a synchronous call for instance.
+
+    The stack of the blocking code can only be taken while the loop is blocked, so with
+    `capture` a watchdog thread checks that the task wakes up in time, and records the stack
+    of the loop thread when it is late. The capture is logged once the loop is unblocked.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold: float = LOOP_MONITOR_BLOCK_THRESHOLD,
+        capture: bool = LOOP_MONITOR_CAPTURE,
+        max_captures: int = LOOP_MONITOR_MAX_CAPTURES,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.capture = capture
+        self.captures: deque[LoopBlock] = deque(maxlen=max_captures)
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.blocks = 0
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # Time the measuring task is due to wake up, and the capture of the block delaying it
+        self._deadline = math.inf
+        self._pending: tuple[float, LoopBlock] | None = None
+
+    def status(self) -> LoopStatus:
+        return LoopStatus(
+            lag=self.lag, max_lag=self.max_lag, blocks=self.blocks, captures=list(self.captures)
+        )
+
+    def start(self) -> None:
+        """Starts monitoring the running loop."""
+        loop = asyncio.get_running_loop()
+        # The application may be started again in the same process, by the tests for instance
+        self._stopped.set()
+        self._task = loop.create_task(self._measure())
+        if self.capture:
+            self._stopped = threading.Event()
+            self._watchdog = threading.Thread(
+                target=self._watch,
+                args=(loop, threading.get_ident(), self._stopped),
+                name="loop-watchdog",
+                daemon=True,
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stops the measures and the watchdog thread."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+        self._deadline = math.inf
+
+    async def _measure(self) -> None:
+        while True:
+            self._deadline = monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(max(monotonic() - self._deadline, 0.0))
+
+    def _record(self, lag: float) -> None:
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        loop_lag.observe(lag)
+        pending, self._pending = self._pending, None
+        if lag < self.threshold:
+            return
+
+        self.blocks += 1
+        loop_blocks.inc()
+        if pending is not None and pending[0] == self._deadline:
+            block = pending[1]
+            block.duration = lag
+            logger.warning(
+                "Event loop blocked for %.3fs in task %s:\n%s",
+                lag,
+                block.task,
+                "".join(block.stack),
+            )
+        else:
+            logger.warning("Event loop blocked for %.3fs", lag)
+
+    def _watch(
+        self, loop: asyncio.AbstractEventLoop, thread_id: int, stopped: threading.Event
+    ) -> None:
+        """Captures the stack of the loop thread when the measuring task is late."""
+        captured = math.inf
+        while not stopped.wait(self.threshold / 2):
+            deadline = self._deadline
+            if deadline == captured or monotonic() - deadline < self.threshold:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            task = asyncio.current_task(loop)
+            block = LoopBlock(
+                task=task.get_name() if task is not None else None,
+                stack=traceback.format_stack(frame, limit=STACK_LIMIT),
+            )
+            captured = deadline
+            self.captures.append(block)
+            self._pending = (deadline, block)
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,111 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from msgspec.structs import replace
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse
+from services.ai_service_interface import AIServiceInterface
+from services.stop_sequences import get_stop_sequences, truncate_at_stop
+from services.stream_state import SSE_DONE
+
+
+async def gather_completions(
+    service: AIServiceInterface, request: ChatCompletionRequest
+) -> ChatCompletionResponse:
+    """Generates the `n` choices of a request concurrently and merges them in one response."""
+    if request.n == 1:
+        return apply_stop(await service.chat_completion(request), request)
+
+    single = replace(request, n=1)
+    responses = await asyncio.gather(*(service.chat_completion(single) for _ in range(request.n)))
+    responses = [apply_stop(response, request) for response in responses]
+
+    choices = [{**response.choices[0], "index": index} for index, response in enumerate(responses)]
+    # The prompt is the same for every choice, only the generated tokens add up
+    prompt_tokens = max((response.usage or {}).get("prompt_tokens", 0) for response in responses)
+    completion_tokens = sum(
+        (response.usage or {}).get("completion_tokens", 0) for response in responses
+    )
+    return ChatCompletionResponse(
+        model=request.model,
+        choices=choices,
+        usage={
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    )
+
+
+def apply_stop(
+    response: ChatCompletionResponse, request: ChatCompletionRequest
+) -> ChatCompletionResponse:
+    """Truncates the choices at the stop sequences of the request, for the backends without."""
+    if request.stop:
+        stops = get_stop_sequences(request.stop)
+        for choice in response.choices:
+            choice["message"]["content"] = truncate_at_stop(choice["message"]["content"], stops)
+    return response
+
+
+async def stream_completions(
+    service: AIServiceInterface, request: ChatCompletionRequest
+) -> AsyncGenerator[bytes, Any]:
+    """Generates the `n` choices of a request concurrently, multiplexed in one stream."""
+    if request.n == 1:
+        async for chunk in service.chat_completion_stream(request):
+            yield chunk
+        return
+
+    single = replace(request, n=1)
+    completion_id = uuid4()
+    created = datetime.now()
+    streams = [
+        service.stream_choice(single, index, completion_id, created) for index in range(request.n)
+    ]
+    async for chunk in merge_streams(streams):
+        yield chunk
+    yield SSE_DONE
+
+
+async def merge_streams[T](streams: list[AsyncGenerator[T, Any]]) -> AsyncGenerator[T, Any]:
+    """
+    Yields the items of several streams as soon as any of them produces one.
+
+    The first error raised by a stream stops all of them and is raised again. The streams are
+    closed once merged, stopped or abandoned by the consumer, which ends their upstream
+    requests.
+    """
+    queue: asyncio.Queue[tuple[T | None, BaseException | None, bool]] = asyncio.Queue(
+        maxsize=len(streams)
+    )
+
+    async def pump(stream: AsyncGenerator[T, Any]) -> None:
+        try:
+            async for item in stream:
+                await queue.put((item, None, False))
+        except Exception as e:
+            await queue.put((None, e, True))
+        else:
+            await queue.put((None, None, True))
+        finally:
+            await stream.aclose()
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item, error, finished = await queue.get()
+            if error is not None:
+                raise error
+            if finished:
+                remaining -= 1
+            else:
+                yield item  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,58 +1,99 @@
-import json
-from collections.abc import AsyncGenerator
-from typing import Any, override
+import asyncio
+from collections import Counter
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import aclosing, contextmanager
+from typing import Any, ClassVar, override
+from weakref import WeakKeyDictionary
 
-from ollama import AsyncClient
+from litestar.exceptions import HTTPException
+from ollama import AsyncClient, ResponseError
 
 from config.settings import OLLAMA_MODEL_HOSTS
 from schemas.chat_schemas import (
     ChatCompletionRequest,
     ChatCompletionResponse,
-    ChatCompletionStreamChunk,
     ChatMessage,
     ModelInfo,
 )
 from services.ai_service_interface import AIServiceInterface
+from services.reasoning import split_reasoning
+from services.stop_sequences import get_stop_sequences
+from services.stream_registry import current_stream
 
 
 class OllamaService(AIServiceInterface):
     """Service to interact with Ollama."""
 
     available_models = ["gemma3:1b", "qwen3:1.7b", "deepseek-r1:1.5b"]
+    reasoning_models = ["qwen3:1.7b", "deepseek-r1:1.5b"]
+    # Ollama embeds with any model, from the last hidden state
+    embedding_models = available_models
     provider_name = "ollama"
 
-    def _get_client(self, model: str) -> AsyncClient:
+    # Clients are reused between requests, per event loop since their connections are bound
+    # to the loop that opened them
+    _clients: ClassVar[WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, AsyncClient]]] = (
+        WeakKeyDictionary()
+    )
+    # Generations in progress per host, to send new ones to the least busy replica
+    _in_flight: ClassVar[Counter[str]] = Counter()
+
+    @contextmanager
+    def _get_client(self, model: str) -> Iterator[AsyncClient]:
+        """Yields a client for the least busy replica serving the model."""
         if model not in self.available_models:
             raise ValueError(f"Modèle '{model}' non disponible pour Ollama")
-        return AsyncClient(host=OLLAMA_MODEL_HOSTS[model])
+
+        host = min(OLLAMA_MODEL_HOSTS[model], key=self._in_flight.__getitem__)
+        clients = self._clients.setdefault(asyncio.get_running_loop(), {})
+        if host not in clients:
+            clients[host] = AsyncClient(host=host)
+
+        if (stream := current_stream.get()) is not None:
+            stream.host = host
+        self._in_flight[host] += 1
+        try:
+            yield clients[host]
+        finally:
+            self._in_flight[host] -= 1
+
+    @classmethod
+    async def close_clients(cls) -> None:
+        """Closes the clients of the running event loop and their connections."""
+        clients = cls._clients.pop(asyncio.get_running_loop(), {})
+        # The client has no close method before ollama 0.6, its httpx client is closed instead
+        await asyncio.gather(*(client._client.aclose() for client in clients.values()))
+
+    @override
+    async def close(self) -> None:
+        await self.close_clients()
+
+    @override
+    def get_backend(self, model: str) -> str:
+        return ",".join(OLLAMA_MODEL_HOSTS[model])
+
+    @override
+    def get_replica_count(self, model: str) -> int:
+        return len(OLLAMA_MODEL_HOSTS[model])
 
     @override
     async def chat_completion(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
-        client = self._get_client(request.model)
         messages = self._convert_messages(request.messages)
 
-        response = await client.chat(
-            model=request.model,
-            messages=messages,
-            stream=False,
-            options={
-                "temperature": request.temperature,
-                "top_p": request.top_p,
-                "num_predict": request.max_tokens,
-            }
-            if any([request.temperature, request.top_p, request.max_tokens])
-            else None,
-        )
+        with self._get_client(request.model) as client, self._convert_errors():
+            response = await client.chat(
+                model=request.model,
+                messages=messages,
+                stream=False,
+                options=self._get_options(request),
+            )
 
         return ChatCompletionResponse(
             model=request.model,
             choices=[
                 {
                     "index": 0,
-                    "message": {
-                        "role": "assistant",
-                        "content": response["message"]["content"],
-                    },
+                    "message": self._get_message(request, response["message"]["content"]),
                     "finish_reason": "stop",
                 }
             ],
@@ -65,53 +106,27 @@ class OllamaService(AIServiceInterface):
         )
 
     @override
-    async def chat_completion_stream(
-        self, request: ChatCompletionRequest
-    ) -> AsyncGenerator[str, Any]:
-        client = self._get_client(request.model)
+    async def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
         messages = self._convert_messages(request.messages)
 
-        async for chunk in await client.chat(
-            model=request.model,
-            messages=messages,
-            stream=True,
-            options={
-                "temperature": request.temperature,
-                "top_p": request.top_p,
-                "num_predict": request.max_tokens,
-            }
-            if any([request.temperature, request.top_p, request.max_tokens])
-            else None,
-        ):
-            if chunk.get("message", {}).get("content"):
-                stream_chunk = ChatCompletionStreamChunk(
-                    model=request.model,
-                    choices=[
-                        {
-                            "index": 0,
-                            "delta": {
-                                "role": "assistant",
-                                "content": chunk["message"]["content"],
-                            },
-                            "finish_reason": None,
-                        }
-                    ],
-                )
-                yield f"data: {json.dumps(stream_chunk.__dict__, default=str)}\n\n"
-
-            if chunk.get("done", False):
-                final_chunk = ChatCompletionStreamChunk(
-                    model=request.model,
-                    choices=[
-                        {
-                            "index": 0,
-                            "delta": {},
-                            "finish_reason": "stop",
-                        }
-                    ],
-                )
-                yield f"data: {json.dumps(final_chunk.__dict__, default=str)}\n\n"
-                yield "data: [DONE]\n\n"
+        with self._get_client(request.model) as client, self._convert_errors():
+            response = await client.chat(
+                model=request.model,
+                messages=messages,
+                stream=True,
+                options=self._get_options(request),
+            )
+            # Closing the stream (at a stop sequence for instance) ends the upstream request
+            async with aclosing(response) as chunks:
+                async for chunk in chunks:
+                    if chunk.get("message", {}).get("content"):
+                        yield chunk["message"]["content"]
+
+    @override
+    async def embed(self, model: str, inputs: list[str]) -> list[list[float]]:
+        with self._get_client(model) as client, self._convert_errors():
+            response = await client.embed(model=model, input=inputs)
+        return response["embeddings"]
 
     @override
     def get_model_info(self) -> list[ModelInfo]:
@@ -139,6 +154,38 @@ class OllamaService(AIServiceInterface):
             ),
         ]
 
+    def _get_message(self, request: ChatCompletionRequest, content: str) -> dict[str, str]:
+        """Returns the message of a completion, with its reasoning split as requested."""
+        if request.model not in self.reasoning_models or request.reasoning == "inline":
+            return {"role": "assistant", "content": content}
+
+        reasoning, content = split_reasoning(content)
+        if request.reasoning == "none" or not reasoning:
+            return {"role": "assistant", "content": content}
+        return {"role": "assistant", "content": content, "reasoning_content": reasoning}
+
+    def _get_options(self, request: ChatCompletionRequest) -> dict[str, Any] | None:
+        """Converts the sampling parameters to Ollama options."""
+        if not any([request.temperature, request.top_p, request.max_tokens, request.stop]):
+            return None
+        return {
+            "temperature": request.temperature,
+            "top_p": request.top_p,
+            "num_predict": request.max_tokens,
+            # Ollama also stops at them, without generating the text past the sequence
+            "stop": get_stop_sequences(request.stop) or None,
+        }
+
+    @contextmanager
+    def _convert_errors(self) -> Iterator[None]:
+        """Converts the errors returned by Ollama to HTTP exceptions."""
+        try:
+            yield
+        except ResponseError as e:
+            # Errors sent in the middle of a stream have no status code
+            status_code = e.status_code if e.status_code >= 400 else 502
+            raise HTTPException(detail=e.error, status_code=status_code) from e
+
     def _convert_messages(self, messages: list[ChatMessage]) -> list[dict[str, str]]:
         """Converts messages to Ollama format."""
         return [{"role": message.role, "content": message.content} for message in messages]
@@ -0,0 +1,161 @@
+import asyncio
+import cProfile
+import marshal
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from http import HTTPStatus
+from types import FrameType
+from typing import Literal
+
+from litestar.exceptions import HTTPException
+
+from config.settings import PROFILE_MAX_KEPT, PROFILE_SAMPLE_INTERVAL
+
+ProfileFormat = Literal["collapsed", "pstats"]
+
+BUSY_DETAIL = "A profile of the worker is already running, retry later."
+
+
+class ProfileSession(ABC):
+    """Profile of the event-loop thread, from its start to its stop."""
+
+    @abstractmethod
+    def start(self) -> None:
+        """Starts profiling, from the event-loop thread."""
+
+    @abstractmethod
+    def stop(self) -> bytes:
+        """Stops profiling and returns the profile."""
+
+
+class CProfileSession(ProfileSession):
+    """
+    Deterministic profile of every call, as a pstats file.
+
+    The file is read with `python -m pstats` or turned into a flame graph by snakeviz or
+    flameprof. Every call is timed, which slows the worker down while it runs.
+    """
+
+    def __init__(self) -> None:
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def stop(self) -> bytes:
+        self._profile.disable()
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+
+class SamplingSession(ProfileSession):
+    """
+    Statistical profile of the event-loop thread, as collapsed stacks.
+
+    A thread takes the stack of the loop every `interval`, the worker itself is not
+    instrumented. Each line of the result is a stack, from the outermost frame, and the
+    number of samples of it: the format of flamegraph.pl and speedscope.
+
+    The thread needs the GIL to take a sample, so it lands where the loop releases it, in
+    the selector or an I/O call, or after the switch interval of the interpreter (5ms). The
+    steps hogging the CPU, those slowing the worker down, are sampled in proportion to their
+    duration, the shorter steps less faithfully.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self._stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident(),), name="profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> bytes:
+        self._stopped.set()
+        if self._thread is not None:
+            # The sampler wakes up every interval, a few milliseconds at most
+            self._thread.join()
+        lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+        return "\n".join(lines).encode() + b"\n"
+
+    def _sample(self, thread_id: int) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._stacks[_collapse(frame)] += 1
+
+
+def _collapse(frame: FrameType | None) -> str:
+    """Returns the stack of a frame from the outermost frame, one function per item."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """
+    On-demand profiles of the worker, for the admin endpoints and the profiled requests.
+
+    Nothing runs between the profiles: the sampler thread and the profiling hooks only exist
+    while a profile is taken, one at a time per worker. The profiles of single requests are
+    kept, the least recent ones dropped once `max_kept` is reached, to be downloaded later.
+    """
+
+    def __init__(self, max_kept: int = PROFILE_MAX_KEPT) -> None:
+        self.max_kept = max_kept
+        self.session: ProfileSession | None = None
+        self._profiles: OrderedDict[str, tuple[ProfileFormat, bytes]] = OrderedDict()
+
+    def start(self, profile_format: ProfileFormat) -> ProfileSession:
+        """
+        Starts a profile of the worker.
+
+        Raises:
+            HTTPException: If a profile is already running (409).
+        """
+        if self.session is not None:
+            raise HTTPException(detail=BUSY_DETAIL, status_code=HTTPStatus.CONFLICT)
+        session = CProfileSession() if profile_format == "pstats" else SamplingSession()
+        try:
+            session.start()
+        except ValueError as e:
+            # Another profiler, or a coverage tool, holds the profiling hooks
+            raise HTTPException(detail=BUSY_DETAIL, status_code=HTTPStatus.CONFLICT) from e
+        self.session = session
+        return session
+
+    def stop(self, session: ProfileSession) -> bytes:
+        """Stops a profile and returns it."""
+        self.session = None
+        return session.stop()
+
+    async def profile(self, seconds: float, profile_format: ProfileFormat) -> bytes:
+        """Profiles the worker for `seconds` and returns the profile."""
+        session = self.start(profile_format)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = self.stop(session)
+        return profile
+
+    def keep(self, profile_id: str, profile_format: ProfileFormat, profile: bytes) -> None:
+        """Keeps the profile of a request to be downloaded."""
+        self._profiles[profile_id] = (profile_format, profile)
+        if len(self._profiles) > self.max_kept:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> tuple[ProfileFormat, bytes] | None:
+        """Returns the format and content of a kept profile, if any."""
+        return self._profiles.get(profile_id)
+
+
+profiler = Profiler()
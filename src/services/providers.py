@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from collections.abc import Callable
+
+from config.settings import DUMMY_ENABLED, GEMINI_ENABLED, OLLAMA_ENABLED
+from services.ai_service_interface import AIServiceInterface
+
+
+def _create_ollama_service() -> AIServiceInterface:
+    from services.ollama_service import OllamaService
+
+    return OllamaService()
+
+
+def _create_gemini_service() -> AIServiceInterface:
+    from services.gemini_service import GeminiService
+
+    return GeminiService()
+
+
+def _create_dummy_service() -> AIServiceInterface:
+    from services.dummy_service import DummyService
+
+    return DummyService()
+
+
+# Factories of the providers, in the order a model is looked up in
+PROVIDER_FACTORIES: list[tuple[bool, Callable[[], AIServiceInterface]]] = [
+    (OLLAMA_ENABLED, _create_ollama_service),
+    (GEMINI_ENABLED, _create_gemini_service),
+    (DUMMY_ENABLED, _create_dummy_service),
+]
+
+
+class ProviderRegistry:
+    """
+    Services of the enabled providers, shared by all requests.
+
+    The SDK of a provider is only imported when its service is first needed, so the
+    application starts without paying for them, and never for the disabled providers.
+    """
+
+    def __init__(
+        self, factories: list[tuple[bool, Callable[[], AIServiceInterface]]] = PROVIDER_FACTORIES
+    ) -> None:
+        self._factories = factories
+        self._services: list[AIServiceInterface] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> list[AIServiceInterface]:
+        """Services created so far, without importing any provider."""
+        return self._services or []
+
+    def get_services(self) -> list[AIServiceInterface]:
+        """Returns the services of the enabled providers, created on first call."""
+        # Called from a worker thread by the warm-up and the first requests
+        with self._lock:
+            if self._services is None:
+                self._services = [factory() for enabled, factory in self._factories if enabled]
+            return self._services
+
+    async def close(self) -> None:
+        """Closes the upstream clients of the services created."""
+        await asyncio.gather(*(service.close() for service in self.loaded))
+
+
+providers = ProviderRegistry()
+
+
+async def provide_services() -> list[AIServiceInterface]:
+    """Dependency returning the services, imported off the event loop the first time."""
+    if providers.loaded:
+        return providers.loaded
+    return await asyncio.to_thread(providers.get_services)
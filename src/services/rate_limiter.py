@@ -0,0 +1,191 @@
+import logging
+import math
+import sqlite3
+import struct
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from time import monotonic, time
+
+from config.settings import (
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_MAX_CLIENTS,
+    RATE_LIMIT_REQUESTS_PER_SECOND,
+    RATE_LIMIT_TOKENS_PER_MINUTE,
+)
+from services.shared_state import SharedStore, shared_state
+
+logger = logging.getLogger(__name__)
+
+# Tokens left and time of the last refill
+_BUCKET = struct.Struct("dd")
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    """Outcome of a token-bucket check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Returns the standard `X-RateLimit-*` headers describing this result."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class BucketStore(ABC):
+    """Storage backend holding the token buckets of every client."""
+
+    @abstractmethod
+    def consume(
+        self, key: str, capacity: float, refill_rate: float, cost: float
+    ) -> tuple[bool, float]:
+        """
+        Refills the bucket of `key` and takes `cost` tokens from it if enough are available.
+
+        Returns whether the tokens were taken and the number of tokens left in the bucket.
+        """
+
+
+class InMemoryBucketStore(BucketStore):
+    """
+    Per-process bucket store.
+
+    A check is a dictionary lookup and a few float operations with no `await` in between,
+    so it is atomic on the event loop and does not need any lock. The least recently seen
+    clients are dropped once `max_keys` is reached, a dropped client starts again with a
+    full bucket.
+    """
+
+    def __init__(
+        self, max_keys: int = RATE_LIMIT_MAX_CLIENTS, clock: Callable[[], float] = monotonic
+    ) -> None:
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def consume(
+        self, key: str, capacity: float, refill_rate: float, cost: float
+    ) -> tuple[bool, float]:
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [capacity, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            bucket[1] = now
+
+        if bucket[0] < cost:
+            return False, bucket[0]
+        bucket[0] -= cost
+        return True, bucket[0]
+
+
+class SharedBucketStore(BucketStore):
+    """
+    Bucket store shared by the workers of the host, so that a client gets its limits once
+    and not once per worker.
+
+    A check reads and writes the bucket in a transaction of the shared store, the other
+    workers wait for it. The buckets share the LRU eviction of the other entries of the
+    store, and are timed with the wall clock, common to the processes.
+
+    The check fails open: when the database stays locked for the busy timeout of the store,
+    the request passes and the bucket is left as is, rather than blocking the event loop.
+    """
+
+    def __init__(
+        self, store: SharedStore, prefix: str = "bucket:", clock: Callable[[], float] = time
+    ) -> None:
+        self.store = store
+        self.prefix = prefix
+        self._clock = clock
+
+    def consume(
+        self, key: str, capacity: float, refill_rate: float, cost: float
+    ) -> tuple[bool, float]:
+        key = self.prefix + key
+        try:
+            return self._consume(key, capacity, refill_rate, cost)
+        except sqlite3.OperationalError:
+            logger.warning("Shared rate-limit state locked by another worker, check skipped")
+            return True, capacity
+
+    def _consume(
+        self, key: str, capacity: float, refill_rate: float, cost: float
+    ) -> tuple[bool, float]:
+        with self.store.transaction():
+            now = self._clock()
+            packed = self.store.get(key)
+            if packed is None:
+                tokens = capacity
+            else:
+                tokens, updated = _BUCKET.unpack(packed)  # type: ignore[arg-type]
+                tokens = min(capacity, tokens + max(0.0, now - updated) * refill_rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.store.set(key, _BUCKET.pack(tokens, now))
+        return allowed, tokens
+
+
+def default_bucket_store() -> BucketStore:
+    """Returns the shared bucket store if a shared state is configured, else a per-process one."""
+    if shared_state is not None:
+        return SharedBucketStore(shared_state)
+    return InMemoryBucketStore()
+
+
+class RateLimiter:
+    """Token-bucket limiter on requests per second and tokens per minute for each client."""
+
+    def __init__(
+        self,
+        requests_per_second: float = RATE_LIMIT_REQUESTS_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        tokens_per_minute: int = RATE_LIMIT_TOKENS_PER_MINUTE,
+        store: BucketStore | None = None,
+    ) -> None:
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.tokens_per_minute = tokens_per_minute
+        self.store = store or default_bucket_store()
+
+    def check_request(self, client_key: str) -> RateLimitResult:
+        """Takes one request from the request bucket of the client."""
+        return self._consume(f"req:{client_key}", self.burst, self.requests_per_second, 1)
+
+    def check_tokens(self, client_key: str, tokens: int) -> RateLimitResult:
+        """Takes `tokens` from the token bucket of the client."""
+        # A request larger than the whole budget empties the bucket instead of never passing
+        cost = min(tokens, self.tokens_per_minute)
+        return self._consume(
+            f"tok:{client_key}", self.tokens_per_minute, self.tokens_per_minute / 60, cost
+        )
+
+    def _consume(self, key: str, capacity: int, refill_rate: float, cost: int) -> RateLimitResult:
+        allowed, remaining = self.store.consume(key, capacity, refill_rate, cost)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=capacity,
+            remaining=math.floor(remaining),
+            reset_after=(capacity - remaining) / refill_rate,
+            retry_after=0.0 if allowed else (cost - remaining) / refill_rate,
+        )
@@ -0,0 +1,89 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class ReasoningParser:
+    """
+    Incremental splitter of the `<think>…</think>` reasoning emitted inline by some models.
+
+    The text is fed as it is streamed: a tag may be split over several pieces, so the end of
+    a piece that could start a tag is held back until the next one tells. The whitespace
+    following a tag is dropped, the models separate the reasoning from the answer with it.
+    """
+
+    __slots__ = ("_pending", "_reasoning", "_strip")
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._reasoning = False
+        self._strip = False
+
+    def feed(self, text: str) -> list[tuple[bool, str]]:
+        """Returns the `(is_reasoning, text)` pieces of `text` that are known so far."""
+        # Most tokens are plain words, no tag can start or end in them
+        if "<" not in text and not self._pending and not self._strip:
+            return [(self._reasoning, text)]
+
+        text = self._pending + text
+        self._pending = ""
+        pieces: list[tuple[bool, str]] = []
+        while text:
+            tag = THINK_CLOSE if self._reasoning else THINK_OPEN
+            end = text.find(tag)
+            if end >= 0:
+                self._add(pieces, text[:end])
+                self._reasoning = not self._reasoning
+                self._strip = True
+                text = text[end + len(tag) :]
+                continue
+
+            # Holds back a trailing "<", "</th"... until the next piece completes or breaks it
+            start = text.find("<", max(len(text) - len(tag) + 1, 0))
+            while start >= 0 and not tag.startswith(text[start:]):
+                start = text.find("<", start + 1)
+            if start >= 0:
+                self._pending = text[start:]
+                text = text[:start]
+            self._add(pieces, text)
+            break
+        return pieces
+
+    def flush(self) -> list[tuple[bool, str]]:
+        """Returns the text held back at the end of the stream."""
+        pieces: list[tuple[bool, str]] = []
+        self._add(pieces, self._pending)
+        self._pending = ""
+        return pieces
+
+    def _add(self, pieces: list[tuple[bool, str]], text: str) -> None:
+        if self._strip:
+            text = text.lstrip()
+            # Until the first character that is not whitespace, possibly in a later piece
+            self._strip = not text
+        if text:
+            pieces.append((self._reasoning, text))
+
+
+def split_reasoning(text: str) -> tuple[str, str]:
+    """Returns the reasoning and the content of a complete text."""
+    parser = ReasoningParser()
+    reasoning: list[str] = []
+    content: list[str] = []
+    for is_reasoning, piece in parser.feed(text) + parser.flush():
+        (reasoning if is_reasoning else content).append(piece)
+    return "".join(reasoning).rstrip(), "".join(content)
+
+
+async def parse_reasoning(
+    stream: AsyncGenerator[str, Any],
+) -> AsyncGenerator[tuple[bool, str], Any]:
+    """Generates the `(is_reasoning, text)` pieces of a stream of text."""
+    parser = ReasoningParser()
+    async for text in stream:
+        for piece in parser.feed(text):
+            yield piece
+    for piece in parser.flush():
+        yield piece
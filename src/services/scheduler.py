@@ -0,0 +1,265 @@
+import asyncio
+import heapq
+import itertools
+import weakref
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any
+
+from litestar.connection import ASGIConnection
+from litestar.exceptions import ServiceUnavailableException
+
+from config.settings import (
+    SCHEDULER_API_KEY_PRIORITIES,
+    SCHEDULER_DEFAULT_PRIORITY,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_MAX_QUEUE,
+    SCHEDULER_PRIORITY_WEIGHTS,
+)
+from middleware.rate_limit import get_api_key
+from services.ai_service_interface import AIServiceInterface
+from services.metrics import registry
+
+PRIORITY_HEADER = "x-priority"
+
+queue_time = registry.histogram(
+    "ollaix_scheduler_queue_seconds",
+    "Time spent waiting for a backend slot, per priority class.",
+    ["backend", "priority"],
+)
+queued_requests = registry.gauge(
+    "ollaix_scheduler_queued_requests",
+    "Requests waiting for a backend slot.",
+    ["backend", "priority"],
+)
+active_requests = registry.gauge(
+    "ollaix_scheduler_active_requests", "Requests holding a backend slot.", ["backend"]
+)
+preempted_requests = registry.counter(
+    "ollaix_scheduler_preempted_total",
+    "Queued requests evicted to make room for a higher priority class.",
+    ["backend", "priority"],
+)
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    sequence: int
+    priority: str = field(compare=False)
+    cost: int = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=monotonic)
+
+
+class SchedulerSlot:
+    """Slot granted on a backend, released once the generation is over."""
+
+    def __init__(self, backend: "BackendScheduler", cost: int) -> None:
+        self._backend: BackendScheduler | None = backend
+        self._cost = cost
+
+    def release(self) -> None:
+        """Gives the slot back to the backend, calling it several times has no effect."""
+        if self._backend is not None:
+            backend, self._backend = self._backend, None
+            backend.release(self._cost)
+
+
+class BackendScheduler:
+    """
+    Weighted fair queue in front of one backend.
+
+    Each priority class receives a share of the backend slots proportional to its weight.
+    Requests are dispatched in the order of their virtual finish tag (start-time fair
+    queuing, the cost of a request being the number of generations it runs). Once
+    dispatched a request keeps its slots until the generation finishes, only queued requests
+    can be preempted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+        weights: dict[str, float] = SCHEDULER_PRIORITY_WEIGHTS,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.weights = weights
+        self.active = 0
+        self._queue: list[_Waiter] = []
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, priority: str, cost: int = 1) -> SchedulerSlot:
+        """
+        Waits until the backend can run `cost` more generations.
+
+        Raises:
+            ServiceUnavailableException: If the queue is full, or if the request was evicted
+                from the queue by a request of a higher priority class.
+        """
+        # A request larger than the backend runs alone rather than never
+        cost = min(cost, self.max_concurrency)
+        if self.active + cost <= self.max_concurrency and not self._queue:
+            self._grant(priority, cost, 0.0)
+            return SchedulerSlot(self, cost)
+
+        if len(self._queue) >= self.max_queue:
+            self._preempt_for(priority)
+
+        start_tag = max(self._virtual_time, self._last_finish.get(priority, 0.0))
+        finish_tag = start_tag + cost / self.weights[priority]
+        self._last_finish[priority] = finish_tag
+        waiter = _Waiter(
+            finish_tag,
+            next(self._sequence),
+            priority,
+            cost,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queue, waiter)
+        queued_requests.inc(backend=self.name, priority=priority)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            future = waiter.future
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was granted at the same time the request was cancelled
+                self.release(cost)
+            elif waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                queued_requests.dec(backend=self.name, priority=priority)
+            raise
+        return SchedulerSlot(self, cost)
+
+    def release(self, cost: int = 1) -> None:
+        """Frees the slots of a finished request and dispatches the next queued requests."""
+        self.active -= cost
+        active_requests.set(self.active, backend=self.name)
+        while self._queue and self.active + self._queue[0].cost <= self.max_concurrency:
+            waiter = heapq.heappop(self._queue)
+            queued_requests.dec(backend=self.name, priority=waiter.priority)
+            self._virtual_time = max(
+                self._virtual_time,
+                waiter.finish_tag - waiter.cost / self.weights[waiter.priority],
+            )
+            self._grant(waiter.priority, waiter.cost, monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _grant(self, priority: str, cost: int, waited: float) -> None:
+        self.active += cost
+        active_requests.set(self.active, backend=self.name)
+        queue_time.observe(waited, backend=self.name, priority=priority)
+
+    def _preempt_for(self, priority: str) -> None:
+        """Evicts the most recent request of the lowest priority class below `priority`."""
+        weight = self.weights[priority]
+        candidates = [w for w in self._queue if self.weights[w.priority] < weight]
+        if not candidates:
+            raise ServiceUnavailableException(
+                detail=f"Backend '{self.name}' is saturated, please retry later.",
+                headers={"Retry-After": "1"},
+            )
+
+        victim = min(candidates, key=lambda w: (self.weights[w.priority], -w.sequence))
+        self._queue.remove(victim)
+        heapq.heapify(self._queue)
+        queued_requests.dec(backend=self.name, priority=victim.priority)
+        preempted_requests.inc(backend=self.name, priority=victim.priority)
+        victim.future.set_exception(
+            ServiceUnavailableException(
+                detail="Request preempted by higher priority traffic, please retry later.",
+                headers={"Retry-After": "1"},
+            )
+        )
+
+
+class Scheduler:
+    """Dispatches generations to the backends through one weighted fair queue per backend."""
+
+    def __init__(self) -> None:
+        self._backends: dict[str, BackendScheduler] = {}
+
+    def backend(self, service: AIServiceInterface, model: str) -> BackendScheduler:
+        """Returns the queue of the backend serving `model`."""
+        name = f"{service.provider_name}:{service.get_backend(model)}"
+        backend = self._backends.get(name)
+        if backend is None:
+            max_concurrency = SCHEDULER_MAX_CONCURRENCY.get(
+                service.provider_name, 1
+            ) * service.get_replica_count(model)
+            backend = self._backends[name] = BackendScheduler(name, max_concurrency)
+        return backend
+
+    @asynccontextmanager
+    async def slot(
+        self, service: AIServiceInterface, model: str, priority: str, cost: int = 1
+    ) -> AsyncIterator[None]:
+        """Holds `cost` backend slots for the duration of the context."""
+        slot = await self.backend(service, model).acquire(priority, cost)
+        try:
+            yield
+        finally:
+            slot.release()
+
+    async def stream(
+        self,
+        service: AIServiceInterface,
+        model: str,
+        priority: str,
+        stream: AsyncGenerator[bytes, Any],
+        cost: int = 1,
+    ) -> AsyncGenerator[bytes, Any]:
+        """
+        Waits for `cost` backend slots, then returns `stream` wrapped to hold them until the end.
+
+        The slot is taken before the response starts, so a full queue or a preemption is
+        reported as a regular error response instead of a broken stream.
+        """
+        slot = await self.backend(service, model).acquire(priority, cost)
+
+        async def scheduled_stream() -> AsyncGenerator[bytes, Any]:
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                slot.release()
+
+        generator = scheduled_stream()
+        # Releases the slot even if the response is dropped before the stream is started
+        weakref.finalize(generator, slot.release)
+        return generator
+
+
+def get_priority_class(request: ASGIConnection) -> str:
+    """
+    Returns the priority class of a request.
+
+    The class assigned to the API key of the client wins, so that a key configured for batch
+    traffic cannot claim a higher class. Otherwise the `X-Priority` header is used when it
+    names a known class, then the default class.
+    """
+    api_key = get_api_key(request.headers)
+    if api_key in SCHEDULER_API_KEY_PRIORITIES:
+        return SCHEDULER_API_KEY_PRIORITIES[api_key]
+
+    priority = request.headers.get(PRIORITY_HEADER, "").lower()
+    if priority in SCHEDULER_PRIORITY_WEIGHTS:
+        return priority
+
+    return SCHEDULER_DEFAULT_PRIORITY
+
+
+scheduler = Scheduler()
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+import msgspec
+
+from config.settings import (
+    SEMANTIC_CACHE_EMBEDDING_MODEL,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_MODEL_THRESHOLDS,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+)
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse
+from services.ai_service_interface import AIServiceInterface
+from services.embeddings import embedding_batcher
+from services.metrics import registry
+from services.providers import provide_services
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, installed with the `semantic-cache` extra
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Searched in a worker thread above this many vector values (entries by dimensions), about
+# a millisecond of search, to keep the event loop free
+OFFLOAD_VALUES = 5_000_000
+
+cache_requests = registry.counter(
+    "ollaix_semantic_cache_requests_total",
+    "Completion requests looked up in the semantic cache, by result.",
+    ["model", "result"],
+)
+lookup_time = registry.histogram(
+    "ollaix_semantic_cache_lookup_seconds",
+    "Time to embed the last message of a request and search the semantic cache.",
+    ["model"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+_encoder = msgspec.json.Encoder()
+
+
+class SemanticIndex:
+    """
+    Cached responses of a model, found by the cosine similarity of their prompt vectors.
+
+    The unit vectors are the rows of one float32 matrix, a search is a single matrix-vector
+    product over the entries of the same context, skipping the expired ones. The matrix grows
+    by doubling up to `max_entries`, then a new entry replaces an expired one, or the oldest.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int, ttl: float) -> None:
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.size = 0
+        self._vectors = np.zeros((0, dimensions), np.float32)
+        self._contexts = np.zeros(0, np.int64)
+        self._expires_at = np.zeros(0, np.float64)
+        self._responses: list[ChatCompletionResponse | None] = []
+
+    def search(self, vector: Any, context: int, threshold: float, now: float) -> int | None:
+        """Returns the entry of the context most similar to `vector`, if similar enough."""
+        # Read once, the arrays may be replaced by `add` while searched in a thread
+        vectors, contexts, expires_at = self._vectors, self._contexts, self._expires_at
+        size = self.size
+        if not size:
+            return None
+        scores = vectors[:size] @ vector
+        scores[(contexts[:size] != context) | (expires_at[:size] < now)] = -np.inf
+        entry = int(scores.argmax())
+        return None if scores[entry] < threshold else entry
+
+    def get(
+        self, entry: int, vector: Any, context: int, threshold: float, now: float
+    ) -> ChatCompletionResponse | None:
+        """
+        Returns the response of an entry found by a search.
+
+        The entry is checked again, it may have been replaced while searched in a thread.
+        """
+        if (
+            self._contexts[entry] != context
+            or self._expires_at[entry] < now
+            or self._vectors[entry] @ vector < threshold
+        ):
+            return None
+        return self._responses[entry]
+
+    def add(self, vector: Any, context: int, response: ChatCompletionResponse, now: float) -> None:
+        entry = self._allocate()
+        self._vectors[entry] = vector
+        self._contexts[entry] = context
+        self._expires_at[entry] = now + self.ttl
+        self._responses[entry] = response
+
+    def _allocate(self) -> int:
+        """Returns a free entry, growing the matrix or replacing the oldest entry."""
+        if self.size == len(self._expires_at) and self.size < self.max_entries:
+            capacity = min(self.max_entries, max(16, self.size * 2))
+            self._vectors = np.resize(self._vectors, (capacity, self.dimensions))
+            self._contexts = np.resize(self._contexts, capacity)
+            self._expires_at = np.resize(self._expires_at, capacity)
+            self._responses.extend([None] * (capacity - len(self._responses)))
+        if self.size < len(self._expires_at):
+            self.size += 1
+            return self.size - 1
+        # The TTL is the same for all the entries, the oldest is the first expired if any
+        return int(self._expires_at[: self.size].argmin())
+
+
+class SemanticCache:
+    """
+    Cache of the complete chat completions, hit by requests asking nearly the same thing.
+
+    The last user message is embedded by a model of the gateway, `embedding_model`, and
+    compared to the cached ones of the model. The rest of the request, the history and the
+    sampling parameters, must match exactly. A hit is a copy of the cached response with its
+    own id. The cache is per worker, and fails open: a failed embedding only skips it.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        model_thresholds: dict[str, float] = SEMANTIC_CACHE_MODEL_THRESHOLDS,
+        embedding_model: str = SEMANTIC_CACHE_EMBEDDING_MODEL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if enabled and np is None:
+            raise RuntimeError(
+                "The semantic cache needs numpy, install the `semantic-cache` extra"
+            )
+        if enabled and not embedding_model:
+            raise RuntimeError("The semantic cache needs SEMANTIC_CACHE_EMBEDDING_MODEL")
+        self.enabled = enabled
+        self.threshold = threshold
+        self.model_thresholds = model_thresholds
+        self.embedding_model = embedding_model
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._indexes: dict[str, SemanticIndex] = {}
+
+    async def run(
+        self,
+        request: ChatCompletionRequest,
+        priority: str,
+        generate: Callable[[], Awaitable[ChatCompletionResponse]],
+    ) -> ChatCompletionResponse:
+        """Returns the cached response of a similar request, or generates and caches it."""
+        if not self.enabled or request.stream or request.messages[-1].role != "user":
+            return await generate()
+
+        start = time.perf_counter()
+        try:
+            vector = await self._embed(request.messages[-1].content, priority)
+        except Exception:
+            logger.exception("Embedding for the semantic cache failed")
+            return await generate()
+        context = self._context(request)
+        index = self._indexes.get(request.model)
+        cached = None if index is None else await self._search(index, request, vector, context)
+        lookup_time.observe(time.perf_counter() - start, model=request.model)
+        cache_requests.inc(model=request.model, result="miss" if cached is None else "hit")
+        if cached is not None:
+            return msgspec.structs.replace(cached, id=uuid4(), created=datetime.now())
+
+        response = await generate()
+        if request.model not in self._indexes:
+            self._indexes[request.model] = SemanticIndex(len(vector), self.max_entries, self.ttl)
+        self._indexes[request.model].add(vector, context, response, self._clock())
+        return response
+
+    async def _search(
+        self, index: SemanticIndex, request: ChatCompletionRequest, vector: Any, context: int
+    ) -> ChatCompletionResponse | None:
+        threshold = self.model_thresholds.get(request.model, self.threshold)
+        now = self._clock()
+        if index.size * index.dimensions <= OFFLOAD_VALUES:
+            found = index.search(vector, context, threshold, now)
+        else:
+            # numpy releases the GIL during the product
+            found = await asyncio.to_thread(index.search, vector, context, threshold, now)
+        if found is None:
+            return None
+        return index.get(found, vector, context, threshold, now)
+
+    async def _embed(self, text: str, priority: str) -> Any:
+        """Returns the unit vector of a message, as a float32 array."""
+        service = AIServiceInterface.get_embedding_service(
+            self.embedding_model, await provide_services()
+        )
+        [values] = await embedding_batcher.embed(service, self.embedding_model, [text], priority)
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _context(self, request: ChatCompletionRequest) -> int:
+        """Returns the hash of everything in the request but the last message."""
+        return hash(
+            _encoder.encode(
+                (
+                    request.messages[:-1],
+                    request.n,
+                    request.max_tokens,
+                    request.temperature,
+                    request.top_p,
+                    request.stop,
+                    request.reasoning,
+                )
+            )
+        )
+
+
+semantic_cache = SemanticCache()
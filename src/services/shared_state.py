@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+from time import time
+
+from config.settings import SHARED_STATE_BUSY_TIMEOUT, SHARED_STATE_MAX_ENTRIES, SHARED_STATE_PATH
+
+Value = bytes | str | int | float
+
+
+class SharedStore:
+    """
+    Key-value store shared by the worker processes of a host, in a SQLite database in WAL mode.
+
+    Each worker opens its own connection to the same file: a `get` is a plain read, which
+    never waits for the writers, the writers take the database lock in turn for the few
+    microseconds of a statement, so a single operation is atomic across the workers. A
+    read-modify-write spanning several operations runs in `transaction()`.
+
+    The least recently used entries are dropped once `max_entries` is exceeded. The eviction
+    runs every `eviction_interval` writes of a worker, the store may exceed its size by that
+    many entries per worker in between. The entries read are marked used in bulk, before
+    an eviction or every `eviction_interval` reads.
+
+    The operations are synchronous, they take a few microseconds on a local disk and run
+    on the event loop like the lookups of the per-process dictionaries they replace. A write
+    waits at most `busy_timeout` for the lock held by another worker, then raises
+    `sqlite3.OperationalError`: the callers fail open.
+    """
+
+    eviction_interval = 256
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = SHARED_STATE_MAX_ENTRIES,
+        busy_timeout: float = SHARED_STATE_BUSY_TIMEOUT,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        self.max_entries = max_entries
+        self._clock = clock
+        self._writes = 0
+        # Keys read since the last update of their use time, with the time of their last read
+        self._used: dict[str, float] = {}
+        # Reentrant for the operations run inside a transaction of the same thread
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=busy_timeout
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Durable up to the last checkpoint, enough for a cache and counters
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value ANY, used REAL NOT NULL) STRICT, WITHOUT ROWID"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT count(*) FROM entries").fetchone()[0]
+
+    @contextmanager
+    def transaction(self) -> Iterator["SharedStore"]:
+        """Runs the operations of the block atomically, the other workers wait for its end."""
+        with self._lock:
+            if self._connection.in_transaction:
+                yield self
+                return
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def get(self, key: str) -> Value | None:
+        """Returns the value of `key` and marks it as recently used, `None` if unknown."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._used[key] = self._clock()
+            if len(self._used) >= self.eviction_interval:
+                # Another worker may hold the lock, the keys are then marked by a later call
+                with suppress(sqlite3.OperationalError):
+                    self._mark_used()
+        return row[0]
+
+    def set(self, key: str, value: Value) -> None:
+        """Stores the value of `key`."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, value, self._clock())
+            )
+            self._written()
+
+    def incr(self, key: str, amount: int | float = 1) -> int | float:
+        """Adds `amount` to the counter of `key`, starting from 0, and returns its new value."""
+        with self._lock:
+            row = self._connection.execute(
+                "INSERT INTO entries VALUES (?, ?, ?) ON CONFLICT (key) "
+                "DO UPDATE SET value = value + excluded.value, used = excluded.used "
+                "RETURNING value",
+                (key, amount, self._clock()),
+            ).fetchone()
+            self._written()
+        return row[0]
+
+    def delete(self, key: str) -> None:
+        """Removes `key` if present."""
+        with self._lock:
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def evict(self) -> None:
+        """Drops the least recently used entries beyond `max_entries`."""
+        with self._lock:
+            self._mark_used()
+            self._connection.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _mark_used(self) -> None:
+        """Writes the use time of the entries read since the last call."""
+        if not self._used:
+            return
+        with self.transaction():
+            self._connection.executemany(
+                "UPDATE entries SET used = ? WHERE key = ?",
+                [(at, key) for key, at in self._used.items()],
+            )
+        self._used.clear()
+
+    def _written(self) -> None:
+        self._writes += 1
+        if self._writes % self.eviction_interval == 0:
+            self.evict()
+
+
+# Shared by the workers when a path is configured, per-process state otherwise
+shared_state = SharedStore(SHARED_STATE_PATH) if SHARED_STATE_PATH else None
@@ -0,0 +1,89 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+
+class StopMatcher:
+    """
+    Incremental search of the stop sequences in a streamed text.
+
+    The text is fed as it is streamed: the longest end of the text that could start a stop
+    sequence is held back until the next piece completes or breaks it, the rest is known to
+    precede any stop sequence. The text stops at the first sequence to end, so the result
+    does not depend on how the text is split.
+    """
+
+    __slots__ = ("_first_chars", "_max_held", "_pending", "_stops", "stopped")
+
+    def __init__(self, stops: list[str]) -> None:
+        self._stops = stops
+        self._first_chars = {stop[0] for stop in stops}
+        self._max_held = max(len(stop) for stop in stops) - 1
+        self._pending = ""
+        self.stopped = False
+
+    def feed(self, text: str) -> str:
+        """Returns the text preceding the stop sequences known so far."""
+        text = self._pending + text
+        self._pending = ""
+
+        end, start = len(text) + 1, 0
+        for stop in self._stops:
+            index = text.find(stop)
+            if index >= 0 and (index + len(stop), index) < (end, start):
+                end, start = index + len(stop), index
+        if end <= len(text):
+            self.stopped = True
+            return text[:start]
+
+        held = self._get_held_start(text)
+        self._pending = text[held:]
+        return text[:held]
+
+    def flush(self) -> str:
+        """Returns the text held back at the end of the stream."""
+        text, self._pending = self._pending, ""
+        return text
+
+    def _get_held_start(self, text: str) -> int:
+        """Returns the start of the longest end of the text that starts a stop sequence."""
+        for start in range(max(len(text) - self._max_held, 0), len(text)):
+            if text[start] in self._first_chars:
+                suffix = text[start:]
+                if any(stop.startswith(suffix) for stop in self._stops):
+                    return start
+        return len(text)
+
+
+def get_stop_sequences(stop: str | list[str] | None) -> list[str]:
+    """Returns the stop sequences of a request, given as one string or a list."""
+    if stop is None:
+        return []
+    return [stop] if isinstance(stop, str) else stop
+
+
+def truncate_at_stop(text: str, stops: list[str]) -> str:
+    """Returns the text preceding the first stop sequence of a complete text."""
+    matcher = StopMatcher(stops)
+    text = matcher.feed(text)
+    return text if matcher.stopped else text + matcher.flush()
+
+
+async def stop_at(stream: AsyncGenerator[str, Any], stops: list[str]) -> AsyncGenerator[str, Any]:
+    """
+    Generates the text of a stream up to its first stop sequence.
+
+    The stream is closed as soon as a sequence is found, which ends the upstream request and
+    frees the backend instead of letting it generate text thrown away.
+    """
+    matcher = StopMatcher(stops)
+    try:
+        async for text in stream:
+            text = matcher.feed(text)
+            if text:
+                yield text
+            if matcher.stopped:
+                return
+        if text := matcher.flush():
+            yield text
+    finally:
+        await stream.aclose()
@@ -0,0 +1,207 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any
+from uuid import uuid4
+
+from litestar.exceptions import NotFoundException, ServiceUnavailableException
+
+from config.settings import STREAM_STALLED_AFTER
+from schemas.admin_schemas import ActiveStreamInfo
+from services.stream_state import encode_sse_error
+
+# Messages of the cancellation of the streams still running at the end of a drain, and of
+# the streams cancelled by an administrator
+DRAIN_CANCEL_MESSAGE = "drain deadline exceeded"
+ADMIN_CANCEL_MESSAGE = "cancelled by an administrator"
+SHUTDOWN_DETAIL = "Server is shutting down, please retry."
+CANCEL_DETAIL = "The stream was cancelled by the server."
+# Delay between two checks of the streams left while draining, in seconds
+DRAIN_POLL_INTERVAL = 0.1
+
+
+class ActiveStream:
+    """Completion stream in flight, with its progress for the admin endpoints."""
+
+    __slots__ = (
+        "bytes",
+        "client",
+        "events",
+        "host",
+        "id",
+        "last_event",
+        "model",
+        "provider",
+        "started",
+        "started_at",
+        "task",
+    )
+
+    def __init__(
+        self, task: asyncio.Task, model: str, provider: str, host: str, client: str
+    ) -> None:
+        self.id = uuid4().hex
+        self.task = task
+        self.model = model
+        self.provider = provider
+        # Backend serving the model, refined by the service once it picked a replica
+        self.host = host
+        self.client = client
+        self.started_at = datetime.now()
+        self.started = monotonic()
+        self.last_event: float | None = None
+        self.events = 0
+        self.bytes = 0
+
+    def to_info(self, now: float) -> ActiveStreamInfo:
+        idle = now - (self.last_event or self.started)
+        return ActiveStreamInfo(
+            id=self.id,
+            model=self.model,
+            provider=self.provider,
+            host=self.host,
+            client=self.client,
+            started_at=self.started_at,
+            age=now - self.started,
+            events=self.events,
+            bytes=self.bytes,
+            last_event_at=(
+                None
+                if self.last_event is None
+                else self.started_at + timedelta(seconds=self.last_event - self.started)
+            ),
+            stalled=idle >= STREAM_STALLED_AFTER,
+        )
+
+
+# Stream of the running generation, for the services to report the replica they picked
+current_stream: ContextVar[ActiveStream | None] = ContextVar("current_stream", default=None)
+
+
+class StreamRegistry:
+    """
+    In-flight completion streams of the process, drained on shutdown.
+
+    Once draining, new completions are refused and the readiness check fails. The streams
+    in flight may finish until the drain deadline, then the remaining ones are cancelled:
+    their backend slot and upstream request are released, and the client receives a
+    terminal error event instead of a stream cut in the middle.
+
+    The streams are registered by id while they are consumed, along with their progress, to
+    be listed and cancelled one by one by an administrator.
+    """
+
+    def __init__(self) -> None:
+        self._streams: dict[str, ActiveStream] = {}
+        self._drain_task: asyncio.Task[int] | None = None
+        self.draining = False
+
+    @property
+    def active(self) -> int:
+        """Number of streams in flight."""
+        return len(self._streams)
+
+    def get_streams(self) -> list[ActiveStreamInfo]:
+        """Returns the streams in flight, the oldest first."""
+        now = monotonic()
+        return [stream.to_info(now) for stream in self._streams.values()]
+
+    def cancel(self, stream_id: str) -> ActiveStreamInfo:
+        """
+        Ends a stream: its generation stops and its client receives a terminal error event.
+
+        Raises:
+            NotFoundException: If no stream with this id is in flight.
+        """
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            raise NotFoundException(detail=f"Stream '{stream_id}' not found.")
+        stream.task.cancel(ADMIN_CANCEL_MESSAGE)
+        return stream.to_info(monotonic())
+
+    def ensure_accepting(self) -> None:
+        """
+        Raises:
+            ServiceUnavailableException: If the server is shutting down.
+        """
+        if self.draining:
+            raise ServiceUnavailableException(detail=SHUTDOWN_DETAIL, headers={"Retry-After": "1"})
+
+    def track(
+        self,
+        stream: AsyncGenerator[bytes, Any],
+        model: str = "",
+        provider: str = "",
+        host: str = "",
+        client: str = "",
+        raise_error: bool = False,
+    ) -> AsyncGenerator[bytes, Any]:
+        """
+        Returns `stream` registered until its end, and ended cleanly when drained or cancelled.
+
+        The stream is registered in the task consuming it, which is cancelled to end it. The
+        stream then ends with an error event, or raises a `ServiceUnavailableException` with
+        `raise_error`, for a transport sending its errors in its own way.
+        """
+
+        async def tracked_stream() -> AsyncGenerator[bytes, Any]:
+            task = asyncio.current_task()
+            assert task is not None
+            active = ActiveStream(task, model, provider, host, client)
+            self._streams[active.id] = active
+            current_stream.set(active)
+            try:
+                async for chunk in stream:
+                    active.events += 1
+                    active.bytes += len(chunk)
+                    active.last_event = monotonic()
+                    yield chunk
+            except asyncio.CancelledError as e:
+                if e.args == (DRAIN_CANCEL_MESSAGE,):
+                    detail = SHUTDOWN_DETAIL
+                elif e.args == (ADMIN_CANCEL_MESSAGE,):
+                    detail = CANCEL_DETAIL
+                else:
+                    raise
+                # The backend stream is already closed, only the response remains to end
+                task.uncancel()
+                if raise_error:
+                    raise ServiceUnavailableException(detail=detail) from None
+                yield encode_sse_error(503, detail)
+            finally:
+                del self._streams[active.id]
+
+        return tracked_stream()
+
+    def accept(self) -> None:
+        """Accepts new completions again after a drain."""
+        self.draining = False
+        self._drain_task = None
+
+    def start_draining(self, timeout: float) -> None:
+        """Starts draining the streams in the background, does nothing if already started."""
+        self.draining = True
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain(timeout))
+
+    async def drain(self, timeout: float) -> int:
+        """Drains the streams, returns the number cancelled at the deadline."""
+        self.start_draining(timeout)
+        assert self._drain_task is not None
+        return await self._drain_task
+
+    async def _drain(self, timeout: float) -> int:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._streams and loop.time() < deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+
+        remaining = list(self._streams.values())
+        for stream in remaining:
+            stream.task.cancel(DRAIN_CANCEL_MESSAGE)
+        return len(remaining)
+
+
+stream_registry = StreamRegistry()
@@ -0,0 +1,243 @@
+import asyncio
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from http import HTTPStatus
+from typing import Any
+from uuid import uuid4
+
+from litestar.exceptions import HTTPException
+
+from config.settings import (
+    STREAM_REPLAY_ENABLED,
+    STREAM_REPLAY_GRACE_PERIOD,
+    STREAM_REPLAY_MAX_BYTES,
+    STREAM_REPLAY_TTL,
+)
+from services.stream_state import SSE_DONE
+
+RESUME_DETAIL = "The stream cannot be resumed anymore, please send the request again."
+
+
+class ReplayStream:
+    """
+    Events of one streamed response, kept to be sent again to a reconnecting client.
+
+    The upstream stream is consumed by a task of its own rather than by the response: after
+    a disconnect the generation goes on for a grace period, during which the client may
+    reconnect to receive the events it missed, then the next ones as they come. Each event
+    carries the id `<stream id>/<sequence number>` the client sends back in Last-Event-ID.
+    """
+
+    __slots__ = (
+        "_abandon_handle",
+        "_changed",
+        "_store",
+        "consumers",
+        "done",
+        "error",
+        "frames",
+        "id",
+        "offset",
+        "resumable",
+        "size",
+    )
+
+    def __init__(self, store: "StreamReplayStore") -> None:
+        self.id = uuid4().hex
+        self.frames: list[bytes] = []
+        # Sequence number of the first event kept, the others were sent and dropped
+        self.offset = 0
+        self.size = 0
+        self.done = False
+        self.error: Exception | None = None
+        self.resumable = True
+        self._store = store
+        self._changed = asyncio.Event()
+        # Responses sending the stream, usually one, none while the client is away
+        self.consumers = 0
+        self._abandon_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def end(self) -> int:
+        """Sequence number of the next event."""
+        return self.offset + len(self.frames)
+
+    async def produce(self, stream: AsyncGenerator[bytes, Any]) -> None:
+        """Consumes the upstream stream until its end."""
+        try:
+            async for chunk in stream:
+                # The id is the last field of the event, its data lines are left as they are.
+                # The [DONE] sentinel is left untouched, it is still replayed when missed
+                if chunk == SSE_DONE:
+                    frame = chunk
+                else:
+                    frame = b"%bid: %b/%d\n\n" % (chunk[:-1], self.id.encode(), self.end)
+                self.frames.append(frame)
+                self.size += len(frame)
+                if self.resumable:
+                    self._store.grow(len(frame))
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            self._store.expire_later(self)
+
+    async def replay(self, last_sequence: int) -> AsyncGenerator[bytes, Any]:
+        """Generates the events after `last_sequence`, then the next ones until the end."""
+        self._attach()
+        try:
+            position = last_sequence + 1
+            while True:
+                while position < self.end:
+                    yield self.frames[position - self.offset]
+                    position += 1
+                if not self.resumable and self.consumers == 1:
+                    # Nobody can reconnect anymore, the events sent are not needed
+                    del self.frames[: position - self.offset]
+                    self.offset = position
+                if self.done:
+                    break
+                await self._changed.wait()
+            if self.error is not None:
+                raise self.error
+        finally:
+            self._detach()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _attach(self) -> None:
+        self.consumers += 1
+        if self._abandon_handle is not None:
+            self._abandon_handle.cancel()
+            self._abandon_handle = None
+
+    def _detach(self) -> None:
+        self.consumers -= 1
+        if not self.consumers and not self.done:
+            if self.resumable:
+                loop = asyncio.get_running_loop()
+                self._abandon_handle = loop.call_later(
+                    self._store.grace_period, self._store.abandon, self
+                )
+            else:
+                self._store.abandon(self)
+
+
+class StreamReplayStore:
+    """
+    Recent streams of the process, resumable with the Last-Event-ID of their events.
+
+    The events of a stream are kept for a TTL after its end. The memory used by the events
+    is capped: over it, the oldest finished streams are evicted, then the oldest running
+    ones, which keep streaming to their client but cannot be resumed anymore.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = STREAM_REPLAY_ENABLED,
+        grace_period: float = STREAM_REPLAY_GRACE_PERIOD,
+        ttl: float = STREAM_REPLAY_TTL,
+        max_bytes: int = STREAM_REPLAY_MAX_BYTES,
+    ) -> None:
+        self.enabled = enabled
+        self.grace_period = grace_period
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._streams: OrderedDict[str, ReplayStream] = OrderedDict()
+        self._producers: dict[ReplayStream, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def __contains__(self, stream_id: str) -> bool:
+        return stream_id in self._streams
+
+    def add(self, stream: AsyncGenerator[bytes, Any]) -> ReplayStream:
+        """Starts consuming `stream` in the background and keeps its events to resume."""
+        replay = ReplayStream(self)
+        self._streams[replay.id] = replay
+        producer = asyncio.create_task(replay.produce(stream))
+        self._producers[replay] = producer
+        producer.add_done_callback(lambda _: self._producers.pop(replay, None))
+        return replay
+
+    def start(self, stream: AsyncGenerator[bytes, Any]) -> AsyncGenerator[bytes, Any]:
+        """Returns `stream` with event ids, consumed in the background and kept to resume."""
+        if not self.enabled:
+            return stream
+        return self.add(stream).replay(-1)
+
+    def resume(self, last_event_id: str) -> AsyncGenerator[bytes, Any]:
+        """
+        Returns the rest of the stream of the event `last_event_id`.
+
+        Raises:
+            HTTPException: If the stream is unknown, expired or evicted (410).
+        """
+        stream_id, _, sequence = last_event_id.partition("/")
+        if not sequence.isdigit():
+            raise HTTPException(detail=RESUME_DETAIL, status_code=HTTPStatus.GONE)
+        return self.follow(stream_id, int(sequence))
+
+    def follow(self, stream_id: str, last_sequence: int = -1) -> AsyncGenerator[bytes, Any]:
+        """
+        Returns the events of the stream `stream_id` after `last_sequence`, all by default.
+
+        Raises:
+            HTTPException: If the stream is unknown, expired or evicted (410).
+        """
+        replay = self._streams.get(stream_id)
+        if replay is None or last_sequence >= replay.end:
+            raise HTTPException(detail=RESUME_DETAIL, status_code=HTTPStatus.GONE)
+        return replay.replay(last_sequence)
+
+    def grow(self, size: int) -> None:
+        """Accounts for a new event, and evicts the oldest streams if over the memory cap."""
+        self.size += size
+        if self.size <= self.max_bytes:
+            return
+        finished = [replay for replay in self._streams.values() if replay.done]
+        running = [replay for replay in self._streams.values() if not replay.done]
+        for replay in finished + running:
+            if self.size <= self.max_bytes:
+                break
+            self.evict(replay)
+            if not replay.done and not replay.consumers:
+                self.abandon(replay)
+
+    def expire_later(self, replay: ReplayStream) -> None:
+        """Evicts a finished stream after the TTL."""
+        if replay.resumable:
+            asyncio.get_running_loop().call_later(self.ttl, self.evict, replay)
+
+    def evict(self, replay: ReplayStream) -> None:
+        """Makes a stream not resumable and releases its events once sent."""
+        if self._streams.pop(replay.id, None) is not None:
+            self.size -= replay.size
+        replay.resumable = False
+        if not replay.consumers:
+            replay.offset = replay.end
+            replay.frames.clear()
+
+    def abandon(self, replay: ReplayStream) -> None:
+        """Ends the generation of a stream whose client did not come back."""
+        self.evict(replay)
+        if replay in self._producers:
+            self._producers[replay].cancel()
+
+    async def close(self) -> None:
+        """Ends the generations still running and forgets the streams."""
+        producers = list(self._producers.values())
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+        for replay in list(self._streams.values()):
+            self.evict(replay)
+
+
+stream_replay = StreamReplayStore()
@@ -0,0 +1,95 @@
+from datetime import datetime
+from uuid import UUID, uuid4
+
+import msgspec
+
+from schemas.chat_schemas import ChatCompletionStreamChunk
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+_encoder = msgspec.json.Encoder()
+# Content of the template chunk, replaced by the content of each token
+_PLACEHOLDER = "\x00"
+_ENCODED_PLACEHOLDER = _encoder.encode(_PLACEHOLDER)
+# What follows the content only depends on the schema, the streams share one copy of it
+_suffixes: dict[bytes, bytes] = {}
+
+
+def encode_sse(chunk: ChatCompletionStreamChunk) -> bytes:
+    """Encodes a stream chunk as a server-sent event."""
+    return b"data: " + _encoder.encode(chunk) + b"\n\n"
+
+
+def encode_sse_error(status_code: int, detail: str) -> bytes:
+    """Encodes the error ending a stream as a server-sent event, like an error response body."""
+    error = {"error": {"status_code": status_code, "detail": detail}}
+    return b"data: " + _encoder.encode(error) + b"\n\n"
+
+
+class StreamState:
+    """
+    State of one streamed completion choice.
+
+    The chunks of a choice only differ by the content of their delta. The server-sent
+    event is encoded once around a placeholder when the stream starts, then the content of
+    each token is encoded into it: no chunk, list of choices or delta dictionary is built
+    per token.
+    """
+
+    __slots__ = (
+        "completion_tokens",
+        "created",
+        "id",
+        "index",
+        "model",
+        "_prefix",
+        "_reasoning_prefix",
+        "_suffix",
+    )
+
+    def __init__(
+        self,
+        model: str,
+        index: int = 0,
+        completion_id: UUID | None = None,
+        created: datetime | None = None,
+    ) -> None:
+        self.id = completion_id or uuid4()
+        self.model = model
+        self.created = created or datetime.now()
+        self.index = index
+        self.completion_tokens = 0
+
+        template = self._encode({"role": "assistant", "content": _PLACEHOLDER}, finish_reason=None)
+        self._prefix, suffix = template.split(_ENCODED_PLACEHOLDER)
+        self._suffix = _suffixes.setdefault(suffix, suffix)
+        self._reasoning_prefix: bytes | None = None
+
+    def delta(self, content: str) -> bytes:
+        """Returns the event carrying the next piece of content."""
+        self.completion_tokens += 1
+        return b"".join((self._prefix, _encoder.encode(content), self._suffix))
+
+    def reasoning_delta(self, reasoning: str) -> bytes:
+        """Returns the event carrying the next piece of reasoning."""
+        if self._reasoning_prefix is None:
+            template = self._encode(
+                {"role": "assistant", "reasoning_content": _PLACEHOLDER}, finish_reason=None
+            )
+            self._reasoning_prefix = template.split(_ENCODED_PLACEHOLDER)[0]
+        self.completion_tokens += 1
+        return b"".join((self._reasoning_prefix, _encoder.encode(reasoning), self._suffix))
+
+    def finish(self, reason: str = "stop") -> bytes:
+        """Returns the last event of the choice, with its finish reason."""
+        return self._encode({}, finish_reason=reason)
+
+    def _encode(self, delta: dict[str, str], finish_reason: str | None) -> bytes:
+        return encode_sse(
+            ChatCompletionStreamChunk(
+                id=self.id,
+                created=self.created,
+                model=self.model,
+                choices=[{"index": self.index, "delta": delta, "finish_reason": finish_reason}],
+            )
+        )
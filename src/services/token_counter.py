@@ -0,0 +1,135 @@
+import re
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Sequence
+
+from config.settings import TOKEN_CACHE_MAX_ENTRIES
+from schemas.chat_schemas import ChatMessage
+
+Tokenizer = Callable[[str], int]
+
+DEFAULT_NAMESPACE = "approx"
+
+# Fixed cost added per message for the role and separators (same convention as OpenAI).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Maximum number of messages added since the previous request of a conversation for its total
+# to be reused, the prefixes looked up from the longest
+TOTAL_LOOKBACK = 8
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def approximate_token_count(text: str) -> int:
+    """Approximates a BPE token count by counting words and punctuation marks."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+class TokenCountCache:
+    """
+    LRU cache of token counts keyed by tokenizer namespace and content hash.
+
+    Each model maps to a tokenizer namespace, so models sharing a tokenizer share cached
+    counts. Over a conversation only the new messages are tokenized on each turn, the
+    previous ones are served from the cache.
+
+    The total of a conversation is cached too, under a hash chained over the role and content
+    of its messages. The next turn starts from the total of its history and only tokenizes
+    and looks up its new messages, instead of each message of the history.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int, int], int] = OrderedDict()
+        # Total of a conversation by namespace and chained hash of its messages
+        self._totals: OrderedDict[tuple[str, int], int] = OrderedDict()
+        self._tokenizers: dict[str, Tokenizer] = {DEFAULT_NAMESPACE: approximate_token_count}
+        self._model_namespaces: dict[str, str] = {}
+
+    def register_tokenizer(
+        self, namespace: str, tokenizer: Tokenizer, models: Iterable[str] = ()
+    ) -> None:
+        """
+        Registers a tokenizer under a namespace and assigns it to the given models.
+
+        The counts cached for a tokenizer replaced in the namespace are dropped.
+        """
+        if namespace in self._tokenizers:
+            for entries in (self._entries, self._totals):
+                for key in [key for key in entries if key[0] == namespace]:
+                    del entries[key]
+        self._tokenizers[namespace] = tokenizer
+        for model in models:
+            self._model_namespaces[model] = namespace
+
+    def namespace_for(self, model: str) -> str:
+        """Returns the tokenizer namespace used for a model."""
+        return self._model_namespaces.get(model, DEFAULT_NAMESPACE)
+
+    def count(self, model: str, text: str) -> int:
+        """Returns the number of tokens in a text for the given model."""
+        namespace = self.namespace_for(model)
+        # The string hash is computed in C without copying the text, the length makes
+        # collisions between different contents practically impossible.
+        key = (namespace, len(text), hash(text))
+
+        cached = self._entries.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        tokens = self._tokenizers[namespace](text)
+        self._entries[key] = tokens
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return tokens
+
+    def count_message(self, model: str, message: ChatMessage) -> int:
+        """Returns the number of tokens used by a chat message."""
+        return self.count(model, message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    def count_messages(self, model: str, messages: Sequence[ChatMessage]) -> int:
+        """Returns the number of tokens used by a list of chat messages."""
+        if not messages:
+            return 0
+        namespace = self.namespace_for(model)
+        # Identity of each prefix, chained over the role and content of its messages
+        prefixes = []
+        prefix = 0
+        for message in messages:
+            prefix = hash((prefix, message.role, len(message.content), hash(message.content)))
+            prefixes.append(prefix)
+
+        # Longest prefix counted by a recent request, usually the history of this turn
+        start = total = 0
+        for end in range(len(messages), max(0, len(messages) - TOTAL_LOOKBACK), -1):
+            key = (namespace, prefixes[end - 1])
+            cached = self._totals.get(key)
+            if cached is not None:
+                self._totals.move_to_end(key)
+                start, total = end, cached
+                break
+
+        if start < len(messages):
+            total += sum(self.count_message(model, message) for message in messages[start:])
+            self._totals[(namespace, prefix)] = total
+            if len(self._totals) > self.max_entries:
+                self._totals.popitem(last=False)
+        return total
+
+    def clear(self) -> None:
+        """Removes all cached counts and resets the statistics."""
+        self._entries.clear()
+        self._totals.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared instance so that every consumer benefits from the same cached counts
+token_counter = TokenCountCache()
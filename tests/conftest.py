@@ -1,10 +1,14 @@
+import os
 from collections.abc import AsyncIterator
 from typing import Any
 
 import pytest
 from litestar.testing import AsyncTestClient
 
-from src.main import app
+# The dummy model answers instantly with seeded content, unless configured otherwise
+os.environ.setdefault("DUMMY_MODE", "deterministic")
+
+from src.main import app  # noqa: E402
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,261 @@
+"""
+Stand-in Ollama and Gemini servers for end-to-end tests without network.
+
+They speak enough of the Ollama `/api/chat` NDJSON and `/api/embed` protocols and of the Gemini
+`generateContent` / `streamGenerateContent` protocols for the official clients, with a
+configurable latency, token rate, error injection, stalls and dropped connections.
+
+Usage:
+    python tests/fake_backends.py [--ollama-port 11434] [--gemini-port 8090]
+        [--time-to-first-token 0.2] [--tokens-per-second 50] [--error-rate 0.01]
+
+Then point the API at them with `OLLAMA_*_URL=http://localhost:11434` and
+`GEMINI_BASE_URL=http://localhost:8090`.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from random import Random
+from typing import Any
+
+import uvicorn
+from litestar import Litestar, Response, post
+from litestar.response import Stream
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+
+class InjectedDisconnect(Exception):
+    """Raised in a stream to drop the connection before the end of the response."""
+
+
+@dataclass
+class FakeBackendConfig:
+    """Behaviour of a fake backend, can be changed while it is running."""
+
+    time_to_first_token: float = 0.0
+    # 0 sends the tokens as fast as possible
+    tokens_per_second: float = 0.0
+    completion_tokens: int = 20
+    # Share of the requests answered with `error_status` instead of a completion
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Share of the streams pausing for `stall_seconds` halfway through
+    stall_rate: float = 0.0
+    stall_seconds: float = 0.0
+    # Share of the streams whose connection is dropped halfway through
+    disconnect_rate: float = 0.0
+    seed: int = 0
+    random: Random = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.random = Random(self.seed)
+
+    def roll(self, rate: float) -> bool:
+        return rate > 0 and self.random.random() < rate
+
+    def tokens(self, max_tokens: int | None = None) -> list[str]:
+        count = min(self.completion_tokens, max_tokens or self.completion_tokens)
+        return [f"{WORDS[i % len(WORDS)]} " for i in range(count)]
+
+    async def paced(self, tokens: list[str]) -> AsyncGenerator[str, Any]:
+        """Yields the tokens at the configured pace, with the configured faults."""
+        stall = self.roll(self.stall_rate)
+        disconnect = self.roll(self.disconnect_rate)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_to_first_token
+
+        for index, token in enumerate(tokens):
+            if index == len(tokens) // 2:
+                if stall:
+                    deadline += self.stall_seconds
+                if disconnect:
+                    raise InjectedDisconnect
+            if deadline > loop.time():
+                await asyncio.sleep(deadline - loop.time())
+            yield token
+            if self.tokens_per_second:
+                deadline += 1 / self.tokens_per_second
+
+    async def wait_complete(self, tokens: list[str]) -> None:
+        """Waits as long as streaming the tokens would take."""
+        duration = self.time_to_first_token
+        if self.tokens_per_second:
+            duration += len(tokens) / self.tokens_per_second
+        if self.roll(self.stall_rate):
+            duration += self.stall_seconds
+        if duration:
+            await asyncio.sleep(duration)
+
+
+def count_words(texts: list[str]) -> int:
+    return sum(len(text.split()) for text in texts)
+
+
+def create_ollama_app(config: FakeBackendConfig) -> Litestar:
+    """Returns a fake Ollama server."""
+
+    @post("/api/chat", status_code=200)
+    async def chat(data: dict[str, Any]) -> Response | Stream:
+        model = data["model"]
+        if config.roll(config.error_rate):
+            return Response({"error": "injected failure"}, status_code=config.error_status)
+
+        tokens = config.tokens((data.get("options") or {}).get("num_predict"))
+        prompt_tokens = count_words([message["content"] for message in data["messages"]])
+
+        def message(content: str, done: bool) -> dict[str, Any]:
+            message = {
+                "model": model,
+                "created_at": datetime.now(UTC).isoformat(),
+                "message": {"role": "assistant", "content": content},
+                "done": done,
+            }
+            if done:
+                message.update(
+                    done_reason="stop", prompt_eval_count=prompt_tokens, eval_count=len(tokens)
+                )
+            return message
+
+        if not data.get("stream", True):
+            await config.wait_complete(tokens)
+            return Response(message("".join(tokens), done=True))
+
+        async def stream() -> AsyncGenerator[bytes, Any]:
+            async for token in config.paced(tokens):
+                yield json.dumps(message(token, done=False)).encode() + b"\n"
+            yield json.dumps(message("", done=True)).encode() + b"\n"
+
+        return Stream(stream(), media_type="application/x-ndjson")
+
+    @post("/api/embed", status_code=200)
+    async def embed(data: dict[str, Any]) -> Response:
+        inputs = [data["input"]] if isinstance(data["input"], str) else data["input"]
+        if config.roll(config.error_rate):
+            return Response({"error": "injected failure"}, status_code=config.error_status)
+        await config.wait_complete([])
+        # The length and the word count of each input, enough to match the vectors to them
+        return Response(
+            {
+                "model": data["model"],
+                "embeddings": [[float(len(text)), float(count_words([text]))] for text in inputs],
+                "prompt_eval_count": count_words(inputs),
+            }
+        )
+
+    return Litestar(route_handlers=[chat, embed])
+
+
+def create_gemini_app(config: FakeBackendConfig) -> Litestar:
+    """Returns a fake Gemini API server."""
+
+    @post("/{version:str}/models/{target:str}", status_code=200)
+    async def generate(data: dict[str, Any], target: str) -> Response | Stream:
+        if config.roll(config.error_rate):
+            return Response(
+                {
+                    "error": {
+                        "code": config.error_status,
+                        "message": "injected failure",
+                        "status": "INTERNAL",
+                    }
+                },
+                status_code=config.error_status,
+            )
+
+        tokens = config.tokens((data.get("generationConfig") or {}).get("maxOutputTokens"))
+        prompt_tokens = count_words(
+            [part.get("text", "") for content in data["contents"] for part in content["parts"]]
+        )
+
+        def response(text: str, done: bool) -> dict[str, Any]:
+            candidate: dict[str, Any] = {
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "index": 0,
+            }
+            response = {"candidates": [candidate], "modelVersion": target.split(":")[0]}
+            if done:
+                candidate["finishReason"] = "STOP"
+                response["usageMetadata"] = {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": len(tokens),
+                    "totalTokenCount": prompt_tokens + len(tokens),
+                }
+            return response
+
+        if not target.endswith(":streamGenerateContent"):
+            await config.wait_complete(tokens)
+            return Response(response("".join(tokens), done=True))
+
+        async def stream() -> AsyncGenerator[bytes, Any]:
+            async for token in config.paced(tokens):
+                yield b"data: " + json.dumps(response(token, done=False)).encode() + b"\r\n\r\n"
+            yield b"data: " + json.dumps(response("", done=True)).encode() + b"\r\n\r\n"
+
+        return Stream(stream(), media_type="text/event-stream")
+
+    return Litestar(route_handlers=[generate])
+
+
+@contextmanager
+def run_in_thread(app: Litestar) -> Iterator[str]:
+    """Serves an application on a free local port in a background thread, yields its URL."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="critical"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("Fake backend failed to start")
+            threading.Event().wait(0.01)
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    config = FakeBackendConfig(
+        time_to_first_token=args.time_to_first_token,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        disconnect_rate=args.disconnect_rate,
+        seed=args.seed,
+    )
+    servers = [
+        uvicorn.Server(uvicorn.Config(create_ollama_app(config), port=args.ollama_port)),
+        uvicorn.Server(uvicorn.Config(create_gemini_app(config), port=args.gemini_port)),
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ollama-port", type=int, default=11434)
+    parser.add_argument("--gemini-port", type=int, default=8090)
+    parser.add_argument("--time-to-first-token", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-seconds", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Iterator
+from http import HTTPStatus
+
+import httpx
+import pytest
+from litestar.testing import AsyncTestClient
+
+from services import gemini_service
+from services.ollama_service import OLLAMA_MODEL_HOSTS, OllamaService
+from services.scheduler import scheduler
+from src.main import app
+from tests.fake_backends import (
+    FakeBackendConfig,
+    create_gemini_app,
+    create_ollama_app,
+    run_in_thread,
+)
+
+OLLAMA_MODEL = "gemma3:1b"
+GEMINI_MODEL = "gemini-2.0-flash"
+FAKE_CONTENT = "lorem ipsum dolor sit amet "
+
+
+FAKE_CONFIG = FakeBackendConfig()
+
+
+@pytest.fixture(scope="module")
+def fake_urls() -> Iterator[tuple[str, str]]:
+    """Serves fake Ollama and Gemini backends, returns their URLs."""
+    with (
+        run_in_thread(create_ollama_app(FAKE_CONFIG)) as ollama_url,
+        run_in_thread(create_gemini_app(FAKE_CONFIG)) as gemini_url,
+    ):
+        yield ollama_url, gemini_url
+
+
+@pytest.fixture
+def fake_backends(
+    fake_urls: tuple[str, str], monkeypatch: pytest.MonkeyPatch
+) -> FakeBackendConfig:
+    """Points the API at the fake backends, returns their configuration for the test."""
+    ollama_url, gemini_url = fake_urls
+    monkeypatch.setitem(OLLAMA_MODEL_HOSTS, OLLAMA_MODEL, [ollama_url])
+    monkeypatch.setattr(gemini_service, "GEMINI_BASE_URL", gemini_url)
+    vars(FAKE_CONFIG).update(vars(FakeBackendConfig(completion_tokens=5)))
+    return FAKE_CONFIG
+
+
+@pytest.fixture
+async def client(fake_backends: FakeBackendConfig) -> AsyncIterator[AsyncTestClient]:
+    async with AsyncTestClient(app=app, raise_server_exceptions=False) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def gateway_url() -> Iterator[str]:
+    with run_in_thread(app) as url:
+        yield url
+
+
+@pytest.fixture
+async def gateway(
+    gateway_url: str, fake_backends: FakeBackendConfig
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Client of the API served by uvicorn, the test client handles one request at a time."""
+    async with httpx.AsyncClient(base_url=gateway_url, timeout=10) as client:
+        yield client
+
+
+def parse_stream(text: str) -> tuple[str, bool]:
+    """Returns the content of a streamed completion and whether it was terminated."""
+    content = ""
+    for line in text.splitlines():
+        if line.startswith("data: ") and line != "data: [DONE]":
+            content += json.loads(line[6:])["choices"][0]["delta"].get("content", "")
+    return content, "data: [DONE]" in text
+
+
+@pytest.mark.parametrize("model", [OLLAMA_MODEL, GEMINI_MODEL])
+class TestBackendProtocols:
+    """End-to-end tests through the real Ollama and Gemini clients."""
+
+    async def test_completion(self, client: AsyncTestClient, model: str) -> None:
+        """Test a completion, including the usage reported by the backend."""
+        payload = {"model": model, "messages": [{"role": "user", "content": "Say hello"}]}
+
+        response = await client.post("/v1/chat/completions", json=payload)
+
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.json()
+        assert data["choices"][0]["message"]["content"] == FAKE_CONTENT
+        assert data["usage"]["prompt_tokens"] == 2
+        assert data["usage"]["completion_tokens"] == 5
+
+    async def test_streaming(self, client: AsyncTestClient, model: str) -> None:
+        """Test that a streamed completion relays every token."""
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": "Say hello"}],
+            "stream": True,
+        }
+
+        response = await client.post("/v1/chat/completions", json=payload)
+
+        assert response.status_code == HTTPStatus.CREATED
+        assert parse_stream(response.text) == (FAKE_CONTENT, True)
+
+    async def test_max_tokens_forwarded(self, client: AsyncTestClient, model: str) -> None:
+        """Test that the token limit reaches the backend."""
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": "Say hello"}],
+            "max_tokens": 2,
+        }
+
+        response = await client.post("/v1/chat/completions", json=payload)
+
+        assert response.json()["choices"][0]["message"]["content"] == "lorem ipsum "
+
+    async def test_stop(self, client: AsyncTestClient, model: str) -> None:
+        """Test that a stream ends at a stop sequence, even from a backend not applying it."""
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": "Say hello"}],
+            "stream": True,
+            "stop": ["sit", "dol"],
+        }
+
+        response = await client.post("/v1/chat/completions", json=payload)
+
+        assert parse_stream(response.text) == ("lorem ipsum ", True)
+
+    async def test_backend_error(
+        self, client: AsyncTestClient, fake_backends: FakeBackendConfig, model: str
+    ) -> None:
+        """Test that an error of the backend is returned with its status code."""
+        fake_backends.error_rate = 1
+        fake_backends.error_status = HTTPStatus.TOO_MANY_REQUESTS
+        payload = {"model": model, "messages": [{"role": "user", "content": "Say hello"}]}
+
+        response = await client.post("/v1/chat/completions", json=payload)
+
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert response.json()["detail"] == "injected failure"
+
+
+class TestBackendFaults:
+    """End-to-end fault and throughput tests, against the API served over a real socket."""
+
+    async def test_dropped_stream_releases_slot(
+        self, gateway: httpx.AsyncClient, fake_backends: FakeBackendConfig
+    ) -> None:
+        """Test that a connection dropped by the backend ends the stream and frees the slot."""
+        fake_backends.disconnect_rate = 1
+        payload = {
+            "model": OLLAMA_MODEL,
+            "messages": [{"role": "user", "content": "Say hello"}],
+            "stream": True,
+        }
+
+        received = ""
+        with pytest.raises(httpx.RemoteProtocolError):
+            async with gateway.stream("POST", "/v1/chat/completions", json=payload) as response:
+                async for line in response.aiter_lines():
+                    received += line + "\n"
+
+        assert parse_stream(received) == ("lorem ipsum ", False)
+        assert scheduler.backend(OllamaService(), OLLAMA_MODEL).active == 0
+
+    async def test_stalled_stream_completes(
+        self, gateway: httpx.AsyncClient, fake_backends: FakeBackendConfig
+    ) -> None:
+        """Test that a backend pausing in the middle of a stream is waited for."""
+        fake_backends.stall_rate = 1
+        fake_backends.stall_seconds = 0.2
+        payload = {
+            "model": GEMINI_MODEL,
+            "messages": [{"role": "user", "content": "Say hello"}],
+            "stream": True,
+        }
+
+        start = time.perf_counter()
+        response = await gateway.post("/v1/chat/completions", json=payload)
+
+        assert time.perf_counter() - start >= 0.2
+        assert parse_stream(response.text) == (FAKE_CONTENT, True)
+
+    async def test_concurrent_streams(
+        self, gateway: httpx.AsyncClient, fake_backends: FakeBackendConfig
+    ) -> None:
+        """Test that concurrent streams to a paced backend are generated in parallel."""
+        fake_backends.tokens_per_second = 10
+        payload = {
+            "model": GEMINI_MODEL,
+            "messages": [{"role": "user", "content": "Say hello"}],
+            "stream": True,
+        }
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(gateway.post("/v1/chat/completions", json=payload) for _ in range(8))
+        )
+
+        # Each stream lasts 0.5s, 4s if they were generated one after the other
+        assert time.perf_counter() - start < 2.5
+        assert all(parse_stream(response.text) == (FAKE_CONTENT, True) for response in responses)
+
+
+class TestOllamaEmbeddings:
+    """End-to-end tests of the embeddings through the Ollama client."""
+
+    async def test_concurrent_requests_batched(self, gateway: httpx.AsyncClient) -> None:
+        """Test that the requests batched together each get the vectors of their inputs."""
+        texts = [["one"], ["two words", "and three words"], ["a b c d"]]
+
+        responses = await asyncio.gather(
+            *(
+                gateway.post("/v1/embeddings", json={"model": OLLAMA_MODEL, "input": inputs})
+                for inputs in texts
+            )
+        )
+
+        for inputs, response in zip(texts, responses, strict=True):
+            assert response.status_code == HTTPStatus.CREATED
+            vectors = [item["embedding"] for item in response.json()["data"]]
+            assert vectors == [[len(text), len(text.split())] for text in inputs]
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import shutil
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+
+import pytest
+from litestar.exceptions import NotFoundException, ServiceUnavailableException
+from litestar.testing import AsyncTestClient
+
+from schemas.batch_schemas import BatchRequestItem
+from schemas.chat_schemas import ChatCompletionRequest, ChatMessage
+from services import batch_service as batch_service_module
+from services.batch_service import BatchService
+from services.dummy_service import DummyService
+
+
+async def wait_for_batch(test_client: AsyncTestClient, batch_id: str) -> dict[str, Any]:
+    """Polls a batch until it is no longer in progress."""
+    for _ in range(100):
+        response = await test_client.get(f"/v1/batches/{batch_id}")
+        batch = response.json()
+        if batch["status"] != "in_progress":
+            return batch
+        await asyncio.sleep(0.1)
+    raise AssertionError("Batch did not complete in time")
+
+
+def batch_items(count: int) -> list[BatchRequestItem]:
+    body = ChatCompletionRequest(
+        model="dummy-model:1.0", messages=[ChatMessage(role="user", content="Hello")]
+    )
+    return [BatchRequestItem(custom_id=f"request-{i}", body=body) for i in range(count)]
+
+
+class TestBatches:
+    """Tests for the batch endpoints."""
+
+    async def test_create_batch(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that every request of a batch is completed and written to the output."""
+        payload = {
+            "requests": [
+                {"custom_id": f"request-{i}", "body": simple_chat_request} for i in range(3)
+            ]
+        }
+
+        response = await test_client.post("/v1/batches", json=payload)
+
+        assert response.status_code == HTTPStatus.CREATED
+        batch = response.json()
+        assert batch["object"] == "batch"
+        assert batch["request_counts"]["total"] == 3
+
+        batch = await wait_for_batch(test_client, batch["id"])
+        assert batch["status"] == "completed"
+        assert batch["request_counts"] == {"total": 3, "completed": 3, "failed": 0}
+
+        output = await test_client.get(batch["output_url"])
+        assert output.status_code == HTTPStatus.OK
+        results = [json.loads(line) for line in output.text.splitlines()]
+        assert sorted(result["custom_id"] for result in results) == [
+            "request-0",
+            "request-1",
+            "request-2",
+        ]
+        body = results[0]["response"]["body"]
+        assert body["object"] == "chat.completion"
+        assert results[0]["error"] is None
+
+    async def test_download_output_right_after_create(
+        self,
+        test_client: AsyncTestClient,
+        simple_chat_request: dict[str, Any],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that the output of a batch can be downloaded before any result is written."""
+        started = asyncio.Event()
+        run = BatchService._run
+
+        async def delayed_run(self: BatchService, *args: Any) -> None:
+            await started.wait()
+            await run(self, *args)
+
+        monkeypatch.setattr(BatchService, "_run", delayed_run)
+        payload = {"requests": [{"custom_id": "request-0", "body": simple_chat_request}]}
+
+        response = await test_client.post("/v1/batches", json=payload)
+        output = await test_client.get(response.json()["output_url"])
+
+        assert output.status_code == HTTPStatus.OK
+        assert output.text == ""
+        started.set()
+        batch = await wait_for_batch(test_client, response.json()["id"])
+        assert batch["status"] == "completed"
+
+    async def test_upload_batch_file(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test creating a batch from a JSONL file."""
+        lines = [
+            json.dumps({"custom_id": "first", "method": "POST", "body": simple_chat_request}),
+            "",
+            json.dumps({"custom_id": "second", "body": simple_chat_request}),
+        ]
+
+        response = await test_client.post(
+            "/v1/batches/upload",
+            files={"data": ("batch.jsonl", "\n".join(lines).encode(), "application/jsonl")},
+        )
+
+        assert response.status_code == HTTPStatus.CREATED
+        batch = await wait_for_batch(test_client, response.json()["id"])
+        assert batch["request_counts"]["completed"] == 2
+
+    async def test_invalid_batch_line(self, test_client: AsyncTestClient) -> None:
+        """Test that an invalid line of a JSONL file is reported."""
+        response = await test_client.post(
+            "/v1/batches/upload",
+            files={"data": ("batch.jsonl", b'{"custom_id": "first"}', "application/jsonl")},
+        )
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert "line 1" in response.json()["detail"]
+
+    async def test_invalid_request_line(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that the schema constraints apply to the requests of a JSONL file."""
+        body = {**simple_chat_request, "messages": [{"role": "user", "content": ""}]}
+        line = json.dumps({"custom_id": "first", "body": body}).encode()
+
+        response = await test_client.post(
+            "/v1/batches/upload", files={"data": ("batch.jsonl", line, "application/jsonl")}
+        )
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert "content" in response.json()["detail"]
+
+    async def test_invalid_model(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that a batch using an unknown model is rejected."""
+        payload = {
+            "requests": [
+                {"custom_id": "first", "body": {**simple_chat_request, "model": "unknown"}}
+            ]
+        }
+
+        response = await test_client.post("/v1/batches", json=payload)
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    async def test_unknown_batch(self, test_client: AsyncTestClient) -> None:
+        """Test retrieving a batch that does not exist."""
+        response = await test_client.get("/v1/batches/batch_unknown")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestBatchService:
+    """Tests for the processing of the batches in the background."""
+
+    async def test_output_failure_marks_batch_failed(self, tmp_path: Path) -> None:
+        service = BatchService(output_dir=tmp_path / "batches")
+        job = service.create(batch_items(2), [DummyService()])
+        # The output file cannot be created anymore
+        shutil.rmtree(tmp_path / "batches")
+
+        await job.task
+
+        assert job.status == "failed"
+        assert job.completed_at is not None
+
+    async def test_finished_batch_expires(self, tmp_path: Path) -> None:
+        service = BatchService(output_dir=tmp_path, result_ttl=0)
+        job = service.create(batch_items(2), [DummyService()])
+
+        await job.task
+        assert job.status == "completed"
+        for _ in range(100):
+            if not job.output_path.exists():
+                break
+            await asyncio.sleep(0.01)
+
+        assert not job.output_path.exists()
+        with pytest.raises(NotFoundException):
+            service.get(job.id)
+
+    async def test_retries_are_capped(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        calls = []
+
+        async def saturated(*args: Any) -> None:
+            calls.append(args)
+            raise ServiceUnavailableException("Backend saturated")
+
+        monkeypatch.setattr(batch_service_module, "gather_completions", saturated)
+        monkeypatch.setattr(batch_service_module, "BATCH_RETRY_DELAY", 0)
+        service = BatchService(output_dir=tmp_path, max_retries=2)
+        job = service.create(batch_items(1), [DummyService()])
+
+        await job.task
+
+        assert len(calls) == 3
+        assert job.status == "completed"
+        assert job.counts.failed == 1
+        [result] = [json.loads(line) for line in job.output_path.read_text().splitlines()]
+        assert result["error"]["code"] == HTTPStatus.SERVICE_UNAVAILABLE
@@ -1,10 +1,14 @@
+import asyncio
 import json
+from collections.abc import AsyncGenerator
 from http import HTTPStatus
 from typing import Any
 
 import pytest
 from litestar.testing import AsyncTestClient
 
+from services.multi_completion import merge_streams
+
 
 class TestChatCompletion:
     """Basic tests for chat completion endpoint."""
@@ -143,3 +147,72 @@ class TestChatCompletionStreaming:
             assert data["object"] == "chat.completion"
             assert data["model"] == "dummy-model:1.0"
             assert len(data["choices"]) > 0
+
+
+class TestMultipleChoices:
+    """Tests for the generation of several choices (`n` > 1)."""
+
+    async def test_multiple_choices(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that `n` choices are returned with their index and aggregated usage."""
+        payload = {**simple_chat_request, "n": 3}
+
+        response = await test_client.post("/v1/chat/completions", json=payload)
+
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.json()
+        assert [choice["index"] for choice in data["choices"]] == [0, 1, 2]
+        assert all(choice["message"]["content"] for choice in data["choices"])
+        usage = data["usage"]
+        assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+    async def test_multiple_choices_streaming(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that the chunks of every choice are multiplexed in one stream."""
+        payload = {**simple_chat_request, "n": 2, "stream": True}
+
+        response = await test_client.post("/v1/chat/completions", json=payload)
+
+        assert response.status_code == HTTPStatus.CREATED
+        data_lines = [line for line in response.text.split("\n") if line.startswith("data:")]
+        assert data_lines.count("data: [DONE]") == 1
+        assert data_lines[-1] == "data: [DONE]"
+
+        chunks = [json.loads(line[6:]) for line in data_lines[:-1]]
+        assert len({chunk["id"] for chunk in chunks}) == 1
+        assert {chunk["choices"][0]["index"] for chunk in chunks} == {0, 1}
+        finished = [
+            chunk["choices"][0]["index"]
+            for chunk in chunks
+            if chunk["choices"][0]["finish_reason"]
+        ]
+        assert sorted(finished) == [0, 1]
+
+    async def test_streams_closed_when_one_choice_fails(self) -> None:
+        """Test that the other choices are closed, not left generating, after an error."""
+        closed: list[str] = []
+
+        async def endless(name: str) -> AsyncGenerator[int, Any]:
+            try:
+                while True:
+                    await asyncio.sleep(0)
+                    yield 0
+            finally:
+                closed.append(name)
+
+        async def failing() -> AsyncGenerator[int, Any]:
+            try:
+                for _ in range(10):
+                    await asyncio.sleep(0)
+                raise RuntimeError("backend failed")
+                yield 0
+            finally:
+                closed.append("failing")
+
+        with pytest.raises(RuntimeError):
+            async for _ in merge_streams([endless("first"), endless("second"), failing()]):
+                pass
+
+        assert sorted(closed) == ["failing", "first", "second"]
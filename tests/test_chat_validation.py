@@ -108,3 +108,14 @@ class TestChatCompletionValidation:
 
         response = await test_client.post("/v1/chat/completions", json=payload)
         assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    async def test_invalid_choice_count(self, test_client: AsyncTestClient) -> None:
+        """Test with a number of choices out of range."""
+        payload = {
+            "model": "dummy-model:1.0",
+            "messages": [{"role": "user", "content": "Hello"}],
+            "n": 0,
+        }
+
+        response = await test_client.post("/v1/chat/completions", json=payload)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
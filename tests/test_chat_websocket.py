@@ -0,0 +1,142 @@
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from litestar.exceptions import WebSocketDisconnect
+from litestar.testing import TestClient
+from litestar.testing.websocket_test_session import WebSocketTestSession
+
+from middleware import admin
+from services import chat_socket
+from services.dummy_service import DummyConfig, DummyService, get_deterministic_response
+from services.scheduler import scheduler
+from services.stream_registry import CANCEL_DETAIL
+from src.main import app
+
+MODEL = "dummy-model:1.0"
+
+
+@pytest.fixture
+def socket() -> Iterator[WebSocketTestSession]:
+    with TestClient(app=app) as client, client.websocket_connect("/v1/chat/ws") as socket:
+        yield socket
+
+
+def start(socket: WebSocketTestSession, stream_id: str, **request: Any) -> None:
+    request = {"model": MODEL, "messages": [{"role": "user", "content": "Hello"}], **request}
+    socket.send_json({"type": "chat.completion", "id": stream_id, "request": request})
+
+
+def receive_until(socket: WebSocketTestSession, kind: str, stream_id: str) -> list[dict]:
+    """Returns the frames received up to the `kind` frame of a stream, included."""
+    frames = []
+    while not frames or frames[-1]["type"] != kind or frames[-1].get("id") != stream_id:
+        frames.append(socket.receive_json(timeout=5))
+    return frames
+
+
+def content_of(frames: list[dict], stream_id: str) -> str:
+    return "".join(
+        frame["data"]["choices"][0]["delta"].get("content", "")
+        for frame in frames
+        if frame["type"] == "chunk" and frame["id"] == stream_id
+    )
+
+
+class TestChatWebSocket:
+    """Tests for the WebSocket chat transport."""
+
+    def test_multiplexed_streams(self, socket: WebSocketTestSession) -> None:
+        """Test that several streams run on one connection, each delivered in full."""
+        start(socket, "first")
+        start(socket, "second", n=2)
+
+        frames = receive_until(socket, "done", "first")
+        frames += receive_until(socket, "done", "second")
+
+        expected = get_deterministic_response(DummyService.config).content
+        assert content_of(frames, "first") == expected
+        second = [frame for frame in frames if frame.get("id") == "second"]
+        indexes = {frame["data"]["choices"][0]["index"] for frame in second[:-1]}
+        assert indexes == {0, 1}
+        assert all(frame["data"]["object"] == "chat.completion.chunk" for frame in second[:-1])
+
+    def test_cancel(self, socket: WebSocketTestSession, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a cancelled stream stops and releases its backend slot."""
+        config = DummyConfig(mode="deterministic", tokens_per_second=50, completion_tokens=500)
+        monkeypatch.setattr(DummyService, "config", config)
+        start(socket, "long")
+        assert socket.receive_json(timeout=5)["type"] == "chunk"
+
+        socket.send_json({"type": "cancel", "id": "long"})
+        frames = receive_until(socket, "cancelled", "long")
+
+        assert len(frames) < 100
+        assert scheduler.backend(DummyService(), MODEL).active == 0
+
+    def test_admin_cancel(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a stream is listed to the administrators, and ends with an error frame."""
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+        config = DummyConfig(mode="deterministic", tokens_per_second=50, completion_tokens=500)
+        monkeypatch.setattr(DummyService, "config", config)
+        headers = {"Authorization": "Bearer secret"}
+
+        with TestClient(app=app) as client, client.websocket_connect("/v1/chat/ws") as socket:
+            start(socket, "long")
+            assert socket.receive_json(timeout=5)["type"] == "chunk"
+            [stream] = client.get("/admin/streams", headers=headers).json()
+            client.post(f"/admin/streams/{stream['id']}/cancel", headers=headers)
+            error = receive_until(socket, "error", "long")[-1]
+            streams = client.get("/admin/streams", headers=headers).json()
+
+        assert stream["model"] == MODEL
+        assert error["error"] == {"status_code": 503, "detail": CANCEL_DETAIL}
+        assert streams == []
+
+    def test_ping_pong(self, socket: WebSocketTestSession) -> None:
+        """Test that a ping of the client is answered."""
+        socket.send_json({"type": "ping"})
+
+        assert socket.receive_json(timeout=5) == {"type": "pong"}
+
+    def test_errors(self, socket: WebSocketTestSession) -> None:
+        """Test that the errors are reported on the stream, the connection stays open."""
+        socket.send_json({"type": "unknown"})
+        assert socket.receive_json(timeout=5)["error"]["status_code"] == 422
+
+        start(socket, "bad", model="unknown-model")
+        error = socket.receive_json(timeout=5)
+        assert error["type"] == "error"
+        assert error["id"] == "bad"
+        assert error["error"]["detail"] == "Model 'unknown-model' is not available."
+
+        start(socket, "ok")
+        frames = receive_until(socket, "done", "ok")
+        assert content_of(frames, "ok")
+
+    def test_duplicate_stream(
+        self, socket: WebSocketTestSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a stream cannot reuse the id of a running one."""
+        config = DummyConfig(mode="deterministic", time_to_first_token=0.5)
+        monkeypatch.setattr(DummyService, "config", config)
+        start(socket, "same")
+        start(socket, "same")
+
+        error = socket.receive_json(timeout=5)
+        assert (error["type"], error["error"]["status_code"]) == ("error", 409)
+        socket.send_json({"type": "cancel", "id": "same"})
+        receive_until(socket, "cancelled", "same")
+
+    def test_heartbeat_and_idle_timeout(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the server pings the client and closes a silent connection."""
+        monkeypatch.setattr(chat_socket, "WEBSOCKET_PING_INTERVAL", 0.05)
+        monkeypatch.setattr(chat_socket, "WEBSOCKET_IDLE_TIMEOUT", 0.3)
+
+        with TestClient(app=app) as client, client.websocket_connect("/v1/chat/ws") as socket:
+            assert socket.receive_json(timeout=5) == {"type": "ping"}
+            with pytest.raises(WebSocketDisconnect) as disconnect:
+                while True:
+                    socket.receive_json(timeout=5)
+
+        assert disconnect.value.code == chat_socket.IDLE_CLOSE_CODE
@@ -0,0 +1,169 @@
+import asyncio
+import zlib
+from collections.abc import AsyncGenerator
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from litestar import Litestar, get
+from litestar.response import Stream
+from litestar.testing import AsyncTestClient
+from litestar.types import Message
+
+from middleware.compression import CompressionConfig, negotiate_encoding
+
+LARGE_BODY = "lorem ipsum dolor sit amet " * 100
+EVENTS = [f"data: {{'content': 'token {i}'}}\n\n".encode() for i in range(5)]
+
+
+@get("/large", media_type="text/plain")
+async def large() -> str:
+    return LARGE_BODY
+
+
+@get("/small", media_type="text/plain")
+async def small() -> str:
+    return "ok"
+
+
+@get("/events")
+async def events() -> Stream:
+    async def stream() -> AsyncGenerator[bytes, Any]:
+        for event in EVENTS:
+            yield event
+
+    return Stream(stream(), media_type="text/event-stream")
+
+
+def create_app(**config: Any) -> Litestar:
+    return Litestar(
+        route_handlers=[large, small, events],
+        middleware=[CompressionConfig(encodings=["gzip"], **config).middleware],
+    )
+
+
+async def collect(app: Litestar, path: str, accept_encoding: str) -> list[Message]:
+    """Calls the application, returns the messages it sends."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+        "http_version": "1.1",
+        "asgi": {"version": "3.0"},
+        "state": {},
+    }
+    messages = []
+    complete = asyncio.Event()
+
+    async def receive() -> Message:
+        # The client stays connected until the end of the response
+        await complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            complete.set()
+
+    await app(scope, receive, send)
+    return messages
+
+
+class TestNegotiateEncoding:
+    """Tests for the choice of the encoding from the Accept-Encoding header."""
+
+    def test_server_preference_on_ties(self) -> None:
+        """Test that equally accepted encodings are chosen in the server order."""
+        assert negotiate_encoding("gzip, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+
+    def test_quality_values(self) -> None:
+        """Test that the quality values of the client take precedence."""
+        assert negotiate_encoding("zstd;q=0.5, gzip;q=0.8", ["zstd", "br", "gzip"]) == "gzip"
+        assert negotiate_encoding("gzip;q=0, *", ["br", "gzip"]) == "br"
+
+    def test_nothing_acceptable(self) -> None:
+        """Test that a response is not compressed when no encoding is accepted."""
+        assert negotiate_encoding("", ["gzip"]) is None
+        assert negotiate_encoding("identity", ["gzip"]) is None
+        assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+
+
+class TestCompressionMiddleware:
+    """Tests for the response compression middleware."""
+
+    async def test_large_response_compressed(self) -> None:
+        """Test that a response above the minimum size is compressed."""
+        async with AsyncTestClient(app=create_app()) as client:
+            response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(LARGE_BODY) / 10
+        assert response.text == LARGE_BODY
+
+    async def test_small_response_not_compressed(self) -> None:
+        """Test that a response below the minimum size is sent as is."""
+        async with AsyncTestClient(app=create_app()) as client:
+            response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.text == "ok"
+
+    async def test_stream_compressed_per_event(self) -> None:
+        """Test that each event of a stream can be decoded as soon as it is received."""
+        messages = await collect(create_app(), "/events", "gzip")
+
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        bodies = [message["body"] for message in messages[1:] if message["body"]]
+        decoded = [decompressor.decompress(body) for body in bodies]
+        assert [chunk for chunk in decoded if chunk] == EVENTS
+        assert decompressor.eof
+
+    async def test_stream_compression_disabled(self) -> None:
+        """Test that the streams can be sent uncompressed."""
+        async with AsyncTestClient(app=create_app(compress_streams=False)) as client:
+            response = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.content == b"".join(EVENTS)
+
+    async def test_large_body_compressed_off_loop(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a body above the offload size is compressed in a worker thread."""
+        offloaded = []
+        to_thread = asyncio.to_thread
+
+        async def spy_to_thread(function: Any, *args: Any) -> Any:
+            offloaded.append(len(args[0]))
+            return await to_thread(function, *args)
+
+        monkeypatch.setattr(asyncio, "to_thread", spy_to_thread)
+        async with AsyncTestClient(app=create_app(offload_size=1000)) as client:
+            large_response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+            await client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        assert large_response.text == LARGE_BODY
+        assert offloaded == [len(LARGE_BODY)]
+
+    async def test_api_response_compressed(
+        self, test_client: AsyncTestClient, base_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that the compression is enabled on the API."""
+        payload = {**base_chat_request, "stream": True}
+
+        response = await test_client.post(
+            "/v1/chat/completions", json=payload, headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text.endswith("data: [DONE]\n\n")
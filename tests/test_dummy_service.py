@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import pytest
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatMessage
+from services import dummy_service
+from services.dummy_service import (
+    DummyConfig,
+    DummyService,
+    Ticker,
+    get_corpus,
+    get_deterministic_response,
+)
+
+
+def make_service(**config: float) -> DummyService:
+    """Creates a dummy service in deterministic mode."""
+    service = DummyService()
+    service.config = DummyConfig(mode="deterministic", **config)  # type: ignore[arg-type]
+    return service
+
+
+def make_request() -> ChatCompletionRequest:
+    return ChatCompletionRequest(
+        model="dummy-model:1.0", messages=[ChatMessage(role="user", content="Hello")]
+    )
+
+
+class TestDeterministicDummy:
+    """Tests for the deterministic mode of the dummy model."""
+
+    async def test_content_is_seeded(self) -> None:
+        """Test that the same seed always produces the same content."""
+        service = make_service(completion_tokens=20, seed=7)
+
+        first = [token async for token in service.stream_content(make_request())]
+        second = [token async for token in service.stream_content(make_request())]
+        other = [token async for token in make_service(seed=8).stream_content(make_request())]
+
+        assert first == second
+        assert len(first) == 20
+        assert first != other[:20]
+
+    async def test_stream_pacing(self) -> None:
+        """Test the time to first token and the token rate."""
+        service = make_service(
+            completion_tokens=5, time_to_first_token=0.05, tokens_per_second=100
+        )
+
+        start = time.perf_counter()
+        arrivals = [
+            time.perf_counter() - start async for _ in service.stream_content(make_request())
+        ]
+
+        assert arrivals[0] >= 0.05
+        assert arrivals[-1] >= 0.05 + 4 * 0.01
+
+    async def test_streams_share_the_ticks(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the streams wake together once per tick, sending every chunk due."""
+        ticker = Ticker(interval=0.01)
+        monkeypatch.setattr(dummy_service, "ticker", ticker)
+        service = make_service(completion_tokens=20, tokens_per_second=1000)
+
+        async def consume() -> list[str]:
+            return [token async for token in service.stream_content(make_request())]
+
+        streams = await asyncio.gather(*(consume() for _ in range(10)))
+
+        assert all(len(tokens) == 20 for tokens in streams)
+        # 19 deadlines over 19 ms, for each of the 10 streams
+        assert ticker.ticks <= 4
+
+    async def test_completion_usage(self) -> None:
+        """Test that the non-stream response contains the deterministic content."""
+        service = make_service(completion_tokens=10)
+
+        response = await service.chat_completion(make_request())
+
+        content = response.choices[0]["message"]["content"]
+        assert len(content.split()) == 10
+        assert response.usage is not None
+        assert response.usage["completion_tokens"] == 10
+
+    async def test_stream_reuses_precomputed_chunks(self) -> None:
+        """Test that streams send the chunks of the response computed once per config."""
+        service = make_service(completion_tokens=10, seed=3)
+
+        chunks = [token async for token in service.stream_content(make_request())]
+
+        response = get_deterministic_response(service.config)
+        assert response is get_deterministic_response(DummyConfig(**vars(service.config)))
+        assert all(a is b for a, b in zip(chunks, response.chunks, strict=True))
+
+
+class TestDummyCorpus:
+    """Tests for the precomputed responses of the random mode."""
+
+    def test_corpus_is_generated_once(self) -> None:
+        """Test that the corpus of a seed is generated on first use only."""
+        assert get_corpus(1, 4) is get_corpus(1, 4)
+        assert get_corpus(1, 4) != get_corpus(2, 4)
+
+    def test_responses_are_chunked_on_a_schedule(self) -> None:
+        """Test that long texts are cut and that the schedule only moves forward."""
+        for response in get_corpus(1, 4):
+            assert response.content == "".join(response.chunks)
+            assert response.content.startswith("<think> ")
+            assert len(response.schedule) == len(response.chunks)
+            assert list(response.schedule) == sorted(response.schedule)
+            assert all(len(chunk) <= 50 or chunk.startswith("```") for chunk in response.chunks)
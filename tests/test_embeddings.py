@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import math
+from array import array
+from http import HTTPStatus
+from typing import override
+
+import pytest
+from litestar.testing import AsyncTestClient
+
+from services.dummy_service import DummyService
+from services.embeddings import EmbeddingBatcher
+
+MODEL = "dummy-model:1.0"
+
+
+class RecordingService(DummyService):
+    """Dummy service recording the inputs of each backend call."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls: list[list[str]] = []
+        self.error = error
+
+    @override
+    async def embed(self, model: str, inputs: list[str]) -> list[list[float]]:
+        self.calls.append(list(inputs))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text))] for text in inputs]
+
+
+def cosine(a: list[float], b: list[float]) -> float:
+    return sum(x * y for x, y in zip(a, b, strict=True)) / math.hypot(*a) / math.hypot(*b)
+
+
+class TestEmbeddingBatcher:
+    """Tests for the micro-batching of the embedding requests."""
+
+    async def test_concurrent_requests_batched(self) -> None:
+        service = RecordingService()
+        batcher = EmbeddingBatcher(max_batch_size=10, max_wait=0.01)
+
+        results = await asyncio.gather(
+            batcher.embed(service, MODEL, ["a"], "interactive"),
+            batcher.embed(service, MODEL, ["bb", "ccc"], "interactive"),
+            batcher.embed(service, MODEL, ["dddd"], "interactive"),
+        )
+
+        assert service.calls == [["a", "bb", "ccc", "dddd"]]
+        assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+
+    async def test_full_batch_sent_without_waiting(self) -> None:
+        service = RecordingService()
+        batcher = EmbeddingBatcher(max_batch_size=3, max_wait=10)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                batcher.embed(service, MODEL, ["a", "bb"], "interactive"),
+                batcher.embed(service, MODEL, ["ccc"], "interactive"),
+            ),
+            timeout=1,
+        )
+
+        assert service.calls == [["a", "bb", "ccc"]]
+        assert results == [[[1.0], [2.0]], [[3.0]]]
+
+    async def test_requests_never_split(self) -> None:
+        """Test that a request overflowing a batch starts the next one."""
+        service = RecordingService()
+        batcher = EmbeddingBatcher(max_batch_size=3, max_wait=0.01)
+
+        await asyncio.gather(
+            batcher.embed(service, MODEL, ["a", "b"], "interactive"),
+            batcher.embed(service, MODEL, ["c", "d"], "interactive"),
+            batcher.embed(service, MODEL, ["e", "f", "g", "h"], "interactive"),
+        )
+
+        assert service.calls == [["a", "b"], ["c", "d"], ["e", "f", "g", "h"]]
+
+    async def test_priority_classes_batched_apart(self) -> None:
+        service = RecordingService()
+        batcher = EmbeddingBatcher(max_batch_size=10, max_wait=0.01)
+
+        await asyncio.gather(
+            batcher.embed(service, MODEL, ["a"], "interactive"),
+            batcher.embed(service, MODEL, ["b"], "batch"),
+        )
+
+        assert sorted(service.calls) == [["a"], ["b"]]
+
+    async def test_error_sent_to_every_request(self) -> None:
+        service = RecordingService(error=RuntimeError("backend down"))
+        batcher = EmbeddingBatcher(max_batch_size=10, max_wait=0.01)
+
+        results = await asyncio.gather(
+            batcher.embed(service, MODEL, ["a"], "interactive"),
+            batcher.embed(service, MODEL, ["b"], "interactive"),
+            return_exceptions=True,
+        )
+
+        assert len(service.calls) == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def test_cancelled_request_leaves_batch(self) -> None:
+        service = RecordingService()
+        batcher = EmbeddingBatcher(max_batch_size=10, max_wait=0.01)
+        cancelled = asyncio.create_task(batcher.embed(service, MODEL, ["a"], "interactive"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        result = await batcher.embed(service, MODEL, ["bb"], "interactive")
+
+        assert result == [[2.0]]
+
+
+class TestEmbeddingsEndpoint:
+    """Tests for the `/v1/embeddings` endpoint."""
+
+    async def test_single_input(self, test_client: AsyncTestClient) -> None:
+        response = await test_client.post(
+            "/v1/embeddings", json={"model": MODEL, "input": "Hello world"}
+        )
+
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.json()
+        assert data["object"] == "list"
+        assert data["usage"] == {"prompt_tokens": 2, "total_tokens": 2}
+        [item] = data["data"]
+        assert item["object"] == "embedding" and item["index"] == 0
+        assert math.isclose(math.hypot(*item["embedding"]), 1)
+
+    async def test_similar_texts_closer(self, test_client: AsyncTestClient) -> None:
+        texts = [
+            "How do I install Python?",
+            "How can I install Python on Linux?",
+            "Recipe of a chocolate cake",
+        ]
+
+        response = await test_client.post("/v1/embeddings", json={"model": MODEL, "input": texts})
+
+        first, similar, other = (item["embedding"] for item in response.json()["data"])
+        assert cosine(first, similar) > cosine(first, other)
+
+    async def test_base64_encoding(self, test_client: AsyncTestClient) -> None:
+        """Test that the base64 vectors are the float32 values of the float vectors."""
+        payload = {"model": MODEL, "input": ["Hello world", "Python code"]}
+
+        floats = await test_client.post("/v1/embeddings", json=payload)
+        encoded = await test_client.post(
+            "/v1/embeddings", json={**payload, "encoding_format": "base64"}
+        )
+
+        for float_item, encoded_item in zip(
+            floats.json()["data"], encoded.json()["data"], strict=True
+        ):
+            decoded = array("f", base64.b64decode(encoded_item["embedding"]))
+            assert decoded.tolist() == pytest.approx(float_item["embedding"], rel=1e-6)
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"model": "unknown-model", "input": "Hello"},
+            {"model": MODEL, "input": []},
+            {"model": MODEL, "input": ""},
+            {"model": MODEL, "input": "Hello", "encoding_format": "int8"},
+        ],
+    )
+    async def test_invalid_request(
+        self, test_client: AsyncTestClient, payload: dict[str, object]
+    ) -> None:
+        response = await test_client.post("/v1/embeddings", json=payload)
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
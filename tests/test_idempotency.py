@@ -0,0 +1,203 @@
+import asyncio
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from litestar.exceptions import HTTPException
+from litestar.testing import AsyncTestClient
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse
+from services.idempotency import IdempotencyStore
+from services.stream_replay import StreamReplayStore
+
+REQUEST = ChatCompletionRequest(
+    model="dummy-model:1.0", messages=[{"role": "user", "content": "Hello"}]
+)
+
+
+class Generator:
+    """Completion generator counting its calls."""
+
+    def __init__(self, delay: float = 0, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self) -> ChatCompletionResponse:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return ChatCompletionResponse(model=REQUEST.model)
+
+
+class TestIdempotencyStore:
+    """Tests for the deduplication of the requests sent with an idempotency key."""
+
+    async def test_concurrent_duplicates(self) -> None:
+        """Test that the duplicates of a request in flight wait for its response."""
+        store = IdempotencyStore()
+        generate = Generator(delay=0.05)
+
+        responses = await asyncio.gather(
+            *(store.run("client", "key", REQUEST, generate) for _ in range(5))
+        )
+
+        assert generate.calls == 1
+        assert all(response is responses[0] for response in responses)
+
+    async def test_stored_until_expired(self) -> None:
+        now = [0.0]
+        store = IdempotencyStore(ttl=10, clock=lambda: now[0])
+        generate = Generator()
+
+        first = await store.run("client", "key", REQUEST, generate)
+        now[0] = 9
+        assert await store.run("client", "key", REQUEST, generate) is first
+        now[0] = 20
+        assert await store.run("client", "key", REQUEST, generate) is not first
+        assert generate.calls == 2
+
+    async def test_scoped_to_client(self) -> None:
+        store = IdempotencyStore()
+        generate = Generator()
+
+        await store.run("client", "key", REQUEST, generate)
+        await store.run("other", "key", REQUEST, generate)
+
+        assert generate.calls == 2
+
+    async def test_conflicting_request(self) -> None:
+        """Test that a key cannot be reused for a different request."""
+        store = IdempotencyStore()
+        await store.run("client", "key", REQUEST, Generator())
+        other = ChatCompletionRequest(model=REQUEST.model, messages=REQUEST.messages, n=2)
+
+        with pytest.raises(HTTPException) as error:
+            await store.run("client", "key", other, Generator())
+        assert error.value.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    async def test_failure_not_stored(self) -> None:
+        """Test that the waiting duplicates get the error, and a later retry runs again."""
+        store = IdempotencyStore()
+        failing = Generator(delay=0.05, error=HTTPException(status_code=503))
+
+        results = await asyncio.gather(
+            *(store.run("client", "key", REQUEST, failing) for _ in range(2)),
+            return_exceptions=True,
+        )
+        generate = Generator()
+        await store.run("client", "key", REQUEST, generate)
+
+        assert failing.calls == 1
+        assert all(isinstance(result, HTTPException) for result in results)
+        assert generate.calls == 1
+
+    async def test_max_keys(self) -> None:
+        store = IdempotencyStore(max_keys=2)
+        for key in "abc":
+            await store.run("client", key, REQUEST, Generator())
+
+        assert len(store) == 2
+
+    async def test_database(self, tmp_path: Path) -> None:
+        """Test that the responses are shared through the database, and pending keys locked."""
+        db_path = str(tmp_path / "idempotency.db")
+        first = IdempotencyStore(db_path=db_path)
+        response = await first.run("client", "key", REQUEST, Generator())
+        pending = asyncio.create_task(first.run("client", "slow", REQUEST, Generator(0.2)))
+        await asyncio.sleep(0.05)
+
+        second = IdempotencyStore(db_path=db_path)
+        generate = Generator()
+        assert await second.run("client", "key", REQUEST, generate) == response
+        with pytest.raises(HTTPException) as error:
+            await second.run("client", "slow", REQUEST, generate)
+        assert error.value.status_code == HTTPStatus.CONFLICT
+        assert generate.calls == 0
+        await pending
+
+    async def test_stream_replayed(self) -> None:
+        """Test that a retry of a stream receives the whole stream again."""
+        store = IdempotencyStore(replays=StreamReplayStore())
+        calls = 0
+
+        async def generate() -> Any:
+            nonlocal calls
+            calls += 1
+
+            async def stream() -> Any:
+                for index in range(3):
+                    yield f"data: {index}\n\n".encode()
+
+            return stream()
+
+        request = ChatCompletionRequest(
+            model=REQUEST.model, messages=REQUEST.messages, stream=True
+        )
+        first = [event async for event in await store.run("client", "key", request, generate)]
+        retry = [event async for event in await store.run("client", "key", request, generate)]
+
+        assert calls == 1
+        assert len(first) == 3
+        assert retry == first
+
+
+class TestIdempotencyKeyHeader:
+    """Tests for the Idempotency-Key header of the completions."""
+
+    async def test_retry(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that a retry gets the same response, not a new generation."""
+        headers = {"Idempotency-Key": uuid4().hex}
+
+        first = await test_client.post(
+            "/v1/chat/completions", json=simple_chat_request, headers=headers
+        )
+        retry = await test_client.post(
+            "/v1/chat/completions", json=simple_chat_request, headers=headers
+        )
+        other = await test_client.post("/v1/chat/completions", json=simple_chat_request)
+
+        assert retry.status_code == HTTPStatus.CREATED
+        assert retry.json()["id"] == first.json()["id"]
+        assert other.json()["id"] != first.json()["id"]
+
+    async def test_stream_retry(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        payload = {**simple_chat_request, "stream": True}
+        headers = {"Idempotency-Key": uuid4().hex}
+
+        first = await test_client.post("/v1/chat/completions", json=payload, headers=headers)
+        retry = await test_client.post("/v1/chat/completions", json=payload, headers=headers)
+
+        assert first.text.endswith("data: [DONE]\n\n")
+        assert retry.text == first.text
+
+    async def test_conflicting_body(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        headers = {"Idempotency-Key": uuid4().hex}
+        await test_client.post("/v1/chat/completions", json=simple_chat_request, headers=headers)
+
+        response = await test_client.post(
+            "/v1/chat/completions", json={**simple_chat_request, "n": 2}, headers=headers
+        )
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert "Idempotency-Key" in response.json()["detail"]
+
+    async def test_key_too_long(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        response = await test_client.post(
+            "/v1/chat/completions",
+            json=simple_chat_request,
+            headers={"Idempotency-Key": "k" * 300},
+        )
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
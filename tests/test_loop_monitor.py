@@ -0,0 +1,78 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+from litestar.testing import AsyncTestClient
+
+from middleware import admin
+from services.loop_monitor import LoopMonitor
+
+
+def blocking_call(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def run_blocking(monitor: LoopMonitor) -> None:
+    monitor.start()
+    await asyncio.sleep(0.05)
+    blocking_call(0.3)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+
+class TestLoopMonitor:
+    """Tests for the event-loop lag monitor."""
+
+    async def test_blocking_call_captured(self) -> None:
+        """Test that a blocking call is measured and its stack captured while it blocks."""
+        monitor = LoopMonitor(interval=0.01, threshold=0.1, capture=True)
+
+        await run_blocking(monitor)
+
+        assert monitor.blocks == 1
+        assert monitor.max_lag >= 0.2
+        assert monitor.lag < 0.1
+        [block] = monitor.captures
+        assert "blocking_call" in block.stack[-1]
+        assert "run_blocking" in "".join(block.stack)
+        assert block.duration is not None and block.duration >= 0.2
+
+    async def test_without_capture(self) -> None:
+        """Test that the blocks are still counted without the watchdog thread."""
+        monitor = LoopMonitor(interval=0.01, threshold=0.1, capture=False)
+
+        await run_blocking(monitor)
+
+        assert monitor.blocks == 1
+        assert not monitor.captures
+
+
+class TestAdminEndpoint:
+    """Tests for the admin endpoints and their token."""
+
+    async def test_disabled_without_token(self, test_client: AsyncTestClient) -> None:
+        response = await test_client.get("/admin/loop")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    async def test_token_required(
+        self, test_client: AsyncTestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+
+        missing = await test_client.get("/admin/loop")
+        wrong = await test_client.get("/admin/loop", headers={"Authorization": "Bearer nope"})
+        response = await test_client.get("/admin/loop", headers={"Authorization": "Bearer secret"})
+
+        assert missing.status_code == wrong.status_code == HTTPStatus.UNAUTHORIZED
+        assert response.status_code == HTTPStatus.OK
+        assert {"lag", "max_lag", "blocks", "captures"} <= response.json().keys()
+
+    async def test_lag_metrics(self, test_client: AsyncTestClient) -> None:
+        await asyncio.sleep(0.2)
+
+        response = await test_client.get("/metrics")
+
+        assert "ollaix_event_loop_lag_seconds_count" in response.text
+        assert "ollaix_event_loop_blocks_total" in response.text
@@ -0,0 +1,141 @@
+import asyncio
+import pstats
+import time
+from collections.abc import AsyncIterator
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+
+import pytest
+from litestar import Litestar
+from litestar.middleware import DefineMiddleware
+from litestar.testing import AsyncTestClient
+
+from config.lifecycle import drain_and_close, start_serving
+from middleware import admin
+from middleware.profiling import ProfilingMiddleware
+from routes import routes
+from services.profiler import Profiler
+
+ADMIN_HEADERS = {"Authorization": "Bearer secret"}
+
+
+def compute(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+async def busy_loop(seconds: float) -> None:
+    """Keeps the event loop busy with steps of 30ms."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        compute(0.03)
+        await asyncio.sleep(0)
+
+
+def load_stats(profile: bytes, tmp_path: Path) -> set[str]:
+    """Returns the names of the functions of a pstats profile."""
+    path = tmp_path / "profile.prof"
+    path.write_bytes(profile)
+    return {function for _, _, function in pstats.Stats(str(path)).stats}  # type: ignore[attr-defined]
+
+
+@pytest.fixture
+def admin_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+
+
+@pytest.fixture
+async def profiled_client(admin_token: None) -> AsyncIterator[AsyncTestClient]:
+    """Client of the API with the profiling middleware, installed with an admin token."""
+    app = Litestar(
+        route_handlers=routes,
+        middleware=[DefineMiddleware(ProfilingMiddleware)],
+        on_startup=[start_serving],
+        on_shutdown=[drain_and_close],
+    )
+    async with AsyncTestClient(app=app) as client:
+        yield client
+
+
+class TestProfiler:
+    """Tests for the profiles of the worker."""
+
+    async def test_collapsed_stacks(self) -> None:
+        profiler = Profiler()
+
+        profile, _ = await asyncio.gather(profiler.profile(0.3, "collapsed"), busy_loop(0.3))
+
+        lines = profile.decode().splitlines()
+        busy = [line for line in lines if "compute" in line.rsplit(";", 1)[-1]]
+        assert busy
+        stack, count = busy[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack.index("_run_once") < stack.index("busy_loop") < stack.index("compute")
+
+    async def test_pstats(self, tmp_path: Path) -> None:
+        profiler = Profiler()
+
+        profile, _ = await asyncio.gather(profiler.profile(0.1, "pstats"), busy_loop(0.1))
+
+        assert "busy_loop" in load_stats(profile, tmp_path)
+
+    async def test_one_profile_at_a_time(self) -> None:
+        profiler = Profiler()
+        session = profiler.start("collapsed")
+
+        with pytest.raises(Exception, match="already running"):
+            profiler.start("pstats")
+        profiler.stop(session)
+        profiler.stop(profiler.start("pstats"))
+
+
+class TestProfilingEndpoints:
+    """Tests for the profiling endpoints and the profiled requests."""
+
+    async def test_profile_worker(self, test_client: AsyncTestClient, admin_token: None) -> None:
+        response = await test_client.get(
+            "/admin/profile", params={"seconds": 0.1, "format": "collapsed"}, headers=ADMIN_HEADERS
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-disposition"] == 'attachment; filename="profile.txt"'
+        assert "_run_once" in response.text
+
+    async def test_profile_too_long(self, test_client: AsyncTestClient, admin_token: None) -> None:
+        response = await test_client.get(
+            "/admin/profile", params={"seconds": 3600}, headers=ADMIN_HEADERS
+        )
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    async def test_profiled_request(
+        self,
+        profiled_client: AsyncTestClient,
+        simple_chat_request: dict[str, Any],
+        tmp_path: Path,
+    ) -> None:
+        """Test that a completion sent with X-Profile is profiled until its end."""
+        response = await profiled_client.post(
+            "/v1/chat/completions",
+            json={**simple_chat_request, "stream": True},
+            headers={"X-Profile": "pstats", "X-Admin-Token": "secret"},
+        )
+        profile = await profiled_client.get(
+            f"/admin/profiles/{response.headers['x-profile-id']}", headers=ADMIN_HEADERS
+        )
+
+        assert response.text.endswith("data: [DONE]\n\n")
+        assert profile.status_code == HTTPStatus.OK
+        assert "stream_completions" in load_stats(profile.content, tmp_path)
+
+    async def test_not_profiled_without_token(
+        self, profiled_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        response = await profiled_client.post(
+            "/v1/chat/completions", json=simple_chat_request, headers={"X-Profile": "pstats"}
+        )
+
+        assert response.status_code == HTTPStatus.CREATED
+        assert "x-profile-id" not in response.headers
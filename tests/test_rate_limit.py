@@ -0,0 +1,115 @@
+from collections.abc import AsyncIterator
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from litestar import Litestar
+from litestar.testing import AsyncTestClient
+
+from middleware.rate_limit import RateLimitConfig
+from routes import routes
+from services.rate_limiter import InMemoryBucketStore, RateLimiter
+from src.main import app
+
+
+@pytest.fixture
+async def limited_client() -> AsyncIterator[AsyncTestClient]:
+    """Test client for an application limited to 2 requests and 50 tokens per client."""
+    config = RateLimitConfig(
+        limiter=RateLimiter(requests_per_second=0.1, burst=2, tokens_per_minute=50)
+    )
+    limited_app = Litestar(
+        route_handlers=routes,
+        middleware=[config.middleware],
+        exception_handlers=app.exception_handlers,
+        on_startup=app.on_startup,
+        on_shutdown=app.on_shutdown,
+    )
+    async with AsyncTestClient(app=limited_app) as client:
+        yield client
+
+
+class TestBucketStore:
+    """Tests for the in-memory token-bucket store."""
+
+    def test_bucket_refills_over_time(self) -> None:
+        """Test that tokens come back at the refill rate, up to the capacity."""
+        now = [0.0]
+        store = InMemoryBucketStore(clock=lambda: now[0])
+
+        assert store.consume("client", capacity=2, refill_rate=1, cost=2) == (True, 0)
+        assert store.consume("client", capacity=2, refill_rate=1, cost=1) == (False, 0)
+
+        now[0] = 1.5
+        assert store.consume("client", capacity=2, refill_rate=1, cost=1) == (True, 0.5)
+
+        now[0] = 100
+        assert store.consume("client", capacity=2, refill_rate=1, cost=0) == (True, 2)
+
+    def test_least_recent_client_is_evicted(self) -> None:
+        """Test that the store keeps at most `max_keys` buckets."""
+        store = InMemoryBucketStore(max_keys=2, clock=lambda: 0.0)
+        for key in ("a", "b", "c"):
+            store.consume(key, capacity=1, refill_rate=1, cost=1)
+
+        # "a" was evicted and starts again with a full bucket
+        assert store.consume("a", capacity=1, refill_rate=1, cost=1) == (True, 0)
+        assert store.consume("c", capacity=1, refill_rate=1, cost=1) == (False, 0)
+
+
+class TestRateLimitMiddleware:
+    """Tests for the rate-limiting middleware."""
+
+    async def test_rate_limit_headers(self, limited_client: AsyncTestClient) -> None:
+        """Test that allowed responses describe the remaining budget."""
+        response = await limited_client.get("/v1/models")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["X-RateLimit-Limit"] == "2"
+        assert response.headers["X-RateLimit-Remaining"] == "1"
+        assert "X-RateLimit-Reset" in response.headers
+
+    async def test_burst_exceeded(self, limited_client: AsyncTestClient) -> None:
+        """Test that a client exceeding its burst gets a 429 with Retry-After."""
+        for _ in range(2):
+            await limited_client.get("/v1/models")
+
+        response = await limited_client.get("/v1/models")
+
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert response.json()["status_code"] == HTTPStatus.TOO_MANY_REQUESTS
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+        assert int(response.headers["Retry-After"]) > 0
+
+    async def test_clients_are_limited_separately(self, limited_client: AsyncTestClient) -> None:
+        """Test that each API key has its own bucket."""
+        for _ in range(2):
+            await limited_client.get("/v1/models", headers={"X-API-Key": "first"})
+
+        first = await limited_client.get("/v1/models", headers={"X-API-Key": "first"})
+        second = await limited_client.get("/v1/models", headers={"X-API-Key": "second"})
+
+        assert first.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert second.status_code == HTTPStatus.OK
+
+    @pytest.mark.parametrize("path", ["/health", "/ready"])
+    async def test_probes_are_not_limited(
+        self, limited_client: AsyncTestClient, path: str
+    ) -> None:
+        """Test that the health and readiness checks are excluded from rate limiting."""
+        for _ in range(5):
+            response = await limited_client.get(path)
+            assert response.status_code == HTTPStatus.OK
+
+    async def test_token_limit_exceeded(
+        self, limited_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that a client exceeding its tokens per minute gets a 429."""
+        payload = {**simple_chat_request, "stream": True, "max_tokens": 40}
+
+        first = await limited_client.post("/v1/chat/completions", json=payload)
+        second = await limited_client.post("/v1/chat/completions", json=payload)
+
+        assert first.status_code == HTTPStatus.CREATED
+        assert second.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert second.headers["X-RateLimit-Limit"] == "50"
@@ -0,0 +1,143 @@
+import json
+import random
+from collections.abc import AsyncGenerator
+from typing import Any, override
+
+import pytest
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse, ModelInfo
+from services.ai_service_interface import AIServiceInterface
+from services.ollama_service import OllamaService
+from services.reasoning import ReasoningParser, split_reasoning
+
+TEXT = "<think>\nThe user greets me, <b> is not a tag.\n</think>\n\nHello! <thinking> too <"
+
+
+def parse(chunks: list[str]) -> tuple[str, str]:
+    parser = ReasoningParser()
+    reasoning: list[str] = []
+    content: list[str] = []
+    for chunk in chunks:
+        for is_reasoning, piece in parser.feed(chunk):
+            (reasoning if is_reasoning else content).append(piece)
+    for is_reasoning, piece in parser.flush():
+        (reasoning if is_reasoning else content).append(piece)
+    return "".join(reasoning), "".join(content)
+
+
+class ThinkingService(AIServiceInterface):
+    """Service streaming a fixed text in fixed pieces."""
+
+    available_models = ["thinking-model"]
+    reasoning_models = ["thinking-model"]
+    provider_name = "thinking"
+
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+
+    @override
+    async def chat_completion(self, request: ChatCompletionRequest) -> ChatCompletionResponse:
+        raise NotImplementedError
+
+    @override
+    async def stream_content(self, request: ChatCompletionRequest) -> AsyncGenerator[str, Any]:
+        for chunk in self.chunks:
+            yield chunk
+
+    @override
+    def get_model_info(self) -> list[ModelInfo]:
+        return []
+
+
+class TestReasoningParser:
+    """Tests for the incremental split of the <think> reasoning."""
+
+    def test_whole_text(self) -> None:
+        reasoning, content = parse([TEXT])
+
+        assert reasoning == "The user greets me, <b> is not a tag.\n"
+        assert content == "Hello! <thinking> too <"
+
+    def test_any_chunk_boundaries(self) -> None:
+        """Test that the split is the same whatever the chunk boundaries, inside tags too."""
+        expected = parse([TEXT])
+        for first in range(len(TEXT) + 1):
+            for second in range(first, len(TEXT) + 1):
+                chunks = [TEXT[:first], TEXT[first:second], TEXT[second:]]
+                assert parse(chunks) == expected, chunks
+
+    def test_character_by_character(self) -> None:
+        assert parse(list(TEXT)) == parse([TEXT])
+
+    def test_random_chunks(self) -> None:
+        rng = random.Random(0)
+        text = TEXT * 5
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(len(text)), rng.randint(1, 40)))
+            bounds = zip([0, *cuts], [*cuts, len(text)], strict=True)
+            chunks = [text[start:end] for start, end in bounds]
+            assert parse(chunks) == parse([text])
+
+    def test_unclosed_reasoning(self) -> None:
+        """Test that a stream ending while reasoning keeps the reasoning."""
+        assert parse(["<think>Hmm", "</thi"]) == ("Hmm</thi", "")
+
+    def test_split_reasoning(self) -> None:
+        assert split_reasoning(TEXT) == (
+            "The user greets me, <b> is not a tag.",
+            "Hello! <thinking> too <",
+        )
+        assert split_reasoning("No reasoning") == ("", "No reasoning")
+
+
+class TestReasoningStream:
+    """Tests for the reasoning option of the streamed and complete responses."""
+
+    async def collect(self, reasoning: str) -> tuple[str, str]:
+        service = ThinkingService([TEXT[:3], TEXT[3:20], TEXT[20:45], TEXT[45:]])
+        request = ChatCompletionRequest(
+            model="thinking-model",
+            messages=[{"role": "user", "content": "Hi"}],  # type: ignore
+            reasoning=reasoning,  # type: ignore
+        )
+        deltas = [
+            json.loads(event[6:])["choices"][0]["delta"]
+            async for event in service.stream_choice(request)
+        ]
+        return (
+            "".join(delta.get("reasoning_content", "") for delta in deltas),
+            "".join(delta.get("content", "") for delta in deltas),
+        )
+
+    async def test_separate(self) -> None:
+        assert await self.collect("separate") == parse([TEXT])
+
+    async def test_inline(self) -> None:
+        assert await self.collect("inline") == ("", TEXT)
+
+    async def test_none(self) -> None:
+        assert await self.collect("none") == ("", parse([TEXT])[1])
+
+    @pytest.mark.parametrize(
+        ("reasoning", "expected"),
+        [
+            (
+                "separate",
+                {
+                    "role": "assistant",
+                    "content": "Hello! <thinking> too <",
+                    "reasoning_content": "The user greets me, <b> is not a tag.",
+                },
+            ),
+            ("inline", {"role": "assistant", "content": TEXT}),
+            ("none", {"role": "assistant", "content": "Hello! <thinking> too <"}),
+        ],
+    )
+    def test_complete_message(self, reasoning: str, expected: dict[str, str]) -> None:
+        request = ChatCompletionRequest(
+            model="qwen3:1.7b",
+            messages=[{"role": "user", "content": "Hi"}],  # type: ignore
+            reasoning=reasoning,  # type: ignore
+        )
+
+        assert OllamaService()._get_message(request, TEXT) == expected
@@ -0,0 +1,131 @@
+import asyncio
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from litestar.exceptions import ServiceUnavailableException
+from litestar.testing import AsyncTestClient
+
+from services.scheduler import BackendScheduler
+
+WEIGHTS = {"interactive": 8.0, "batch": 1.0}
+
+
+async def settle() -> None:
+    """Lets the pending tasks run until they block."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestBackendScheduler:
+    """Tests for the weighted fair queue of a backend."""
+
+    async def test_waits_for_a_free_slot(self) -> None:
+        """Test that a request waits until a slot is released."""
+        backend = BackendScheduler("test", max_concurrency=1, weights=WEIGHTS)
+        slot = await backend.acquire("interactive")
+
+        waiting = asyncio.create_task(backend.acquire("interactive"))
+        await settle()
+        assert not waiting.done()
+        assert backend.queued == 1
+
+        slot.release()
+        await settle()
+        assert waiting.done()
+        assert backend.active == 1
+
+    async def test_interactive_dispatched_before_batch(self) -> None:
+        """Test that queued interactive requests overtake queued batch requests."""
+        backend = BackendScheduler("test", max_concurrency=1, weights=WEIGHTS)
+        slot = await backend.acquire("batch")
+        order: list[str] = []
+
+        async def run(name: str, priority: str) -> None:
+            granted = await backend.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0)
+            granted.release()
+
+        tasks = [asyncio.create_task(run(f"batch-{i}", "batch")) for i in range(3)]
+        await settle()
+        tasks += [asyncio.create_task(run(f"ui-{i}", "interactive")) for i in range(2)]
+        await settle()
+
+        slot.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["ui-0", "ui-1", "batch-0", "batch-1", "batch-2"]
+
+    async def test_batch_preempted_from_full_queue(self) -> None:
+        """Test that a queued batch request is evicted for an interactive one."""
+        backend = BackendScheduler("test", max_concurrency=1, max_queue=1, weights=WEIGHTS)
+        slot = await backend.acquire("batch")
+
+        batch = asyncio.create_task(backend.acquire("batch"))
+        await settle()
+        interactive = asyncio.create_task(backend.acquire("interactive"))
+        await settle()
+
+        with pytest.raises(ServiceUnavailableException):
+            await batch
+
+        # The queue is full of higher priority work, a new batch request is rejected
+        with pytest.raises(ServiceUnavailableException):
+            await backend.acquire("batch")
+
+        slot.release()
+        await interactive
+        assert backend.active == 1
+        assert backend.queued == 0
+
+    async def test_request_cost(self) -> None:
+        """Test that a request running several generations waits for as many slots."""
+        backend = BackendScheduler("test", max_concurrency=3, weights=WEIGHTS)
+        slot = await backend.acquire("interactive", cost=2)
+
+        waiting = asyncio.create_task(backend.acquire("interactive", cost=2))
+        await settle()
+        assert not waiting.done()
+
+        slot.release()
+        await settle()
+        assert waiting.done()
+        assert backend.active == 2
+
+    async def test_cancelled_request_leaves_the_queue(self) -> None:
+        """Test that a request cancelled while queued does not take a slot later."""
+        backend = BackendScheduler("test", max_concurrency=1, weights=WEIGHTS)
+        slot = await backend.acquire("interactive")
+
+        waiting = asyncio.create_task(backend.acquire("interactive"))
+        await settle()
+        waiting.cancel()
+        await settle()
+
+        assert backend.queued == 0
+        slot.release()
+        assert backend.active == 0
+
+
+class TestSchedulerMetrics:
+    """Tests for the scheduler metrics."""
+
+    async def test_queue_time_per_class(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that the queue time of a completion is exported for its class."""
+        await test_client.post(
+            "/v1/chat/completions",
+            json={**simple_chat_request, "stream": True},
+            headers={"X-Priority": "batch"},
+        )
+
+        response = await test_client.get("/metrics")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"].startswith("text/plain")
+        assert (
+            'ollaix_scheduler_queue_seconds_count{backend="dummy:dummy",priority="batch"}'
+            in response.text
+        )
@@ -0,0 +1,169 @@
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from litestar.testing import AsyncTestClient
+
+from schemas.chat_schemas import ChatCompletionRequest, ChatCompletionResponse, ChatMessage
+from services import semantic_cache as semantic_cache_module
+from services.semantic_cache import SemanticCache, cache_requests, semantic_cache
+
+np = pytest.importorskip("numpy")
+
+MODEL = "dummy-model:1.0"
+
+
+def chat_request(*contents: str, **parameters: Any) -> ChatCompletionRequest:
+    messages = [
+        ChatMessage(role="user" if index % 2 == 0 else "assistant", content=content)
+        for index, content in enumerate(contents)
+    ]
+    return ChatCompletionRequest(model=MODEL, messages=messages, **parameters)
+
+
+class Generator:
+    """Generation counting its calls, each response has the content of the call number."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def __call__(self) -> ChatCompletionResponse:
+        self.calls += 1
+        return ChatCompletionResponse(
+            model=MODEL,
+            choices=[{"index": 0, "message": {"role": "assistant", "content": str(self.calls)}}],
+        )
+
+
+def enabled_cache(**parameters: Any) -> SemanticCache:
+    """Returns an enabled cache, embedding with the hashing vectorizer of the dummy model."""
+    return SemanticCache(**{"enabled": True, "embedding_model": MODEL} | parameters)
+
+
+def content(response: ChatCompletionResponse) -> str:
+    return response.choices[0]["message"]["content"]
+
+
+class TestSemanticCache:
+    """Tests for the semantic cache of the completions."""
+
+    async def test_near_duplicate_hit(self) -> None:
+        cache = enabled_cache()
+        generate = Generator()
+
+        first = await cache.run(chat_request("what is python"), "interactive", generate)
+        second = await cache.run(chat_request("What is Python?"), "interactive", generate)
+
+        assert generate.calls == 1
+        assert content(second) == content(first)
+        assert second.id != first.id
+
+    async def test_different_question_miss(self) -> None:
+        cache = enabled_cache()
+        generate = Generator()
+
+        await cache.run(chat_request("what is python"), "interactive", generate)
+        other = await cache.run(chat_request("how to bake bread"), "interactive", generate)
+
+        assert content(other) == "2"
+
+    @pytest.mark.parametrize(
+        "second",
+        [
+            chat_request("hello", "Hi! How can I help?", "what is python"),
+            chat_request("what is python", temperature=1.5),
+            chat_request("what is python", stream=True),
+        ],
+    )
+    async def test_same_message_other_context_miss(self, second: ChatCompletionRequest) -> None:
+        """Test that only the last message may differ, the rest of the request must match."""
+        cache = enabled_cache()
+        generate = Generator()
+
+        await cache.run(chat_request("what is python"), "interactive", generate)
+        await cache.run(second, "interactive", generate)
+
+        assert generate.calls == 2
+
+    async def test_threshold_per_model(self) -> None:
+        lenient = enabled_cache(threshold=0.99, model_thresholds={MODEL: 0.5})
+        strict = enabled_cache(threshold=0.5, model_thresholds={MODEL: 0.99})
+        for cache, calls in ((lenient, 1), (strict, 2)):
+            generate = Generator()
+
+            await cache.run(chat_request("what is python"), "interactive", generate)
+            await cache.run(chat_request("what is python used for"), "interactive", generate)
+
+            assert generate.calls == calls
+
+    async def test_expired_after_ttl(self) -> None:
+        now = [0.0]
+        cache = enabled_cache(ttl=10, clock=lambda: now[0])
+        generate = Generator()
+
+        await cache.run(chat_request("what is python"), "interactive", generate)
+        now[0] = 11
+        await cache.run(chat_request("what is python"), "interactive", generate)
+
+        assert generate.calls == 2
+
+    async def test_oldest_evicted(self) -> None:
+        now = [0.0]
+        cache = enabled_cache(max_entries=2, clock=lambda: now[0])
+        generate = Generator()
+        for question in ("what is python", "what is rust", "what is java"):
+            now[0] += 1
+            await cache.run(chat_request(question), "interactive", generate)
+
+        python = await cache.run(chat_request("what is python"), "interactive", generate)
+        java = await cache.run(chat_request("what is java"), "interactive", generate)
+
+        assert content(python) == "4"
+        assert content(java) == "3"
+
+    async def test_search_in_thread(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(semantic_cache_module, "OFFLOAD_VALUES", 0)
+        cache = enabled_cache()
+        generate = Generator()
+
+        await cache.run(chat_request("what is python"), "interactive", generate)
+        await cache.run(chat_request("What is Python?"), "interactive", generate)
+
+        assert generate.calls == 1
+
+    async def test_embedding_failure_skips_cache(self) -> None:
+        cache = enabled_cache(embedding_model="unknown-model")
+        generate = Generator()
+
+        response = await cache.run(chat_request("what is python"), "interactive", generate)
+
+        assert content(response) == "1"
+
+    def test_enabled_without_embedding_model(self) -> None:
+        with pytest.raises(RuntimeError, match="SEMANTIC_CACHE_EMBEDDING_MODEL"):
+            SemanticCache(enabled=True, embedding_model="")
+
+
+class TestSemanticCacheEndpoint:
+    """Tests for the semantic cache in front of the completion endpoint."""
+
+    async def test_completion_served_from_cache(
+        self, test_client: AsyncTestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(semantic_cache, "enabled", True)
+        monkeypatch.setattr(semantic_cache, "embedding_model", MODEL)
+        monkeypatch.setattr(semantic_cache, "_indexes", {})
+        hits = cache_requests.get(model=MODEL, result="hit")
+
+        first = await test_client.post(
+            "/v1/chat/completions",
+            json={"model": MODEL, "messages": [{"role": "user", "content": "what is python"}]},
+        )
+        second = await test_client.post(
+            "/v1/chat/completions",
+            json={"model": MODEL, "messages": [{"role": "user", "content": "What is Python?"}]},
+        )
+
+        assert first.status_code == second.status_code == HTTPStatus.CREATED
+        assert second.json()["choices"] == first.json()["choices"]
+        assert cache_requests.get(model=MODEL, result="hit") == hits + 1
@@ -0,0 +1,166 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+import pytest
+
+import serve
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server_env() -> dict[str, str]:
+    """Settings of the server, overridden by parametrizing the tests."""
+    return {}
+
+
+@pytest.fixture
+def server(server_env: dict[str, str]) -> Iterator[tuple[str, subprocess.Popen]]:
+    """Runs the production server with one worker and a dummy model streaming for 1s."""
+    port = free_port()
+    env = {
+        **os.environ,
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "SERVER_WORKERS": "1",
+        "SERVER_GRACEFUL_TIMEOUT": "10",
+        "DUMMY_MODE": "deterministic",
+        "DUMMY_TOKENS_PER_SECOND": "20",
+        "DUMMY_COMPLETION_TOKENS": "20",
+        **server_env,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "serve.py"],
+        cwd=SRC_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                httpx.get(f"{url}/health")
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("Server did not start") from None
+                time.sleep(0.1)
+        yield url, process
+    finally:
+        process.kill()
+        process.wait()
+
+
+class TestServerOptions:
+    """Tests for the options of the production server."""
+
+    def test_worker_count(self) -> None:
+        """Test that the workers default to one per available CPU."""
+        assert serve.get_worker_count(3) == 3
+        assert serve.get_worker_count(0) == len(os.sched_getaffinity(0))
+
+    def test_fallback_without_uvloop(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the standard loop and parser are used when the fast ones are missing."""
+        monkeypatch.setattr(serve, "find_spec", lambda name: None)
+
+        options = serve.get_server_options()
+
+        assert (options["loop"], options["http"]) == ("asyncio", "h11")
+
+
+def stream_with_sigterm(url: str, process: subprocess.Popen) -> list[str]:
+    """Streams a completion, sends SIGTERM to the server once it started, returns the lines."""
+    payload = {
+        "model": "dummy-model:1.0",
+        "messages": [{"role": "user", "content": "Hello"}],
+        "stream": True,
+    }
+    lines = []
+    with httpx.stream("POST", f"{url}/v1/chat/completions", json=payload) as response:
+        for line in response.iter_lines():
+            if not lines:
+                process.send_signal(signal.SIGTERM)
+            lines.append(line)
+    return lines
+
+
+class TestGracefulShutdown:
+    """Tests for the shutdown of the production server."""
+
+    def test_streams_drained_on_sigterm(self, server: tuple[str, subprocess.Popen]) -> None:
+        """Test that a stream in flight on SIGTERM completes before the server exits."""
+        url, process = server
+
+        lines = stream_with_sigterm(url, process)
+
+        assert len([line for line in lines if line.startswith("data: {")]) == 21
+        assert "data: [DONE]" in lines
+        # Uvicorn raises the signal again once the server has shut down
+        assert process.wait(timeout=10) == -signal.SIGTERM
+
+    @pytest.mark.parametrize(
+        "server_env", [{"SHUTDOWN_DRAIN_TIMEOUT": "0.3", "DUMMY_COMPLETION_TOKENS": "200"}]
+    )
+    def test_streams_ended_at_drain_deadline(self, server: tuple[str, subprocess.Popen]) -> None:
+        """Test that a stream still running at the drain deadline ends with an error event."""
+        url, process = server
+        start = time.monotonic()
+
+        lines = stream_with_sigterm(url, process)
+
+        # The stream would last 10s
+        assert time.monotonic() - start < 3
+        events = [line for line in lines if line.startswith("data: ")]
+        assert json.loads(events[-1][6:]) == {
+            "error": {"status_code": 503, "detail": "Server is shutting down, please retry."}
+        }
+        assert process.wait(timeout=10) == -signal.SIGTERM
+
+
+class TestResumableStreams:
+    """Tests for the resumption of a stream after a dropped connection."""
+
+    def test_resume_after_disconnect(self, server: tuple[str, subprocess.Popen]) -> None:
+        """Test that a client reconnecting with Last-Event-ID receives the rest of the stream."""
+        url, _ = server
+        payload = {
+            "model": "dummy-model:1.0",
+            "messages": [{"role": "user", "content": "Hello"}],
+            "stream": True,
+        }
+        lines: list[str] = []
+        with httpx.stream("POST", f"{url}/v1/chat/completions", json=payload) as response:
+            for line in response.iter_lines():
+                lines.append(line)
+                if len([line for line in lines if line.startswith("id: ")]) == 5:
+                    break
+        last_event_id = lines[-1].removeprefix("id: ")
+
+        resumed = httpx.post(
+            f"{url}/v1/chat/completions",
+            json=payload,
+            headers={"Last-Event-ID": last_event_id},
+        )
+        lines += resumed.text.splitlines()
+
+        assert len([line for line in lines if line.startswith("data: {")]) == 21
+        assert lines[-2:] == ["data: [DONE]", ""]
+        ids = [line.removeprefix("id: ").split("/") for line in lines if line.startswith("id: ")]
+        assert [int(sequence) for _, sequence in ids] == list(range(21))
+        assert len({stream_id for stream_id, _ in ids}) == 1
@@ -0,0 +1,133 @@
+import multiprocessing
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from services.rate_limiter import SharedBucketStore
+from services.shared_state import SharedStore
+
+
+def consume_all(path: str, attempts: int) -> int:
+    """Takes tokens from a bucket with no refill from another process, returns how many passed."""
+    # Waits for the lock instead of failing open, to count every check
+    store = SharedBucketStore(SharedStore(path, busy_timeout=10))
+    return sum(store.consume("client", 100, 0, 1)[0] for _ in range(attempts))
+
+
+def increment(path: str, times: int) -> None:
+    store = SharedStore(path, busy_timeout=10)
+    for _ in range(times):
+        store.incr("counter")
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> str:
+    return str(tmp_path / "state.db")
+
+
+class TestSharedStore:
+    """Tests for the key-value store shared by the workers."""
+
+    def test_values_shared_between_connections(self, path: str) -> None:
+        first, second = SharedStore(path), SharedStore(path)
+
+        first.set("bytes", b"\x00value")
+        first.set("text", "value")
+
+        assert second.get("bytes") == b"\x00value"
+        assert second.get("text") == "value"
+        assert second.get("missing") is None
+        second.delete("text")
+        assert first.get("text") is None
+
+    def test_counters(self, path: str) -> None:
+        store = SharedStore(path)
+
+        assert store.incr("requests") == 1
+        assert store.incr("requests", 4) == 5
+        assert store.incr("seconds", 0.5) == 0.5
+        assert store.get("requests") == 5
+
+    def test_least_recently_used_evicted(self, path: str) -> None:
+        now = [0.0]
+        store = SharedStore(path, max_entries=2, clock=lambda: now[0])
+        store.eviction_interval = 1
+        for key in ("a", "b"):
+            now[0] += 1
+            store.set(key, key)
+
+        now[0] += 1
+        store.get("a")
+        now[0] += 1
+        store.set("c", "c")
+
+        assert len(store) == 2
+        assert store.get("b") is None
+        assert store.get("a") == "a"
+
+    def test_transaction_rolled_back(self, path: str) -> None:
+        store = SharedStore(path)
+        store.set("key", "before")
+
+        with pytest.raises(RuntimeError), store.transaction():
+            store.set("key", "after")
+            raise RuntimeError
+
+        assert store.get("key") == "before"
+
+    def test_read_during_write(self, path: str) -> None:
+        """Test that a read does not wait for the lock held by another worker."""
+        store, other = SharedStore(path, busy_timeout=0.01), SharedStore(path)
+        store.set("key", "value")
+
+        with other.transaction():
+            other.set("key", "other")
+            assert store.get("key") == "value"
+            with pytest.raises(sqlite3.OperationalError):
+                store.set("key", "blocked")
+
+    def test_counters_atomic_across_processes(self, path: str) -> None:
+        SharedStore(path)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(2, mp_context=context) as pool:
+            list(pool.map(increment, [path] * 2, [500] * 2))
+
+        assert SharedStore(path).get("counter") == 1000
+
+
+class TestSharedBucketStore:
+    """Tests for the token buckets shared by the workers."""
+
+    def test_bucket_refills_over_time(self, path: str) -> None:
+        now = [0.0]
+        store = SharedBucketStore(SharedStore(path), clock=lambda: now[0])
+
+        assert store.consume("client", capacity=2, refill_rate=1, cost=2) == (True, 0)
+        assert store.consume("client", capacity=2, refill_rate=1, cost=1) == (False, 0)
+
+        now[0] = 1.5
+        assert store.consume("client", capacity=2, refill_rate=1, cost=1) == (True, 0.5)
+
+        now[0] = 100
+        assert store.consume("client", capacity=2, refill_rate=1, cost=0) == (True, 2)
+
+    def test_limit_enforced_across_processes(self, path: str) -> None:
+        """Test that concurrent workers never let more requests pass than the bucket holds."""
+        SharedStore(path)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(2, mp_context=context) as pool:
+            passed = sum(pool.map(consume_all, [path] * 2, [100] * 2))
+
+        assert passed == 100
+
+    def test_fails_open_when_locked(self, path: str) -> None:
+        store, other = SharedStore(path, busy_timeout=0.01), SharedStore(path)
+        buckets = SharedBucketStore(store)
+        assert buckets.consume("client", capacity=1, refill_rate=0, cost=1) == (True, 0)
+
+        with other.transaction():
+            assert buckets.consume("client", capacity=1, refill_rate=0, cost=1) == (True, 1)
+
+        assert buckets.consume("client", capacity=1, refill_rate=0, cost=1) == (False, 0)
@@ -0,0 +1,120 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from config.lifecycle import drain_and_close
+from services.ai_service_interface import AIServiceInterface
+from services.dummy_service import DummyService
+from services.loop_monitor import loop_monitor
+from services.providers import ProviderRegistry, providers
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+# Imports the application, then serves the models and a completion with the test client
+STARTUP_SCRIPT = """
+import json, sys
+import main
+from litestar.testing import TestClient
+
+imported = [name for name in ("google.genai", "ollama") if name in sys.modules]
+with TestClient(app=main.app) as client:
+    models = client.get("/v1/models").json()
+    completion = client.post(
+        "/v1/chat/completions",
+        json={"model": "dummy-model:1.0", "messages": [{"role": "user", "content": "Hi"}]},
+    )
+print(json.dumps({
+    "imported_at_startup": imported,
+    "imported_at_end": [name for name in ("google.genai", "ollama") if name in sys.modules],
+    "models": [model["id"] for model in models["data"]],
+    "completion_status": completion.status_code,
+}))
+"""
+
+
+def run_app(**settings: str) -> dict:
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("GEMINI_API_KEY", "GEMINI_ENABLED", "PYTHONPATH")
+    }
+    env.update(DUMMY_MODE="deterministic", **settings)
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+class TestStartup:
+    """Tests for the start of the application and the lazy import of the providers."""
+
+    def test_starts_without_gemini(self) -> None:
+        """Test that the application serves the other providers without a Gemini API key."""
+        result = run_app()
+
+        assert result["imported_at_startup"] == []
+        assert "gemini-2.0-flash" not in result["models"]
+        assert "dummy-model:1.0" in result["models"]
+        assert "gemma3:1b" in result["models"]
+        assert result["completion_status"] == 201
+
+    def test_disabled_providers_not_imported(self) -> None:
+        """Test that the SDK of a disabled provider is never imported, even when serving."""
+        result = run_app(OLLAMA_ENABLED="false")
+
+        assert result["imported_at_end"] == []
+        assert result["models"] == ["dummy-model:1.0"]
+        assert result["completion_status"] == 201
+
+
+class TestProviderRegistry:
+    """Tests for the creation of the provider services."""
+
+    def test_services_created_once(self) -> None:
+        created: list[AIServiceInterface] = []
+
+        def create() -> AIServiceInterface:
+            created.append(DummyService())
+            return created[-1]
+
+        def create_disabled() -> AIServiceInterface:
+            raise AssertionError("Disabled provider created")
+
+        registry = ProviderRegistry([(False, create_disabled), (True, create)])
+
+        assert registry.loaded == []
+        assert registry.get_services() == created
+        assert registry.get_services() == created
+        assert len(created) == 1
+
+
+class TestShutdown:
+    """Tests for the shutdown hooks of the application."""
+
+    async def test_failed_step_does_not_skip_the_next(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        stopped: list[bool] = []
+
+        async def fail() -> None:
+            raise AttributeError("close")
+
+        async def stop() -> None:
+            stopped.append(True)
+
+        monkeypatch.setattr(providers, "close", fail)
+        monkeypatch.setattr(loop_monitor, "stop", stop)
+
+        await drain_and_close()
+
+        assert stopped == [True]
@@ -0,0 +1,114 @@
+import json
+import random
+from collections.abc import AsyncGenerator
+from http import HTTPStatus
+from typing import Any
+
+from litestar.testing import AsyncTestClient
+
+from services.stop_sequences import StopMatcher, stop_at, truncate_at_stop
+
+STOPS = ["abcd", "c", "\n\nUser:"]
+
+
+def match(chunks: list[str], stops: list[str]) -> tuple[str, bool]:
+    matcher = StopMatcher(stops)
+    text = ""
+    for chunk in chunks:
+        text += matcher.feed(chunk)
+        if matcher.stopped:
+            return text, True
+    return text + matcher.flush(), False
+
+
+def stream_text(response_text: str) -> tuple[str, list[str]]:
+    """Returns the content and the finish reasons of a streamed response."""
+    events = [line[6:] for line in response_text.splitlines() if line.startswith("data: ")]
+    choices = [json.loads(event)["choices"][0] for event in events if event != "[DONE]"]
+    content = "".join(choice["delta"].get("content", "") for choice in choices)
+    return content, [choice["finish_reason"] for choice in choices if choice["finish_reason"]]
+
+
+class TestStopMatcher:
+    """Tests for the incremental search of the stop sequences."""
+
+    def test_holds_back_only_possible_starts(self) -> None:
+        matcher = StopMatcher(["\n\nUser:"])
+
+        assert matcher.feed("Hello\n\nUs") == "Hello"
+        assert matcher.feed("ually") == "\n\nUsually"
+        assert matcher.feed("\n") == ""
+        assert matcher.flush() == "\n"
+        assert not matcher.stopped
+
+    def test_first_sequence_to_end(self) -> None:
+        """Test that the text stops at the sequence ending first, like a token-wise check."""
+        assert match(["xabcd"], STOPS) == ("xab", True)
+        assert match(list("xabcd"), STOPS) == ("xab", True)
+
+    def test_any_chunk_boundaries(self) -> None:
+        rng = random.Random(0)
+        text = "Answer: ab\n\nUse the ab" * 4 + "\n\nUser: ignored abcd"
+        expected = ("Answer: ab\n\nUse the ab" * 4, True)
+        assert match([text], STOPS) == expected
+        for _ in range(300):
+            cuts = sorted(rng.sample(range(len(text)), rng.randint(1, 30)))
+            bounds = zip([0, *cuts], [*cuts, len(text)], strict=True)
+            assert match([text[start:end] for start, end in bounds], STOPS) == expected
+
+    def test_truncate_at_stop(self) -> None:
+        assert truncate_at_stop("one, two\n\nUser: three", STOPS) == "one, two"
+        assert truncate_at_stop("no stop\n\nUs", STOPS) == "no stop\n\nUs"
+
+    async def test_upstream_closed_at_stop(self) -> None:
+        """Test that the upstream stream is closed as soon as a sequence is found."""
+        sent: list[str] = []
+        closed: list[bool] = []
+
+        async def upstream() -> AsyncGenerator[str, Any]:
+            try:
+                for token in ["Hello", " world", ".", " More", " text"]:
+                    sent.append(token)
+                    yield token
+            finally:
+                closed.append(True)
+
+        text = [piece async for piece in stop_at(upstream(), [" wor", "."])]
+
+        assert text == ["Hello"]
+        assert sent == ["Hello", " world"]
+        assert closed == [True]
+
+
+class TestStopParameter:
+    """Tests for the `stop` parameter of the completions."""
+
+    async def test_stop(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that the streamed and complete responses end before the stop sequence."""
+        response = await test_client.post("/v1/chat/completions", json=simple_chat_request)
+        full = response.json()["choices"][0]["message"]["content"]
+        stop = full[len(full) // 2 : len(full) // 2 + 4]
+        expected = full[: full.index(stop)]
+
+        complete = await test_client.post(
+            "/v1/chat/completions", json={**simple_chat_request, "stop": [stop, "\x00"]}
+        )
+        streamed = await test_client.post(
+            "/v1/chat/completions", json={**simple_chat_request, "stop": stop, "stream": True}
+        )
+
+        assert complete.json()["choices"][0]["message"]["content"] == expected
+        assert complete.json()["choices"][0]["finish_reason"] == "stop"
+        assert stream_text(streamed.text) == (expected, ["stop"])
+        assert streamed.text.endswith("data: [DONE]\n\n")
+
+    async def test_too_many_stop_sequences(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        payload = {**simple_chat_request, "stop": ["a", "b", "c", "d", "e"]}
+
+        response = await test_client.post("/v1/chat/completions", json=payload)
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -0,0 +1,190 @@
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from http import HTTPStatus
+from typing import Any
+
+import httpx
+import pytest
+from litestar.exceptions import NotFoundException, ServiceUnavailableException
+from litestar.testing import AsyncTestClient
+
+from middleware import admin
+from services.dummy_service import DummyConfig, DummyService
+from services.stream_registry import CANCEL_DETAIL, StreamRegistry, stream_registry
+from src.main import app
+from tests.fake_backends import run_in_thread
+
+ADMIN_HEADERS = {"Authorization": "Bearer secret"}
+
+
+async def token_stream(count: int, delay: float, closed: list[bool]) -> AsyncGenerator[bytes, Any]:
+    try:
+        for index in range(count):
+            await asyncio.sleep(delay)
+            yield f"data: {index}\n\n".encode()
+    finally:
+        closed.append(True)
+
+
+async def consume(stream: AsyncGenerator[bytes, Any]) -> list[bytes]:
+    return [chunk async for chunk in stream]
+
+
+class TestStreamRegistry:
+    """Tests for the drain of the in-flight streams."""
+
+    async def test_drain_waits_for_streams(self) -> None:
+        """Test that the streams finishing before the deadline are left to complete."""
+        registry = StreamRegistry()
+        closed: list[bool] = []
+        consumer = asyncio.create_task(consume(registry.track(token_stream(3, 0.05, closed))))
+        await asyncio.sleep(0)
+
+        cancelled = await registry.drain(timeout=5)
+
+        assert cancelled == 0
+        assert len(await consumer) == 3
+        assert registry.active == 0
+        with pytest.raises(ServiceUnavailableException):
+            registry.ensure_accepting()
+
+    async def test_streams_ended_at_deadline(self) -> None:
+        """Test that a stream running at the deadline is closed and ends with an error event."""
+        registry = StreamRegistry()
+        closed: list[bool] = []
+        consumer = asyncio.create_task(consume(registry.track(token_stream(100, 0.05, closed))))
+        await asyncio.sleep(0)
+
+        cancelled = await registry.drain(timeout=0.12)
+        chunks = await consumer
+
+        assert cancelled == 1
+        assert closed == [True]
+        assert chunks[:2] == [b"data: 0\n\n", b"data: 1\n\n"]
+        assert json.loads(chunks[-1][6:])["error"]["status_code"] == 503
+
+    async def test_error_raised_at_deadline(self) -> None:
+        """Test that a stream tracked with `raise_error` raises its error at the deadline."""
+        registry = StreamRegistry()
+        stream = registry.track(token_stream(100, 0.05, []), raise_error=True)
+        consumer = asyncio.create_task(consume(stream))
+        await asyncio.sleep(0)
+
+        await registry.drain(timeout=0.12)
+
+        with pytest.raises(ServiceUnavailableException):
+            await consumer
+        assert registry.active == 0
+
+    async def test_other_cancellations_propagate(self) -> None:
+        """Test that a stream cancelled for another reason, like a disconnect, is not ended."""
+        registry = StreamRegistry()
+        consumer = asyncio.create_task(consume(registry.track(token_stream(100, 0.05, []))))
+        await asyncio.sleep(0.07)
+
+        consumer.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        assert registry.active == 0
+
+
+class TestReadiness:
+    """Tests for the readiness check and the refusal of completions while draining."""
+
+    async def test_ready(self, test_client: AsyncTestClient) -> None:
+        response = await test_client.get("/ready")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {"status": "ready"}
+
+    async def test_draining(
+        self,
+        test_client: AsyncTestClient,
+        simple_chat_request: dict[str, Any],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that a draining server fails its readiness check and refuses completions."""
+        monkeypatch.setattr(stream_registry, "draining", True)
+
+        ready = await test_client.get("/ready")
+        completion = await test_client.post("/v1/chat/completions", json=simple_chat_request)
+
+        assert ready.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert completion.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert completion.headers["Retry-After"] == "1"
+
+
+class TestStreamIntrospection:
+    """Tests for the listing and cancellation of the streams in flight."""
+
+    async def test_progress(self) -> None:
+        registry = StreamRegistry()
+        stream = registry.track(token_stream(3, 0, []), model="m", provider="p", host="h")
+
+        await anext(stream)
+        await anext(stream)
+        [info] = registry.get_streams()
+
+        assert (info.model, info.provider, info.host) == ("m", "p", "h")
+        assert (info.events, info.bytes) == (2, 18)
+        assert info.last_event_at is not None and info.last_event_at >= info.started_at
+        assert not info.stalled
+        await stream.aclose()
+        assert registry.get_streams() == []
+
+    async def test_cancel(self) -> None:
+        """Test that a cancelled stream is closed and ends with an error event."""
+        registry = StreamRegistry()
+        closed: list[bool] = []
+        consumer = asyncio.create_task(consume(registry.track(token_stream(100, 0.01, closed))))
+        await asyncio.sleep(0.05)
+
+        registry.cancel(registry.get_streams()[0].id)
+        chunks = await consumer
+
+        assert closed == [True]
+        assert json.loads(chunks[-1][6:])["error"]["detail"] == CANCEL_DETAIL
+        assert registry.active == 0
+        with pytest.raises(NotFoundException):
+            registry.cancel("unknown")
+
+
+class TestStreamsEndpoints:
+    """Tests for the admin endpoints of the streams in flight."""
+
+    async def test_list_and_cancel(
+        self, simple_chat_request: dict[str, Any], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a running completion is listed, and ended once cancelled."""
+        monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+        config = DummyConfig(mode="deterministic", tokens_per_second=50, completion_tokens=500)
+        monkeypatch.setattr(DummyService, "config", config)
+        payload = {**simple_chat_request, "stream": True}
+
+        # Served over a socket, the test client handles one request at a time
+        with run_in_thread(app) as url:
+            async with httpx.AsyncClient(base_url=url, timeout=10) as client:
+                completion = asyncio.create_task(
+                    client.post(
+                        "/v1/chat/completions", json=payload, headers={"X-API-Key": "client-key"}
+                    )
+                )
+                await asyncio.sleep(0.3)
+
+                [stream] = (await client.get("/admin/streams", headers=ADMIN_HEADERS)).json()
+                cancelled = await client.post(
+                    f"/admin/streams/{stream['id']}/cancel", headers=ADMIN_HEADERS
+                )
+                response = await completion
+                streams = await client.get("/admin/streams", headers=ADMIN_HEADERS)
+
+        assert stream["model"] == simple_chat_request["model"]
+        assert stream["provider"] == "dummy"
+        assert stream["client"] == "key:clie..."
+        assert stream["events"] > 0
+        assert cancelled.status_code == HTTPStatus.CREATED
+        assert CANCEL_DETAIL in response.text
+        assert "[DONE]" not in response.text
+        assert streams.json() == []
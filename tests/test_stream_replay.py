@@ -0,0 +1,147 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from litestar.exceptions import HTTPException
+from litestar.testing import AsyncTestClient
+
+from services.stream_replay import StreamReplayStore
+from services.stream_state import SSE_DONE
+
+
+async def token_stream(count: int, delay: float, sent: list[int]) -> AsyncGenerator[bytes, Any]:
+    try:
+        for index in range(count):
+            await asyncio.sleep(delay)
+            sent.append(index)
+            yield f"data: {index}\n\n".encode()
+        yield SSE_DONE
+    finally:
+        sent.append(-1)
+
+
+async def take(stream: AsyncGenerator[bytes, Any], count: int) -> list[bytes]:
+    """Reads `count` events then disconnects."""
+    events = [await anext(stream) for _ in range(count)]
+    await stream.aclose()
+    return events
+
+
+def last_event_id(event: bytes) -> str:
+    return event.decode().strip().splitlines()[-1].removeprefix("id: ")
+
+
+class TestStreamReplayStore:
+    """Tests for the replay of the streams to reconnecting clients."""
+
+    async def test_resume_after_disconnect(self) -> None:
+        """Test that the generation goes on while away and the client receives all events."""
+        store = StreamReplayStore(grace_period=5)
+        sent: list[int] = []
+
+        received = await take(store.start(token_stream(10, 0.01, sent)), 3)
+        await asyncio.sleep(0.2)
+        assert sent[-1] == -1
+        received += [event async for event in store.resume(last_event_id(received[-1]))]
+
+        assert [event.split(b"\n")[0] for event in received] == [
+            *(f"data: {index}".encode() for index in range(10)),
+            b"data: [DONE]",
+        ]
+        assert [last_event_id(event).split("/")[1] for event in received[:10]] == [
+            str(index) for index in range(10)
+        ]
+
+    async def test_resume_live(self) -> None:
+        """Test that a client reconnecting during the generation receives the next events."""
+        store = StreamReplayStore(grace_period=5)
+
+        received = await take(store.start(token_stream(10, 0.02, [])), 2)
+        received += [event async for event in store.resume(last_event_id(received[-1]))]
+
+        assert len(received) == 11
+        assert received[-1] == SSE_DONE
+
+    async def test_abandoned_after_grace_period(self) -> None:
+        """Test that the generation ends when the client does not come back in time."""
+        store = StreamReplayStore(grace_period=0.05)
+        sent: list[int] = []
+
+        received = await take(store.start(token_stream(100, 0.01, sent)), 1)
+        await asyncio.sleep(0.2)
+
+        assert sent[-1] == -1
+        assert len(sent) < 20
+        with pytest.raises(HTTPException) as error:
+            store.resume(last_event_id(received[-1]))
+        assert error.value.status_code == HTTPStatus.GONE
+
+    async def test_expired_after_ttl(self) -> None:
+        store = StreamReplayStore(ttl=0.05)
+        events = [event async for event in store.start(token_stream(3, 0, []))]
+        store.resume(last_event_id(events[0]))
+
+        await asyncio.sleep(0.1)
+
+        with pytest.raises(HTTPException):
+            store.resume(last_event_id(events[0]))
+        assert len(store) == 0
+        assert store.size == 0
+
+    async def test_memory_cap(self) -> None:
+        """Test that the oldest streams are evicted first when over the memory cap."""
+        store = StreamReplayStore(max_bytes=400)
+        first = [event async for event in store.start(token_stream(5, 0, []))]
+        second = [event async for event in store.start(token_stream(5, 0, []))]
+
+        with pytest.raises(HTTPException):
+            store.resume(last_event_id(first[0]))
+        assert len([event async for event in store.resume(last_event_id(second[0]))]) == 5
+        assert 0 < store.size <= 400
+
+    async def test_close(self) -> None:
+        """Test that the generations of the clients away are ended on shutdown."""
+        store = StreamReplayStore(grace_period=60)
+        sent: list[int] = []
+        await take(store.start(token_stream(100, 0.01, sent)), 1)
+
+        await store.close()
+
+        assert sent[-1] == -1
+        assert len(store) == 0
+
+
+class TestResumeEndpoint:
+    """Tests for the resumption of a completion stream with Last-Event-ID."""
+
+    async def test_resume(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        """Test that the events after the Last-Event-ID are sent again, not generated again."""
+        payload = {**simple_chat_request, "stream": True}
+        response = await test_client.post("/v1/chat/completions", json=payload)
+        events = response.text.split("\n\n")[:-1]
+        middle = len(events) // 2
+
+        resumed = await test_client.post(
+            "/v1/chat/completions",
+            json=payload,
+            headers={"Last-Event-ID": events[middle].splitlines()[-1].removeprefix("id: ")},
+        )
+
+        assert all(event.splitlines()[-1].startswith("id: ") for event in events[:-1])
+        assert resumed.status_code == HTTPStatus.CREATED
+        assert resumed.text.split("\n\n")[:-1] == events[middle + 1 :]
+
+    async def test_resume_unknown_stream(
+        self, test_client: AsyncTestClient, simple_chat_request: dict[str, Any]
+    ) -> None:
+        response = await test_client.post(
+            "/v1/chat/completions",
+            json={**simple_chat_request, "stream": True},
+            headers={"Last-Event-ID": "unknown/3"},
+        )
+
+        assert response.status_code == HTTPStatus.GONE
@@ -0,0 +1,57 @@
+from datetime import datetime
+from uuid import uuid4
+
+from schemas.chat_schemas import ChatCompletionStreamChunk
+from services.stream_state import StreamState, encode_sse
+
+
+class TestStreamState:
+    """Tests for the per-stream state encoding the chunks of a choice."""
+
+    def test_delta_matches_chunk_encoding(self) -> None:
+        """Test that the templated events are identical to the encoded chunks."""
+        completion_id, created = uuid4(), datetime.now()
+        state = StreamState("dummy-model:1.0", 2, completion_id, created)
+
+        for content in ["Hello", ' "quoted"\n', "é\x00"]:
+            expected = ChatCompletionStreamChunk(
+                id=completion_id,
+                created=created,
+                model="dummy-model:1.0",
+                choices=[
+                    {
+                        "index": 2,
+                        "delta": {"role": "assistant", "content": content},
+                        "finish_reason": None,
+                    }
+                ],
+            )
+            assert state.delta(content) == encode_sse(expected)
+
+        assert state.completion_tokens == 3
+
+    def test_finish(self) -> None:
+        """Test the last event of a choice."""
+        state = StreamState("dummy-model:1.0")
+
+        event = state.finish("length")
+
+        assert event.startswith(b"data: {")
+        assert b'"delta":{},"finish_reason":"length"' in event
+
+    def test_streams_share_the_suffix(self) -> None:
+        """Test that only the start of the event is stored per stream."""
+        first = StreamState("dummy-model:1.0")
+        second = StreamState("other-model", index=1)
+
+        assert first._suffix is second._suffix
+
+    def test_reasoning_delta(self) -> None:
+        """Test that the reasoning events only differ from the content ones by their field."""
+        state = StreamState("dummy-model:1.0")
+
+        reasoning = state.reasoning_delta("Hmm")
+        content = state.delta("Hmm")
+
+        assert reasoning == content.replace(b'"content"', b'"reasoning_content"')
+        assert state.completion_tokens == 2
@@ -0,0 +1,105 @@
+from schemas.chat_schemas import ChatMessage
+from services.token_counter import (
+    MESSAGE_OVERHEAD_TOKENS,
+    TokenCountCache,
+    approximate_token_count,
+)
+
+
+class TestTokenCountCache:
+    """Tests for the token-count cache."""
+
+    def test_approximate_token_count(self) -> None:
+        """Test that words and punctuation marks are counted as tokens."""
+        assert approximate_token_count("Hello, world!") == 4
+        assert approximate_token_count("") == 0
+
+    def test_repeated_content_is_cached(self) -> None:
+        """Test that the same content is tokenized only once."""
+        calls: list[str] = []
+        cache = TokenCountCache()
+        cache.register_tokenizer("spy", lambda text: calls.append(text) or 7, ["model-a"])
+
+        assert cache.count("model-a", "some text") == 7
+        assert cache.count("model-a", "some text") == 7
+        assert calls == ["some text"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_namespaces_are_isolated(self) -> None:
+        """Test that models using different tokenizers do not share counts."""
+        cache = TokenCountCache()
+        cache.register_tokenizer("chars", len, ["model-a"])
+
+        assert cache.count("model-a", "hello world") == 11
+        assert cache.count("model-b", "hello world") == 2
+
+    def test_lru_eviction(self) -> None:
+        """Test that the least recently used entry is evicted first."""
+        cache = TokenCountCache(max_entries=2)
+        cache.count("model", "first")
+        cache.count("model", "second")
+        cache.count("model", "first")
+        cache.count("model", "third")
+
+        assert len(cache) == 2
+        cache.count("model", "first")
+        assert cache.hits == 2
+        cache.count("model", "second")
+        assert cache.misses == 4
+
+    def test_growing_conversation_only_counts_new_messages(self) -> None:
+        """Test that each turn only tokenizes the messages that were added."""
+        cache = TokenCountCache()
+        messages: list[ChatMessage] = []
+
+        for turn in range(10):
+            messages.append(ChatMessage(role="user", content=f"Question number {turn}"))
+            total = cache.count_messages("model", messages)
+            assert total == len(messages) * (3 + MESSAGE_OVERHEAD_TOKENS)
+
+        assert cache.misses == 10
+
+    def test_conversation_total_reused(self) -> None:
+        """Test that a turn reuses the total of its history, not the count of each message."""
+        cache = TokenCountCache()
+        history = [
+            ChatMessage(role="user", content="what is python"),
+            ChatMessage(role="assistant", content="a language"),
+        ]
+        cache.count_messages("model", history)
+        hits = cache.hits
+
+        # A fresh copy of the history, as decoded from the next request
+        received = [ChatMessage(m.role, m.content.encode().decode()) for m in history]
+        total = cache.count_messages("model", [*received, ChatMessage(role="user", content="why")])
+
+        assert total == 6 + 3 * MESSAGE_OVERHEAD_TOKENS
+        assert cache.hits == hits
+
+    def test_conversation_total_checks_last_message(self) -> None:
+        """Test that a history of the same lengths but another last message is counted."""
+        cache = TokenCountCache()
+
+        assert cache.count_messages("model", [ChatMessage(role="user", content="a b c")]) == 7
+        assert cache.count_messages("model", [ChatMessage(role="user", content="abcde")]) == 5
+
+    def test_conversation_total_checks_every_message(self) -> None:
+        """Test that histories of the same lengths and last message get their own totals."""
+        cache = TokenCountCache()
+        words = [ChatMessage(role="user", content="a b c d e f g h"), ChatMessage("user", "hi")]
+        letters = [ChatMessage(role="user", content="abcdefghijklmno"), ChatMessage("user", "hi")]
+
+        assert cache.count_messages("model", words) == 9 + 2 * MESSAGE_OVERHEAD_TOKENS
+        assert cache.count_messages("model", letters) == 2 + 2 * MESSAGE_OVERHEAD_TOKENS
+
+    def test_replaced_tokenizer_invalidates_counts(self) -> None:
+        """Test that the counts of a namespace are dropped when its tokenizer is replaced."""
+        cache = TokenCountCache()
+        cache.register_tokenizer("custom", lambda text: 1, ["model"])
+        messages = [ChatMessage(role="user", content="hello world")]
+        assert cache.count_messages("model", messages) == 1 + MESSAGE_OVERHEAD_TOKENS
+
+        cache.register_tokenizer("custom", lambda text: 2)
+
+        assert cache.count("model", "hello world") == 2
+        assert cache.count_messages("model", messages) == 2 + MESSAGE_OVERHEAD_TOKENS
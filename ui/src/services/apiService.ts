@@ -1,8 +1,4 @@
 import type { Message, ModelsResponseType, ModelType } from "@/utils/types";
-import {
-  extractThinkingContent,
-  parseStreamingContent,
-} from "@/utils/messageParser";
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
 
@@ -129,7 +125,9 @@ export class ApiService {
     }
 
     const decoder = new TextDecoder();
-    let accumulatedResponseText = "";
+    // The reasoning of the thinking models is streamed apart, in `reasoning_content`
+    let accumulatedContent = "";
+    let accumulatedThinking = "";
     let buffer = "";
 
     try {
@@ -138,13 +136,9 @@ export class ApiService {
 
         if (done) {
           // Final treatment
-          const { thinking, cleanContent } = extractThinkingContent(
-            accumulatedResponseText
-          );
-
           onComplete({
-            content: cleanContent,
-            thinkingContent: thinking,
+            content: accumulatedContent.trim(),
+            thinkingContent: accumulatedThinking.trim(),
             loaded: true,
             isThinkingLoading: false,
           });
@@ -153,13 +147,9 @@ export class ApiService {
 
         if (signal.aborted) {
           console.log("Fetch aborted");
-          const { thinking, cleanContent } = extractThinkingContent(
-            accumulatedResponseText
-          );
-
           onComplete({
-            content: `${cleanContent} (Annulé)`,
-            thinkingContent: thinking,
+            content: `${accumulatedContent.trim()} (Annulé)`,
+            thinkingContent: accumulatedThinking.trim(),
             isError: true,
             isThinkingLoading: false,
           });
@@ -184,13 +174,9 @@ export class ApiService {
 
             if (dataStr === "[DONE]") {
               // Stream finished
-              const { thinking, cleanContent } = extractThinkingContent(
-                accumulatedResponseText
-              );
-
               onComplete({
-                content: cleanContent,
-                thinkingContent: thinking,
+                content: accumulatedContent.trim(),
+                thinkingContent: accumulatedThinking.trim(),
                 loaded: true,
                 isThinkingLoading: false,
               });
@@ -199,18 +185,17 @@ export class ApiService {
 
             try {
               const data = JSON.parse(dataStr);
-              const content = data.choices?.[0]?.delta?.content;
-
-              if (content) {
-                accumulatedResponseText += content;
+              const delta = data.choices?.[0]?.delta;
 
-                const { thinkingContent, cleanContent, isThinkingLoading } =
-                  parseStreamingContent(accumulatedResponseText);
+              if (delta?.content || delta?.reasoning_content) {
+                accumulatedContent += delta.content ?? "";
+                accumulatedThinking += delta.reasoning_content ?? "";
 
                 onMessageUpdate({
-                  content: cleanContent,
-                  thinkingContent,
-                  isThinkingLoading,
+                  content: accumulatedContent.trim(),
+                  thinkingContent: accumulatedThinking.trim(),
+                  // The model thinks until its answer starts
+                  isThinkingLoading: accumulatedContent === "",
                 });
               }
             } catch (parseError) {